@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from modules import documents, templates
+from modules import documents, metrics, templates
 
 router = APIRouter()
 
 router.include_router(templates.router)
 router.include_router(documents.router)
+router.include_router(metrics.router)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -45,12 +46,100 @@ class S3Settings(BaseSettings):
     access_key: str
     secret_key: str
     bucket_name: str
+    # Соединений в пуле клиента, таймауты (с) и попытки запроса
+    max_pool_connections: int = 50
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_attempts: int = 3
+    # Кусок потокового скачивания; часть multipart upload (не меньше 5 МБ)
+    # и сколько частей загружается одновременно
+    chunk_size: int = 256 * 1024
+    part_size: int = 8 * 1024 * 1024
+    part_concurrency: int = 4
 
     model_config = SettingsConfigDict(
         env_prefix="s3_", env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
 
 
+class RenderSettings(BaseSettings):
+    # zip - прямая правка XML внутри архива, docx - через python-docx
+    engine: Literal["zip", "docx"] = "zip"
+    template_cache_size: int = 32
+    # thread - пул потоков по умолчанию, process - отдельные процессы
+    executor: Literal["thread", "process"] = "thread"
+    # 0 - по количеству CPU
+    process_workers: int = 0
+    # Пусто - системный каталог временных файлов
+    spool_dir: str = ""
+    # Сколько документов пакета рендерится одновременно
+    batch_concurrency: int = 4
+    # Допуск рендеринга: одновременных (0 - по количеству процессов пула или CPU),
+    # ожидающих, максимальное ожидание (с) и Retry-After для отказов (с)
+    concurrency: int = 0
+    queue_size: int = 64
+    queue_timeout: float = 10.0
+    retry_after: int = 5
+    # Бюджет памяти на все рендеры процесса, байт; оценка одного рендера -
+    # memory_factor размеров шаблона (исходник, разобранные части, результат)
+    memory_budget: int = 256 * 1024 * 1024
+    memory_factor: int = 3
+    # Документы больше порога пишутся во временный файл, байт
+    spool_threshold: int = 8 * 1024 * 1024
+    # Скачанные шаблоны (пусто - системный каталог временных файлов) и лимит, байт
+    template_dir: str = ""
+    template_store_size: int = 1024 * 1024 * 1024
+    # Сколько секунд скачанный шаблон считается актуальным без условного
+    # запроса к источнику (0 - проверять ETag при каждом запросе)
+    template_ttl: float = 0
+    # Адреса (host:port через запятую), ссылки на которые читаются напрямую из
+    # S3, кроме адреса s3_endpoint_url, например публичный адрес бакета
+    template_s3_hosts: str = ""
+    # Кэш готовых документов, байт (0 - уровень отключён). Документы содержат
+    # персональные данные, поэтому дисковый уровень включается явно
+    output_cache_memory_size: int = 64 * 1024 * 1024
+    output_cache_disk_size: int = 0
+    # Пусто - системный каталог временных файлов
+    output_cache_dir: str = ""
+    # Где хранить незаполненные варианты шаблонов: disk - локальный каталог,
+    # s3 - бакет из настроек S3 с префиксом blank_prefix
+    blank_storage: Literal["disk", "s3"] = "disk"
+    # Пусто - системный каталог временных файлов; лимит каталога, байт
+    blank_dir: str = ""
+    blank_dir_size: int = 256 * 1024 * 1024
+    blank_prefix: str = "blank-templates/"
+
+    # Прогрев шаблонов при старте: ID через запятую или, если пусто, prewarm_top
+    # самых популярных за prewarm_days дней (0 - не прогревать); сколько
+    # шаблонов греется одновременно и общий лимит времени прогрева (с)
+    prewarm_templates: str = ""
+    prewarm_top: int = 20
+    prewarm_days: int = 30
+    prewarm_concurrency: int = 4
+    prewarm_timeout: float = 60.0
+
+    model_config = SettingsConfigDict(
+        env_prefix="render_", env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+
+
+class HttpSettings(BaseSettings):
+    # Соединений всего и с одним хостом, простой keep-alive соединения (с)
+    limit: int = 100
+    limit_per_host: int = 20
+    keepalive_timeout: float = 30.0
+    # Таймауты соединения и запроса целиком (с)
+    connect_timeout: float = 5.0
+    total_timeout: float = 60.0
+    # Повторы при сетевых ошибках и 502/503/504, задержка первого повтора (с)
+    retries: int = 3
+    backoff: float = 0.2
+
+    model_config = SettingsConfigDict(
+        env_prefix="http_", env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+
+
 @dataclass
 class Settings:
     cipher_settings: CiphersSettings = field(default_factory=CiphersSettings)
@@ -58,6 +147,8 @@ class Settings:
     s3_settings: S3Settings = field(default_factory=S3Settings)
     user_service: UserGrpcSettings = field(default_factory=UserGrpcSettings)
     ai_service: AIGrpcSettings = field(default_factory=AIGrpcSettings)
+    render_settings: RenderSettings = field(default_factory=RenderSettings)
+    http_settings: HttpSettings = field(default_factory=HttpSettings)
 
 
 settings = Settings()
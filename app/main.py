@@ -1,15 +1,38 @@
 from contextlib import asynccontextmanager
 
 from api import router
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from lawly_db.db_models.db_session import global_init
+from lawly_db.db_models.db_session import get_session, global_init
+
+from config import settings
+from repositories.s3_repository import s3_client
+from repositories.template_repository import TemplateRepository
+from utils.http_client import http_client
+from utils.render_pool import render_pool
+from utils.render_scheduler import RenderRejectedError
+from utils.template_prewarm import template_prewarmer
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await global_init()
-    yield
+    # Ресурсы закрываются и при ошибке запуска или работы приложения;
+    # закрытие незапущенного ресурса ничего не делает
+    try:
+        await http_client.start()
+        await s3_client.start()
+        async with asynccontextmanager(get_session)() as session:
+            await TemplateRepository(session).detect_trigram()
+        if settings.render_settings.executor == "process":
+            await render_pool.start()
+        # До готовности приложения, чтобы первые запросы не ждали шаблоны
+        await template_prewarmer.run_popular()
+        yield
+    finally:
+        await render_pool.shutdown()
+        await http_client.close()
+        await s3_client.close()
 
 
 app = FastAPI(title="Lawly User API", lifespan=lifespan)
@@ -23,3 +46,15 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix="/api/v1")
+
+
+@app.exception_handler(RenderRejectedError)
+async def render_rejected_handler(request: Request, exc: RenderRejectedError):
+    """
+    Перегрузка рендеринга: клиенту сразу отвечаем 503, чтобы он повторил позже
+    """
+    return Response(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
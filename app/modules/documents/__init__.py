@@ -2,9 +2,11 @@ from .descriptions import (
     document_create_description,
     document_update_description,
     get_documents_description,
+    export_documents_description,
     get_document_structure_description,
     improve_text_description,
     generate_document_description,
+    generate_document_batch_description,
 )
 from .dto import (
     TemplateDTO,
@@ -19,15 +21,18 @@ from .dto import (
     ImproveTextDTO,
     ImprovedTextResponseDTO,
     GenerateDocumentDTO,
+    GenerateDocumentBatchDTO,
 )
 
 from .response import (
     create_document_response,
     update_document_response,
     get_documents_response,
+    export_documents_response,
     get_document_structure_response,
     improve_text_response,
     generate_document_response,
+    generate_document_batch_response,
 )
 from .route import router
 
@@ -36,6 +41,7 @@ __all__ = [
     "document_create_description",
     "document_update_description",
     "get_documents_description",
+    "export_documents_description",
     "get_document_structure_description",
     "improve_text_description",
     "DocumentCreateDto",
@@ -52,10 +58,14 @@ __all__ = [
     "create_document_response",
     "update_document_response",
     "get_documents_response",
+    "export_documents_response",
     "get_document_structure_response",
     "improve_text_response",
     "GenerateDocumentDTO",
     "generate_document_response",
     "document_create_description",
     "generate_document_description",
+    "GenerateDocumentBatchDTO",
+    "generate_document_batch_response",
+    "generate_document_batch_description",
 ]
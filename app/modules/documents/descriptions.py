@@ -3,10 +3,19 @@ document_create_description = (
 )
 document_update_description = "Обновление статуса создания документа пользователем"
 get_documents_description = (
-    "Получение списка базовых документов (паспорт, СНИЛС и т.д.)"
+    "Получение списка базовых документов (паспорт, СНИЛС и т.д.). "
+    "С limit возвращается страница, курсор следующей - в заголовке X-Next-Cursor"
+)
+export_documents_description = (
+    "Выгрузка всех базовых документов в формате JSON Lines (по документу на "
+    "строку). Ответ отдаётся потоком по мере чтения из базы"
 )
 get_document_structure_description = "Получение информации о полях для документа"
 improve_text_description = "Преобразование обычного текста в юридический формат"
 generate_document_description = (
     "Генерация документа на основе шаблона и данных пользователя"
 )
+generate_document_batch_description = (
+    "Пакетная генерация документов по одному шаблону. "
+    "Документы возвращаются ZIP-архивом, который отдаётся по мере готовности"
+)
@@ -101,3 +101,20 @@ class GenerateDocumentFieldDTO(BaseModel):
 class GenerateDocumentDTO(BaseModel):
     template_id: int = Field(..., description="ID шаблона документа")
     fields: list[GenerateDocumentFieldDTO] = Field(..., description="Поля документа")
+
+
+class GenerateDocumentBatchItemDTO(BaseModel):
+    filename: str | None = Field(
+        None, description="Имя файла в архиве (без расширения)", max_length=255
+    )
+    fields: list[GenerateDocumentFieldDTO] = Field(..., description="Поля документа")
+
+
+class GenerateDocumentBatchDTO(BaseModel):
+    template_id: int = Field(..., description="ID шаблона документа")
+    documents: list[GenerateDocumentBatchItemDTO] = Field(
+        ...,
+        description="Наборы полей, по одному на каждый документ",
+        min_length=1,
+        max_length=1000,
+    )
@@ -1,6 +1,10 @@
 from enum import Enum
 
 
+class GetDocumentsEnum(Enum):
+    INVALID_CURSOR = "invalid_cursor"
+
+
 class DocumentUpdateEnum(Enum):
     NOT_FOUND = "not_found"
 
@@ -6,6 +6,14 @@ from modules.documents.dto import (
 )
 from shared import base_response
 
+IGNORED_FIELDS_HEADERS = {
+    "X-Ignored-Fields": {
+        "description": "Поля запроса, которых нет в шаблоне (через запятую, "
+        "URL-кодированные); они не подставляются",
+        "schema": {"type": "string"},
+    }
+}
+
 create_document_response = {
     **base_response,
     201: {
@@ -34,6 +42,21 @@ get_documents_response = {
     200: {
         "description": "Список документов",
         "model": list[DocumentDto],
+        "headers": {
+            "X-Next-Cursor": {
+                "description": "Курсор следующей страницы, если она есть",
+                "schema": {"type": "string"},
+            }
+        },
+    },
+    400: {"description": "Некорректный курсор"},
+    401: {"description": "Нет доступа к ресурсу"},
+}
+export_documents_response = {
+    **base_response,
+    200: {
+        "description": "Документы в формате JSON Lines",
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
     },
     401: {"description": "Нет доступа к ресурсу"},
 }
@@ -66,6 +89,7 @@ generate_document_response = {
     **base_response,
     200: {
         "description": "Документ успешно создан",
+        "headers": IGNORED_FIELDS_HEADERS,
         "content": {
             "application/vnd.openxmlformats-officedocument.wordprocessingml.document": {
                 "schema": {"type": "string", "format": "binary"}
@@ -77,4 +101,23 @@ generate_document_response = {
     },
     401: {"description": "Нет доступа к ресурсу"},
     403: {"description": "Недостаточно прав для выполнения"},
+    404: {"description": "Шаблон не найден"},
+    503: {"description": "Сервис перегружен, повторите запрос позже (Retry-After)"},
+}
+
+generate_document_batch_response = {
+    **base_response,
+    200: {
+        "description": "Архив с документами",
+        "headers": IGNORED_FIELDS_HEADERS,
+        "content": {
+            "application/zip": {"schema": {"type": "string", "format": "binary"}}
+        },
+    },
+    400: {
+        "description": "Ошибка при создании документов",
+    },
+    401: {"description": "Нет доступа к ресурсу"},
+    404: {"description": "Шаблон не найден"},
+    503: {"description": "Сервис перегружен, повторите запрос позже (Retry-After)"},
 }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, status, Depends, Response
+from fastapi import APIRouter, status, Depends, Query, Response
 from fastapi.responses import StreamingResponse
 
 from api.auth.auth_bearer import JWTHeader, JWTBearer
@@ -15,6 +15,8 @@ from modules.documents import (
     get_documents_description,
     DocumentDto,
     get_documents_response,
+    export_documents_description,
+    export_documents_response,
     get_document_structure_description,
     DocumentStructureDTO,
     get_document_structure_response,
@@ -25,9 +27,17 @@ from modules.documents import (
     GenerateDocumentDTO,
     generate_document_response,
     generate_document_description,
+    GenerateDocumentBatchDTO,
+    generate_document_batch_response,
+    generate_document_batch_description,
 )
 from modules.documents.dto import ImproveTextWithUserIDDTO
-from modules.documents.enum import DocumentUpdateEnum, ImproveTextEnum
+from modules.documents.enum import (
+    DocumentUpdateEnum,
+    GetDocumentsEnum,
+    ImproveTextEnum,
+    GenerateDocumentEnum,
+)
 from services.document_service import DocumentService
 
 router = APIRouter(tags=["Документы"], prefix="/documents")
@@ -109,15 +119,63 @@ async def update_document(
     responses=get_documents_response,
     dependencies=[Depends(JWTBearer())],
 )
-async def get_documents(document_service: DocumentService = Depends(DocumentService)):
+async def get_documents(
+    response: Response,
+    limit: int
+    | None = Query(
+        None, ge=1, description="Размер страницы (по умолчанию все документы)"
+    ),
+    offset: int = Query(0, ge=0, description="Смещение для пагинации"),
+    after: str
+    | None = Query(
+        None,
+        description="Курсор предыдущей страницы (заголовок X-Next-Cursor ответа); "
+        "страница начинается сразу после него",
+    ),
+    document_service: DocumentService = Depends(DocumentService),
+):
     """
-    Получение списка базовых документов пользователя
+    Получение списка базовых документов пользователя. Курсор следующей
+    страницы передаётся в заголовке X-Next-Cursor, чтобы ответ остался списком
+    :param response:
+    :param limit: размер страницы
+    :param offset: смещение
+    :param after: курсор предыдущей страницы
     :param document_service:
-    :param token:
     :return:
     """
-    result = await document_service.get_all_documents_service()
-    return result
+    result = await document_service.get_all_documents_service(
+        limit=limit, offset=offset, after=after
+    )
+    if result == GetDocumentsEnum.INVALID_CURSOR:
+        return Response(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Некорректный курсор",
+        )
+    documents, next_cursor = result
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return documents
+
+
+@router.get(
+    "/documents/export",
+    summary="Выгрузка базовых документов",
+    description=export_documents_description,
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses=export_documents_response,
+    dependencies=[Depends(JWTBearer())],
+)
+async def export_documents(
+    document_service: DocumentService = Depends(DocumentService),
+):
+    """
+    Выгрузка базовых документов в формате JSON Lines
+    :param document_service:
+    :return: потоковый ответ
+    """
+    return document_service.export_documents_service()
 
 
 @router.get(
@@ -213,9 +271,47 @@ async def generate_document(
     result = await document_service.generate_document_service(
         generate_document_dto=generate_document_dto
     )
-    if result == ImproveTextEnum.ERROR:
+    if result == GenerateDocumentEnum.NOT_FOUND:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND, content="Шаблон не найден"
+        )
+    if result == GenerateDocumentEnum.ERROR:
         return Response(
             status_code=status.HTTP_400_BAD_REQUEST,
             content="Ошибка при генерации документа",
         )
     return result
+
+
+@router.post(
+    "/generate/batch",
+    summary="Пакетная генерация документов",
+    description=generate_document_batch_description,
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses=generate_document_batch_response,
+    dependencies=[Depends(JWTBearer())],
+)
+async def generate_document_batch(
+    generate_document_batch_dto: GenerateDocumentBatchDTO,
+    document_service: DocumentService = Depends(DocumentService),
+):
+    """
+    Пакетная генерация документов
+    :param generate_document_batch_dto: DTO для пакетной генерации документов
+    :param document_service:
+    :return: ZIP-архив с документами
+    """
+    result = await document_service.generate_document_batch_service(
+        generate_document_batch_dto=generate_document_batch_dto
+    )
+    if result == GenerateDocumentEnum.NOT_FOUND:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND, content="Шаблон не найден"
+        )
+    if result == GenerateDocumentEnum.ERROR:
+        return Response(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Ошибка при генерации документов",
+        )
+    return result
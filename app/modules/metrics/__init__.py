@@ -0,0 +1,27 @@
+from .descriptions import get_metrics_description
+from .dto import (
+    HttpClientMetricsDTO,
+    MemoryBudgetMetricsDTO,
+    MetricsDTO,
+    RenderPoolMetricsDTO,
+    RenderedCacheMetricsDTO,
+    RenderSchedulerMetricsDTO,
+    TemplatePrewarmMetricsDTO,
+    TemplateStoreMetricsDTO,
+)
+from .response import get_metrics_response
+from .route import router
+
+__all__ = [
+    "router",
+    "get_metrics_description",
+    "MetricsDTO",
+    "RenderPoolMetricsDTO",
+    "RenderedCacheMetricsDTO",
+    "RenderSchedulerMetricsDTO",
+    "MemoryBudgetMetricsDTO",
+    "HttpClientMetricsDTO",
+    "TemplateStoreMetricsDTO",
+    "TemplatePrewarmMetricsDTO",
+    "get_metrics_response",
+]
@@ -0,0 +1 @@
+get_metrics_description = "Внутренние метрики сервиса: пул, очередь и память рендеринга документов, кэш готовых документов, хранилище и прогрев шаблонов, HTTP-клиент"
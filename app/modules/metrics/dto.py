@@ -0,0 +1,145 @@
+from pydantic import BaseModel, Field
+
+
+class RenderPoolMetricsDTO(BaseModel):
+    workers: int = Field(..., description="Количество процессов рендеринга")
+    in_flight: int = Field(..., description="Рендеров в работе и в очереди")
+    queue_depth: int = Field(..., description="Рендеров, ожидающих свободный процесс")
+    submitted: int = Field(..., description="Всего отправлено в пул")
+    completed: int = Field(..., description="Успешно завершено")
+    failed: int = Field(..., description="Завершено с ошибкой")
+    utilization: float = Field(
+        ..., description="Доля времени, которую процессы были заняты (0..1)"
+    )
+    average_wait_seconds: float = Field(
+        ..., description="Среднее ожидание свободного процесса, с"
+    )
+    average_render_seconds: float = Field(
+        ..., description="Среднее время рендеринга, с"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class RenderedCacheMetricsDTO(BaseModel):
+    memory_entries: int = Field(..., description="Документов в памяти")
+    memory_bytes: int = Field(..., description="Занято в памяти, байт")
+    disk_entries: int = Field(..., description="Документов на диске")
+    disk_bytes: int = Field(..., description="Занято на диске, байт")
+    memory_hits: int = Field(..., description="Попаданий в память")
+    disk_hits: int = Field(..., description="Попаданий на диск")
+    misses: int = Field(..., description="Промахов")
+    hit_ratio: float = Field(..., description="Доля попаданий (0..1)")
+
+    class Config:
+        from_attributes = True
+
+
+class RenderSchedulerMetricsDTO(BaseModel):
+    concurrency: int = Field(..., description="Лимит одновременных рендеров")
+    running: int = Field(..., description="Рендеров в работе")
+    queued: int = Field(..., description="Рендеров в очереди")
+    admitted: int = Field(..., description="Всего допущено")
+    rejected_queue_full: int = Field(..., description="Отклонено: очередь заполнена")
+    rejected_timeout: int = Field(
+        ..., description="Отклонено: превышено время ожидания"
+    )
+    average_wait_seconds: float = Field(
+        ..., description="Среднее ожидание в очереди, с"
+    )
+    max_wait_seconds: float = Field(..., description="Максимальное ожидание, с")
+
+    class Config:
+        from_attributes = True
+
+
+class MemoryBudgetMetricsDTO(BaseModel):
+    limit_bytes: int = Field(..., description="Бюджет памяти на рендеринг, байт")
+    in_use_bytes: int = Field(..., description="Зарезервировано сейчас, байт")
+    peak_in_use_bytes: int = Field(..., description="Пик резервирования, байт")
+    waiting: int = Field(..., description="Рендеров, ожидающих память")
+    waited: int = Field(..., description="Всего рендеров, ждавших память")
+    average_wait_seconds: float = Field(
+        ..., description="Среднее ожидание памяти среди ждавших, с"
+    )
+    outputs: int = Field(..., description="Всего готовых документов")
+    spilled_outputs: int = Field(
+        ..., description="Документов, ушедших во временный файл"
+    )
+    peak_output_bytes: int = Field(..., description="Самый большой документ, байт")
+    process_peak_rss_bytes: int = Field(
+        ..., description="Пиковое потребление памяти процессом, байт"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class HttpClientMetricsDTO(BaseModel):
+    requests: int = Field(..., description="Всего запросов")
+    retries: int = Field(..., description="Повторов запросов")
+    failures: int = Field(..., description="Запросов, не удавшихся после повторов")
+    connections_created: int = Field(..., description="Открыто новых соединений")
+    connections_reused: int = Field(
+        ..., description="Запросов по уже открытому соединению"
+    )
+    reuse_ratio: float = Field(
+        ..., description="Доля запросов по открытому соединению (0..1)"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class TemplateStoreMetricsDTO(BaseModel):
+    files: int = Field(..., description="Шаблонов в локальном каталоге")
+    size_bytes: int = Field(..., description="Занято в каталоге, байт")
+    mapped: int = Field(..., description="Шаблонов, отображённых в память")
+    fresh_hits: int = Field(
+        ..., description="Выдано без обращения к источнику (в пределах TTL)"
+    )
+    revalidated: int = Field(..., description="Подтверждено ответом 304")
+    downloads: int = Field(..., description="Скачано целиком")
+    downloaded_bytes: int = Field(..., description="Скачано из источника, байт")
+    coalesced: int = Field(
+        ..., description="Запросов, дождавшихся уже идущего скачивания"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class TemplatePrewarmMetricsDTO(BaseModel):
+    requested: int = Field(..., description="Шаблонов для прогрева при старте")
+    warmed: int = Field(..., description="Прогрето")
+    failed: int = Field(..., description="Не удалось прогреть")
+    timed_out: int = Field(..., description="Не успели за лимит времени")
+    seconds: float = Field(..., description="Длительность прогрева, с")
+
+    class Config:
+        from_attributes = True
+
+
+class MetricsDTO(BaseModel):
+    render_pool: RenderPoolMetricsDTO | None = Field(
+        None, description="Пул процессов рендеринга (если включён)"
+    )
+    render_scheduler: RenderSchedulerMetricsDTO = Field(
+        ..., description="Допуск рендеринга"
+    )
+    memory_budget: MemoryBudgetMetricsDTO = Field(
+        ..., description="Бюджет памяти рендеринга"
+    )
+    rendered_cache: RenderedCacheMetricsDTO = Field(
+        ..., description="Кэш готовых документов"
+    )
+    http_client: HttpClientMetricsDTO = Field(
+        ..., description="HTTP-клиент для скачивания шаблонов"
+    )
+    template_store: TemplateStoreMetricsDTO = Field(
+        ..., description="Локальное хранилище шаблонов"
+    )
+    template_prewarm: TemplatePrewarmMetricsDTO = Field(
+        ..., description="Прогрев шаблонов при старте"
+    )
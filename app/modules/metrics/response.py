@@ -0,0 +1,11 @@
+from modules.metrics.dto import MetricsDTO
+from shared import base_response
+
+get_metrics_response = {
+    **base_response,
+    200: {
+        "description": "Метрики сервиса",
+        "model": MetricsDTO,
+    },
+    401: {"description": "Нет доступа к ресурсу"},
+}
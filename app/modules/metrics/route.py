@@ -0,0 +1,29 @@
+from fastapi import APIRouter, status, Depends
+
+from api.auth.auth_bearer import JWTBearer
+from modules.metrics import (
+    get_metrics_description,
+    get_metrics_response,
+    MetricsDTO,
+)
+from services.metrics_service import MetricsService
+
+router = APIRouter(tags=["Метрики"], prefix="/metrics")
+
+
+@router.get(
+    "",
+    summary="Получение метрик сервиса",
+    description=get_metrics_description,
+    response_model=MetricsDTO,
+    responses=get_metrics_response,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(JWTBearer(admin=True))],
+)
+async def get_metrics(metrics_service: MetricsService = Depends(MetricsService)):
+    """
+    Получение метрик сервиса
+    :param metrics_service:
+    :return: Метрики сервиса
+    """
+    return metrics_service.get_metrics_service()
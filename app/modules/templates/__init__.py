@@ -3,6 +3,8 @@ from .descriptions import (
     get_template_info_description,
     download_template_description,
     custom_template_description,
+    template_placeholders_description,
+    empty_template_description,
 )
 
 from .dto import (
@@ -17,6 +19,8 @@ from .dto import (
     TemplateDownloadDTO,
     DownloadEmptyTemplateDTO,
     CreateCustomTemplateDTO,
+    PlaceholderDTO,
+    TemplatePlaceholdersDTO,
 )
 
 from .response import (
@@ -25,6 +29,8 @@ from .response import (
     download_template_response,
     custom_template_response,
     download_empty_template,
+    template_placeholders_response,
+    empty_template_response,
 )
 
 from .route import router
@@ -51,4 +57,10 @@ __all__ = [
     "download_empty_template",
     "DownloadEmptyTemplateDTO",
     "CreateCustomTemplateDTO",
+    "template_placeholders_description",
+    "PlaceholderDTO",
+    "TemplatePlaceholdersDTO",
+    "template_placeholders_response",
+    "empty_template_description",
+    "empty_template_response",
 ]
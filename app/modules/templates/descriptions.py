@@ -1,5 +1,8 @@
 get_templates_description = (
-    "Получение доступных шаблонов документов с возможностью поиска"
+    "Получение доступных шаблонов документов с возможностью поиска. "
+    "В режиме relevance запрос ищется по названиям и описанию с учётом "
+    "словоформ и опечаток, результаты упорядочены по релевантности. "
+    "Следующая страница запрашивается по курсору next_cursor (after)"
 )
 get_template_info_description = (
     "Получение детальной информации о шаблоне, включая структуру полей"
@@ -11,3 +14,11 @@ custom_template_description = (
     "Создание документа на основе описания ситуации пользователем"
 )
 download_empty_template_description = "Скачивание незаполненного шаблона"
+template_placeholders_description = (
+    "Перечень плейсхолдеров шаблона: имена, количество вхождений и расположение"
+)
+
+empty_template_description = (
+    "Пустой шаблон для заполнения. Ответ содержит ETag: с заголовком "
+    "If-None-Match неизменившийся шаблон возвращается как 304 без тела"
+)
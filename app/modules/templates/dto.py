@@ -1,3 +1,5 @@
+from typing import Literal
+
 from lawly_db.db_models.enum_models import DocumentStatusEnum
 from pydantic import BaseModel, Field
 
@@ -18,12 +20,21 @@ class TemplateDTO(BaseModel):
 class GetTemplatesResponseDTO(BaseModel):
     total: int = Field(..., description="Общее количество доступных шаблонов")
     templates: list[TemplateDTO] = Field(..., description="Список доступных шаблонов")
+    next_cursor: str | None = Field(
+        None, description="Курсор следующей страницы (нет, если страница последняя)"
+    )
 
 
 class GetTemplateDTO(BaseModel):
     query: str | None = Field(None, description="Поисковый запрос")
     limit: int = Field(20, description="Максимальное количество возвращаемых шаблонов")
     offset: int = Field(0, description="Смещение для пагинации")
+    after: str | None = Field(None, description="Курсор предыдущей страницы")
+    mode: Literal["simple", "relevance"] = Field(
+        "simple",
+        description="Режим поиска: simple - подстрока в названии, relevance - "
+        "полнотекстовый и нечёткий поиск по названиям и описанию по релевантности",
+    )
 
 
 class FieldDTO(BaseModel):
@@ -96,3 +107,21 @@ class DownloadEmptyTemplateDTO(BaseModel):
 
 class CreateCustomTemplateDTO(BaseModel):
     description: str = Field(..., description="Описание шаблона")
+
+
+class PlaceholderDTO(BaseModel):
+    name: str = Field(..., description="Имя плейсхолдера без угловых скобок")
+    count: int = Field(..., description="Количество вхождений в шаблоне")
+    locations: list[Literal["body", "table", "header", "footer"]] = Field(
+        ..., description="Где встречается: основной текст, таблица, колонтитулы"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class TemplatePlaceholdersDTO(BaseModel):
+    template_id: int = Field(..., description="Id шаблона")
+    placeholders: list[PlaceholderDTO] = Field(
+        ..., description="Плейсхолдеры в порядке первого появления"
+    )
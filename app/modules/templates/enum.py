@@ -1,6 +1,10 @@
 from enum import Enum
 
 
+class GetTemplatesEnum(Enum):
+    INVALID_CURSOR = "invalid_cursor"
+
+
 class CreateCustomTemplateEnum(Enum):
     ERROR = "error"
     ACCESS_DENIED = "access_denied"
@@ -10,3 +14,8 @@ class DownloadEmptyTemplateEnum(Enum):
     ERROR = "error"
     ACCESS_DENIED = "access_denied"
     NOT_FOUND = "not_found"
+
+
+class TemplatePlaceholdersEnum(Enum):
+    ERROR = "error"
+    NOT_FOUND = "not_found"
@@ -2,6 +2,7 @@ from modules.templates import GetTemplatesResponseDTO
 from modules.templates.dto import (
     TemplateInfoDto,
     TemplateDownloadDTO,
+    TemplatePlaceholdersDTO,
 )
 from shared import base_response
 
@@ -11,6 +12,7 @@ templates_response = {
         "description": "Список шаблонов документов",
         "model": GetTemplatesResponseDTO,
     },
+    400: {"description": "Некорректный курсор"},
 }
 
 template_info_response = {
@@ -50,6 +52,7 @@ custom_template_response = {
     },
     401: {"description": "Нет доступа к ресурсу"},
     403: {"description": "Недостаточно прав для выполнения"},
+    503: {"description": "Сервис перегружен, повторите запрос позже (Retry-After)"},
 }
 
 download_empty_template = {
@@ -67,4 +70,37 @@ download_empty_template = {
     },
     401: {"description": "Нет доступа к ресурсу"},
     404: {"description": "Шаблон не найден"},
+    503: {"description": "Сервис перегружен, повторите запрос позже (Retry-After)"},
+}
+
+empty_template_response = {
+    **base_response,
+    200: {
+        "description": "Шаблон успешно скачан",
+        "content": {
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document": {
+                "schema": {"type": "string", "format": "binary"}
+            }
+        },
+    },
+    304: {"description": "Шаблон не изменился с версии из If-None-Match"},
+    400: {
+        "description": "Ошибка скачивания шаблона",
+    },
+    404: {"description": "Шаблон не найден"},
+    503: {"description": "Сервис перегружен, повторите запрос позже (Retry-After)"},
+}
+
+template_placeholders_response = {
+    **base_response,
+    200: {
+        "description": "Плейсхолдеры шаблона",
+        "model": TemplatePlaceholdersDTO,
+    },
+    400: {
+        "description": "Ошибка чтения шаблона",
+    },
+    404: {
+        "description": "Шаблон не найден",
+    },
 }
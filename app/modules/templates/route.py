@@ -1,4 +1,6 @@
-from fastapi import APIRouter, status, Query, Depends, Response, Path
+from typing import Literal
+
+from fastapi import APIRouter, status, Query, Depends, Response, Path, Header
 from starlette.responses import StreamingResponse
 
 from api.auth.auth_bearer import JWTHeader, JWTBearer
@@ -19,9 +21,19 @@ from modules.templates import (
     download_empty_template,
     DownloadEmptyTemplateDTO,
     CreateCustomTemplateDTO,
+    template_placeholders_description,
+    TemplatePlaceholdersDTO,
+    template_placeholders_response,
+    empty_template_description,
+    empty_template_response,
 )
 
-from modules.templates.enum import CreateCustomTemplateEnum, DownloadEmptyTemplateEnum
+from modules.templates.enum import (
+    CreateCustomTemplateEnum,
+    DownloadEmptyTemplateEnum,
+    GetTemplatesEnum,
+    TemplatePlaceholdersEnum,
+)
 from services.template_service import TemplateService
 
 router = APIRouter(tags=["Шаблоны"], prefix="/templates")
@@ -39,6 +51,17 @@ async def get_templates(
     query: str | None = Query(None, description="Поисковый запрос"),
     limit: int = Query(20, ge=1, description="Максимум результатов (по умолчанию 20)"),
     offset: int = Query(0, ge=0, description="Смещение для пагинации"),
+    after: str
+    | None = Query(
+        None,
+        description="Курсор предыдущей страницы (next_cursor из ответа); "
+        "страница начинается сразу после него",
+    ),
+    mode: Literal["simple", "relevance"] = Query(
+        "simple",
+        description="Режим поиска: simple - подстрока в названии, relevance - "
+        "полнотекстовый и нечёткий поиск по названиям и описанию",
+    ),
     template_service: TemplateService = Depends(TemplateService),
 ):
     """
@@ -46,8 +69,15 @@ async def get_templates(
     :return: Список доступных шаблонов
     """
     result = await template_service.get_templates_service(
-        template_dto=GetTemplateDTO(query=query, limit=limit, offset=offset)
+        template_dto=GetTemplateDTO(
+            query=query, limit=limit, offset=offset, after=after, mode=mode
+        )
     )
+    if result == GetTemplatesEnum.INVALID_CURSOR:
+        return Response(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Некорректный курсор",
+        )
     return result
 
 
@@ -104,6 +134,75 @@ async def download_template(
     return result
 
 
+@router.get(
+    "/{template_id}/placeholders",
+    summary="Получение плейсхолдеров шаблона",
+    description=template_placeholders_description,
+    response_model=TemplatePlaceholdersDTO,
+    responses=template_placeholders_response,
+    status_code=status.HTTP_200_OK,
+)
+async def get_template_placeholders(
+    template_id: int = Path(..., description="Идентификатор шаблона"),
+    template_service: TemplateService = Depends(TemplateService),
+):
+    """
+    Получение плейсхолдеров шаблона
+    :param template_id: ID шаблона
+    :return: Плейсхолдеры шаблона
+    """
+    result = await template_service.get_template_placeholders_service(
+        template_id=template_id
+    )
+    if result == TemplatePlaceholdersEnum.ERROR:
+        return Response(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Ошибка чтения шаблона",
+        )
+    if result == TemplatePlaceholdersEnum.NOT_FOUND:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND, content="Шаблон не найден"
+        )
+    return result
+
+
+@router.get(
+    "/{template_id}/empty",
+    summary="Получение пустого шаблона",
+    description=empty_template_description,
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses=empty_template_response,
+)
+async def get_empty_template(
+    template_id: int = Path(..., description="Идентификатор шаблона"),
+    if_none_match: str | None = Header(None),
+    template_service: TemplateService = Depends(TemplateService),
+):
+    """
+    Получение пустого шаблона. Условный запрос поддерживается только здесь:
+    для POST несовпадение If-None-Match по RFC 9110 означает 412, а не 304
+    :param template_id: ID шаблона
+    :param if_none_match: ETag уже скачанной версии
+    :return: файл или 304, если у клиента актуальная версия
+    """
+    result = await template_service.download_empty_template(
+        download_empty_template_dto=DownloadEmptyTemplateDTO(template_id=template_id),
+        if_none_match=if_none_match,
+    )
+    if result == DownloadEmptyTemplateEnum.ERROR:
+        return Response(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Ошибка скачивания шаблона",
+        )
+    if result == DownloadEmptyTemplateEnum.NOT_FOUND:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Шаблон не найден",
+        )
+    return result
+
+
 @router.post(
     "/custom",
     summary="Создание кастомного шаблона",
@@ -161,7 +260,7 @@ async def download_empty_template(
     :return:
     """
     result = await template_service.download_empty_template(
-        download_empty_template_dto=download_empty_template_dto
+        download_empty_template_dto=download_empty_template_dto,
     )
     if result == DownloadEmptyTemplateEnum.ERROR:
         return Response(
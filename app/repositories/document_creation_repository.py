@@ -1,5 +1,7 @@
+from datetime import datetime
+
 from lawly_db.db_models import DocumentCreation
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from repositories.base_repository import BaseRepository
@@ -25,3 +27,21 @@ class DocumentCreationRepository(BaseRepository):
         )
         _ = await self.session.execute(query)
         return _.scalar()
+
+    async def get_popular_template_ids(self, since: datetime, limit: int) -> list[int]:
+        """
+        Возвращает шаблоны, по которым чаще всего создавали документы
+        :param since: учитываются документы, начатые после этой даты
+        :param limit: количество шаблонов
+        :return: ID шаблонов по убыванию популярности
+        """
+        count = func.count(self.model.id)
+        query = (
+            select(self.model.template_id)
+            .where(self.model.start_date >= since)
+            .group_by(self.model.template_id)
+            .order_by(count.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
@@ -1,8 +1,21 @@
+from typing import AsyncIterator, Sequence
+
 from lawly_db.db_models import Document
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from repositories.base_repository import BaseRepository
+from utils.cursor import (
+    SortKey,
+    decode_cursor,
+    encode_cursor,
+    keyset_after,
+    keyset_order,
+)
+
+DOCUMENT_SORT = "name_ru"
+# Строк в одной пачке выгрузки
+EXPORT_BATCH_SIZE = 1000
 
 
 class DocumentRepository(BaseRepository):
@@ -11,14 +24,75 @@ class DocumentRepository(BaseRepository):
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_all_documents(self) -> list[model]:
+    def _sort_keys(self) -> list[SortKey]:
+        # Документы упорядочены по названию, id делает порядок однозначным
+        return [(self.model.name_ru, False), (self.model.id, False)]
+
+    def _listing_columns(self) -> tuple:
+        # Только колонки, которые отдаются в списке документов
+        return (
+            self.model.id,
+            self.model.name,
+            self.model.name_ru,
+            self.model.is_personal,
+            self.model.link,
+            self.model.description,
+        )
+
+    async def get_all_documents(
+        self, limit: int | None = None, offset: int = 0, after: str | None = None
+    ) -> tuple[list[Row], str | None]:
         """
-        Возвращает все документы
-        :return: список документов
+        Возвращает документы по названию: все или страницу. Выбираются только
+        колонки списка, строки возвращаются без создания объектов модели
+        :param limit: размер страницы (None - все документы)
+        :param offset: смещение
+        :param after: курсор предыдущей страницы; страница начинается сразу
+        после него, смещение отсчитывается от курсора
+        :return: строки документов и курсор следующей страницы (None, если
+        страница последняя)
+        :raises InvalidCursorError: курсор повреждён или выдан для другой
+        сортировки
         """
-        query = select(self.model)
+        keys = self._sort_keys()
+        query = (
+            select(*self._listing_columns())
+            .order_by(*keyset_order(keys))
+            .offset(offset)
+        )
+        if after is not None:
+            query = query.where(
+                keyset_after(keys, decode_cursor(after, DOCUMENT_SORT, len(keys)))
+            )
+        if limit is not None:
+            # Лишняя строка показывает, есть ли следующая страница
+            query = query.limit(limit + 1)
+
         result = await self.session.execute(query)
-        return list(result.scalars().all())
+        documents = list(result.all())
+        if limit is None or len(documents) <= limit:
+            return documents, None
+        documents = documents[:limit]
+        last = documents[-1]
+        return documents, encode_cursor(DOCUMENT_SORT, [last.name_ru, last.id])
+
+    async def stream_documents(
+        self, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Все документы по названию пачками, без загрузки таблицы целиком:
+        строки читаются серверным курсором
+        :param batch_size: строк в пачке
+        :return: пачки строк документов
+        """
+        query = (
+            select(*self._listing_columns())
+            .order_by(*keyset_order(self._sort_keys()))
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(query)
+        async for rows in result.partitions():
+            yield rows
 
     async def get_document_by_id(self, document_id: int) -> model | None:
         """
@@ -1,28 +1,78 @@
-from datetime import datetime
-from typing import Union
+import asyncio
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import AsyncIterable, AsyncIterator, Union
 
 import aioboto3
-import boto3
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
 from pydantic import BaseModel, ConfigDict
 from urllib.parse import urlparse
 from aiohttp import ClientResponse
 
 from config import settings
 
+# Минимальный размер части multipart upload в S3 (кроме последней)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
 
 class S3Object(BaseModel):
     """
     A Pydantic model representing an S3 object.
 
     Attributes:
-        body (bytes): The content of the S3 object.
+        body (bytes | memoryview): The content of the S3 object. A memoryview
+            (e.g. over a read-only mmap) is kept as is, without copying.
+        content_type (str): The MIME type of the S3 object.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    body: bytes | memoryview
+    content_type: str
+
+
+class S3ObjectStream(BaseModel):
+    """
+    A Pydantic model representing a streamed S3 object (or a range of it).
+
+    Attributes:
+        chunks (AsyncIterator[bytes]): The content, read from S3 as it is
+            consumed. The underlying response is released when the iterator
+            is exhausted or closed.
         content_type (str): The MIME type of the S3 object.
+        content_length (int): The length of the returned content (the range
+            length for ranged reads).
+        etag (str | None): The ETag of the S3 object.
+        content_range (str | None): The Content-Range of a ranged read.
     """
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
-    body: bytes
+    chunks: AsyncIterator[bytes]
     content_type: str
+    content_length: int
+    etag: str | None = None
+    content_range: str | None = None
+
+
+class S3ObjectHead(BaseModel):
+    """
+    A Pydantic model representing S3 object metadata from a HEAD request.
+
+    Attributes:
+        etag (str | None): The ETag of the S3 object.
+        content_type (str | None): The MIME type of the S3 object.
+        content_length (int): The size of the S3 object.
+        last_modified (str | None): The Last-Modified date in HTTP format.
+    """
+
+    etag: str | None = None
+    content_type: str | None = None
+    content_length: int
+    last_modified: str | None = None
 
 
 class S3ObjectLocation(BaseModel):
@@ -34,53 +84,200 @@ class S3Client:
     """
     A client for interacting with S3.
 
-    This client provides methods for getting and uploading objects to S3.
+    An instance holds one long-lived low-level S3 client with its own
+    connection pool. It is started and closed by the app lifespan, so
+    credentials are resolved and connections are opened once instead of on
+    every call. The static methods are thin wrappers over the shared
+    instance ``s3_client``.
+
+    Args:
+        endpoint_url (str): The S3 endpoint.
+        access_key (str): The access key.
+        secret_key (str): The secret key.
+        max_pool_connections (int): The size of the connection pool.
+        connect_timeout (float): The connect timeout, in seconds.
+        read_timeout (float): The read timeout, in seconds.
+        max_attempts (int): The number of attempts per request.
+        chunk_size (int): The chunk size for streamed downloads, in bytes.
+        part_size (int): The part size for multipart uploads, in bytes.
+        part_concurrency (int): How many parts are uploaded at once.
     """
 
-    @staticmethod
-    async def get_object(bucket: str, key: str) -> S3Object | None:
+    def __init__(
+        self,
+        endpoint_url: str,
+        access_key: str,
+        secret_key: str,
+        max_pool_connections: int,
+        connect_timeout: float,
+        read_timeout: float,
+        max_attempts: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        part_size: int = MIN_PART_SIZE,
+        part_concurrency: int = 4,
+    ):
+        self._endpoint_url = endpoint_url
+        self._chunk_size = chunk_size
+        self._part_size = max(part_size, MIN_PART_SIZE)
+        self._part_concurrency = max(part_concurrency, 1)
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._config = AioConfig(
+            signature_version='s3v4',
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'max_attempts': max_attempts, 'mode': 'standard'},
+        )
+        self._client = None
+        self._exit_stack: AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._client is not None
+
+    async def start(self) -> None:
         """
-        Get an object from S3.
+        Open the low-level client and its connection pool.
+        """
+        async with self._lock:
+            if self._client is not None:
+                return
+            exit_stack = AsyncExitStack()
+            self._client = await exit_stack.enter_async_context(
+                aioboto3.Session().client(
+                    's3',
+                    endpoint_url=self._endpoint_url,
+                    config=self._config,
+                    aws_access_key_id=self._access_key,
+                    aws_secret_access_key=self._secret_key,
+                    verify=False,
+                )
+            )
+            self._exit_stack = exit_stack
 
-        This method retrieves an object from S3 and returns it as an S3Object.
+    async def close(self) -> None:
+        """
+        Close the client and release its connections.
+        """
+        async with self._lock:
+            if self._exit_stack is None:
+                return
+            exit_stack, self._exit_stack, self._client = self._exit_stack, None, None
+            await exit_stack.aclose()
+
+    async def client(self):
+        """
+        The low-level client. Started on first use outside the app lifespan.
+        """
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    async def get(self, bucket: str, key: str) -> S3Object | None:
+        """
+        Get an object from S3.
 
         Args:
             bucket (str): The name of the S3 bucket.
             key (str): The key of the S3 object.
 
         Returns:
-            S3Object: The retrieved S3 object.
-        """
-        session = aioboto3.Session()
-        async with session.resource(
-            's3',
-            endpoint_url=settings.s3_settings.endpoint_url,
-            config=boto3.session.Config(signature_version='s3v4'),
-            aws_access_key_id=settings.s3_settings.access_key,
-            aws_secret_access_key=settings.s3_settings.secret_key,
-            verify=False,
-        ) as s3:
-            bucket = await s3.Bucket(bucket)
-            obj = await bucket.Object(key)
-            try:
-                content: dict[
-                    str, Union[str, ClientResponse, dict, datetime]
-                ] = await obj.get()
-            except s3.meta.client.exceptions.NoSuchKey:
-                return None
+            S3Object: The retrieved S3 object, or None if there is no such key.
+        """
+        client = await self.client()
+        try:
+            content: dict[
+                str, Union[str, ClientResponse, dict, datetime]
+            ] = await client.get_object(Bucket=bucket, Key=key)
+        except client.exceptions.NoSuchKey:
+            return None
+        async with content["Body"] as body:
             return S3Object(
-                body=await content.get("Body").read(),
+                body=await body.read(),
                 content_type=content.get("ContentType"),
             )
 
-    @staticmethod
-    async def upload_object(
-        bucket: str, key: str, data: bytes, content_type: str
-    ) -> None:
+    async def head(self, bucket: str, key: str) -> S3ObjectHead | None:
         """
-        Upload an object to S3.
+        Get object metadata from S3 without its content.
+
+        Args:
+            bucket (str): The name of the S3 bucket.
+            key (str): The key of the S3 object.
+
+        Returns:
+            S3ObjectHead: The object metadata, or None if there is no such key.
+        """
+        client = await self.client()
+        try:
+            content = await client.head_object(Bucket=bucket, Key=key)
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        last_modified = content.get("LastModified")
+        return S3ObjectHead(
+            etag=content.get("ETag"),
+            content_type=content.get("ContentType"),
+            content_length=content.get("ContentLength"),
+            last_modified=(
+                format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+                if last_modified
+                else None
+            ),
+        )
+
+    async def stream(
+        self,
+        bucket: str,
+        key: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> S3ObjectStream | None:
+        """
+        Stream an object (or a byte range of it) from S3 without reading it
+        into memory.
 
-        This method uploads an object to S3.
+        Args:
+            bucket (str): The name of the S3 bucket.
+            key (str): The key of the S3 object.
+            start (int | None): The first byte of the range.
+            end (int | None): The last byte of the range, inclusive.
+
+        Returns:
+            S3ObjectStream: The streamed object, or None if there is no such key.
+        """
+        client = await self.client()
+        params = {"Bucket": bucket, "Key": key}
+        if start is not None or end is not None:
+            params["Range"] = f"bytes={start or 0}-{'' if end is None else end}"
+        try:
+            content = await client.get_object(**params)
+        except client.exceptions.NoSuchKey:
+            return None
+
+        async def chunks() -> AsyncIterator[bytes]:
+            body = content["Body"]
+            try:
+                async for chunk in body.iter_chunks(self._chunk_size):
+                    yield chunk
+            finally:
+                # Недочитанный ответ не возвращается в пул
+                body.close()
+
+        return S3ObjectStream(
+            chunks=chunks(),
+            content_type=content.get("ContentType"),
+            content_length=content.get("ContentLength"),
+            etag=content.get("ETag"),
+            content_range=content.get("ContentRange"),
+        )
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str) -> None:
+        """
+        Upload an object to S3.
 
         Args:
             bucket (str): The name of the S3 bucket.
@@ -88,45 +285,150 @@ class S3Client:
             data (bytes): The content of the S3 object.
             content_type (str): The MIME type of the S3 object.
         """
-        session = aioboto3.Session()
-        async with session.resource(
-            's3',
-            endpoint_url=settings.s3_settings.endpoint_url,
-            config=boto3.session.Config(signature_version='s3v4'),
-            aws_access_key_id=settings.s3_settings.access_key,
-            aws_secret_access_key=settings.s3_settings.secret_key,
-            verify=False,
-        ) as s3:
-            bucket = await s3.Bucket(bucket)
-            await bucket.put_object(Key=key, Body=data, ContentType=content_type)
+        client = await self.client()
+        await client.put_object(
+            Bucket=bucket, Key=key, Body=data, ContentType=content_type
+        )
 
-    @staticmethod
-    async def delete_object(bucket: str, key: str) -> bool:
+    async def put_stream(
+        self,
+        bucket: str,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        part_size: int | None = None,
+        part_concurrency: int | None = None,
+    ) -> None:
         """
-        Delete an object from S3.
+        Upload an object to S3 from an async byte stream.
 
-        This method deletes an object from S3.
+        The stream is cut into parts of part_size bytes that are uploaded as a
+        multipart upload, at most part_concurrency at a time, so no more than
+        about part_size * (part_concurrency + 1) bytes are held in memory. A
+        stream shorter than one part is uploaded with a single put_object.
+        A failed upload is aborted so that no parts are left behind.
 
         Args:
             bucket (str): The name of the S3 bucket.
             key (str): The key of the S3 object.
+            chunks (AsyncIterable[bytes]): The content of the S3 object.
+            content_type (str): The MIME type of the S3 object.
+            part_size (int | None): The part size, at least 5 MB.
+            part_concurrency (int | None): How many parts are uploaded at once.
         """
-        session = aioboto3.Session()
-        async with session.resource(
-            's3',
-            endpoint_url=settings.s3_settings.endpoint_url,
-            config=boto3.session.Config(signature_version='s3v4'),
-            aws_access_key_id=settings.s3_settings.access_key,
-            aws_secret_access_key=settings.s3_settings.secret_key,
-            verify=False,
-        ) as s3:
-            bucket = await s3.Bucket(bucket)
-            try:
-                await (await bucket.Object(key)).delete()
-            except s3.meta.client.exceptions.NoSuchKey:
-                return False
+        part_size = max(part_size or self._part_size, MIN_PART_SIZE)
+        part_concurrency = max(part_concurrency or self._part_concurrency, 1)
+        client = await self.client()
+
+        upload_id = None
+        parts: dict[int, str] = {}
+        pending: set[asyncio.Task] = set()
+        submitted = 0
+
+        async def upload_part(number: int, data: bytes) -> None:
+            response = await client.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=data,
+            )
+            parts[number] = response["ETag"]
+
+        async def submit(data: bytes) -> None:
+            nonlocal upload_id, submitted
+            if upload_id is None:
+                upload = await client.create_multipart_upload(
+                    Bucket=bucket, Key=key, ContentType=content_type
+                )
+                upload_id = upload["UploadId"]
+            # Не больше part_concurrency частей в работе: ждём освобождения
+            if len(pending) >= part_concurrency:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.difference_update(done)
+                for task in done:
+                    task.result()
+            submitted += 1
+            pending.add(asyncio.create_task(upload_part(submitted, data)))
+
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                while len(buffer) >= part_size:
+                    await submit(bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+
+            if upload_id is None:
+                await client.put_object(
+                    Bucket=bucket, Key=key, Body=bytes(buffer), ContentType=content_type
+                )
+                return
+
+            if buffer:
+                await submit(bytes(buffer))
+            await asyncio.gather(*pending)
+            await client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": number, "ETag": parts[number]}
+                        for number in sorted(parts)
+                    ]
+                },
+            )
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if upload_id is not None:
+                await client.abort_multipart_upload(
+                    Bucket=bucket, Key=key, UploadId=upload_id
+                )
+            raise
+
+    async def delete(self, bucket: str, key: str) -> bool:
+        """
+        Delete an object from S3.
+
+        Args:
+            bucket (str): The name of the S3 bucket.
+            key (str): The key of the S3 object.
+        """
+        client = await self.client()
+        try:
+            await client.delete_object(Bucket=bucket, Key=key)
+        except client.exceptions.NoSuchKey:
+            return False
         return True
 
+    @staticmethod
+    async def get_object(bucket: str, key: str) -> S3Object | None:
+        """
+        Get an object from S3 through the shared client.
+        """
+        return await s3_client.get(bucket, key)
+
+    @staticmethod
+    async def upload_object(
+        bucket: str, key: str, data: bytes, content_type: str
+    ) -> None:
+        """
+        Upload an object to S3 through the shared client.
+        """
+        await s3_client.put(bucket, key, data, content_type)
+
+    @staticmethod
+    async def delete_object(bucket: str, key: str) -> bool:
+        """
+        Delete an object from S3 through the shared client.
+        """
+        return await s3_client.delete(bucket, key)
+
     @staticmethod
     def from_url(url: str) -> S3ObjectLocation:
         parsed_url = urlparse(url)
@@ -139,3 +441,17 @@ class S3Client:
         key = path_parts[1]
 
         return S3ObjectLocation(bucket=bucket, key=key)
+
+
+s3_client = S3Client(
+    endpoint_url=settings.s3_settings.endpoint_url,
+    access_key=settings.s3_settings.access_key,
+    secret_key=settings.s3_settings.secret_key,
+    max_pool_connections=settings.s3_settings.max_pool_connections,
+    connect_timeout=settings.s3_settings.connect_timeout,
+    read_timeout=settings.s3_settings.read_timeout,
+    max_attempts=settings.s3_settings.max_attempts,
+    chunk_size=settings.s3_settings.chunk_size,
+    part_size=settings.s3_settings.part_size,
+    part_concurrency=settings.s3_settings.part_concurrency,
+)
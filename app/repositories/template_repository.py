@@ -1,45 +1,211 @@
-from lawly_db.db_models import Template
-from sqlalchemy import select, func
+from typing import Literal
+
+from lawly_db.db_models import Document, Template
+from sqlalchemy import ColumnElement, literal_column, or_, select, func, text
+from sqlalchemy.dialects.postgresql import REAL, TSVECTOR
+from sqlalchemy.orm import lazyload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from repositories.base_repository import BaseRepository
+from utils.cursor import (
+    SortKey,
+    decode_cursor,
+    encode_cursor,
+    keyset_after,
+    keyset_order,
+)
+
+# simple - подстрока в name_ru (ILIKE), relevance - полнотекстовый поиск по
+# названиям и описанию с учётом морфологии и нечёткое совпадение названий
+TemplateSearchMode = Literal["simple", "relevance"]
+
+# Конфигурация полнотекстового поиска и индексируемый документ шаблона: вес
+# совпадения в названии выше, чем в описании. Выражение должно в точности
+# совпадать с выражением индекса, иначе индекс не используется. Индексы
+# поиска (ix_templates_search_document, ix_templates_name_ru_trgm,
+# ix_templates_name_trgm) и расширение pg_trgm создаются миграцией lawly_db
+SEARCH_CONFIG = "russian"
+SEARCH_DOCUMENT = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name_ru, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'D')"
+)
+
+# Название сортировки в курсоре. Ключ всегда из трёх значений, есть pg_trgm
+# или нет, поэтому курсор одного воркера принимается остальными
+RELEVANCE_SORT = "relevance"
 
 
 class TemplateRepository(BaseRepository):
     model = Template
+    # Установлено ли расширение pg_trgm (проверяется при старте приложения)
+    trigram_available = False
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_templates(
-        self, query: str | None, limit: int, offset: int
-    ) -> list[model]:
+    async def detect_trigram(self) -> bool:
         """
-        Возвращает список шаблонов документов по поисковому запросу
+        Проверяет, установлено ли расширение pg_trgm. Только чтение: расширение
+        и индексы создаёт миграция, без расширения поиск обходится
+        полнотекстовым и подстрокой
+        :return: доступен ли нечёткий поиск
         """
-        stmt = select(self.model)
+        try:
+            result = await self.session.execute(
+                text(
+                    "SELECT EXISTS "
+                    "(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+                )
+            )
+            available = bool(result.scalar())
+        except Exception:
+            await self.session.rollback()
+            available = False
+        TemplateRepository.trigram_available = available
+        return available
+
+    @staticmethod
+    def _search_document() -> ColumnElement:
+        return literal_column(f"({SEARCH_DOCUMENT})", type_=TSVECTOR)
+
+    def _catalog_filter(
+        self, query: str | None, mode: TemplateSearchMode = "simple"
+    ) -> list:
+        """
+        Условия выборки общих шаблонов каталога по поисковому запросу,
+        одинаковые для списка и для количества
+        """
+        conditions = [self.model.user_id.is_(None)]
+        if not query:
+            return conditions
+
+        substring = func.lower(self.model.name_ru).ilike(f"%{query.lower()}%")
+        if mode == "simple":
+            conditions.append(substring)
+            return conditions
+
+        # Подстрока остаётся запасным вариантом: совпадение по ней не теряется
+        matches = [
+            substring,
+            self._search_document().op("@@")(self._search_query(query)),
+        ]
+        if self.trigram_available:
+            matches += [
+                func.lower(self.model.name_ru).op("%")(query.lower()),
+                func.lower(self.model.name).op("%")(query.lower()),
+            ]
+        conditions.append(or_(*matches))
+        return conditions
 
-        if query:
-            stmt = stmt.where(
-                func.lower(self.model.name_ru).ilike(f"%{query.lower()}%"),
-                self.model.user_id.is_(None),
+    @staticmethod
+    def _search_query(query: str) -> ColumnElement:
+        # Конфигурация - константа, а не параметр запроса, как и в индексе
+        return func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), query
+        )
+
+    def _sort_keys(
+        self, query: str | None, mode: TemplateSearchMode
+    ) -> tuple[str, list[SortKey]]:
+        """
+        Ключ сортировки списка: по id или, в режиме relevance, по рангу
+        полнотекстового совпадения, затем по похожести названия на запрос
+        :return: название сортировки и ключ
+        """
+        if not query or mode != "relevance":
+            return "id", [(self.model.id, False)]
+
+        keys = [
+            (
+                func.ts_rank(
+                    self._search_document(), self._search_query(query), type_=REAL
+                ),
+                True,
             )
+        ]
+        # Без pg_trgm похожесть - константа: порядок тот же, а форма ключа и
+        # курсора не зависит от расширения
+        similarity = (
+            func.similarity(func.lower(self.model.name_ru), query.lower(), type_=REAL)
+            if self.trigram_available
+            else literal_column("0::real", type_=REAL)
+        )
+        keys.append((similarity, True))
+        keys.append((self.model.id, False))
+        return RELEVANCE_SORT, keys
 
-        stmt = stmt.limit(limit).offset(offset)
+    async def get_templates_with_total(
+        self,
+        query: str | None,
+        limit: int,
+        offset: int,
+        mode: TemplateSearchMode = "simple",
+        after: str | None = None,
+    ) -> tuple[list[model], int, str | None]:
+        """
+        Возвращает страницу шаблонов и общее количество по поисковому запросу.
+        Без курсора это один запрос: количество считается оконной функцией по
+        той же выборке. В режиме relevance шаблоны упорядочены по релевантности
+        :param after: курсор предыдущей страницы; страница начинается сразу
+        после него, смещение отсчитывается от курсора
+        :return: шаблоны страницы, общее количество и курсор следующей страницы
+        (None, если страница последняя)
+        :raises InvalidCursorError: курсор повреждён или выдан для другой
+        сортировки
+        """
+        sort, keys = self._sort_keys(query, mode)
+        conditions = self._catalog_filter(query, mode)
+        if after is not None:
+            conditions.append(keyset_after(keys, decode_cursor(after, sort, len(keys))))
+
+        total = func.count().over().label("total")
+        stmt = (
+            select(
+                self.model,
+                total,
+                *(
+                    expression.label(f"key{i}")
+                    for i, (expression, _) in enumerate(keys)
+                ),
+            )
+            .where(*conditions)
+            # Поля шаблона в списке не нужны, не догружаем их отдельным запросом
+            .options(lazyload(self.model.fields))
+            .order_by(*keyset_order(keys))
+            # Лишняя строка показывает, есть ли следующая страница
+            .limit(limit + 1)
+            .offset(offset)
+        )
 
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1][2:])
+
+        if after is not None or not rows:
+            # После курсора окно видит только оставшиеся строки, а за концом
+            # выборки строк нет вовсе, поэтому количество считаем отдельно
+            total_count = (
+                await self.get_total_documents(query, mode)
+                if after is not None or offset
+                else 0
+            )
+        else:
+            total_count = int(rows[0].total)
+        return [row[0] for row in rows], total_count, next_cursor
 
-    async def get_total_documents(self, query: str | None) -> int:
+    async def get_total_documents(
+        self, query: str | None, mode: TemplateSearchMode = "simple"
+    ) -> int:
         """
         Возвращает общее количество документов по поисковому запросу
         """
-        stmt = select(func.count(self.model.id))
-
-        if query:
-            stmt = stmt.where(
-                func.lower(self.model.name_ru).ilike(f"%{query.lower()}%")
-            )
+        stmt = select(func.count(self.model.id)).where(
+            *self._catalog_filter(query, mode)
+        )
 
         result = await self.session.execute(stmt)
         return int(result.scalar())
@@ -54,6 +220,39 @@ class TemplateRepository(BaseRepository):
         result = await self.session.execute(query)
         return result.scalar()
 
+    async def get_template_info_by_id(self, template_id: int) -> model | None:
+        """
+        Возвращает шаблон документа по ID вместе с полями, связанными
+        документами и полями этих документов. Каждый уровень загружается одним
+        запросом, поэтому количество запросов не зависит от количества полей
+        """
+        field_model = self.model.fields.property.mapper.class_
+        query = (
+            select(self.model)
+            .where(self.model.id == template_id, self.model.user_id.is_(None))
+            .options(
+                selectinload(self.model.fields)
+                .selectinload(field_model.document)
+                .selectinload(Document.fields)
+            )
+            # Объекты из сессии перечитываются, а не берутся устаревшими
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(query)
+        return result.scalar()
+
+    async def get_templates_by_ids(self, template_ids: list[int]) -> list[model]:
+        """
+        Возвращает шаблоны документов по списку ID
+        """
+        if not template_ids:
+            return []
+        query = select(self.model).where(
+            self.model.id.in_(template_ids), self.model.user_id.is_(None)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def create(self, entity: model):
         """
         Создает новый шаблон документа
@@ -1,13 +1,16 @@
+import asyncio
 from datetime import datetime
+from typing import AsyncIterator, Iterable
+from urllib.parse import quote
 
 from fastapi import Depends
-from aiohttp import ClientSession
 from lawly_db.db_models import DocumentCreation
 from lawly_db.db_models.db_session import get_session
 from lawly_db.db_models.enum_models import DocumentStatusEnum
 from protos.ai_service.client import AIAssistantClient
 from protos.ai_service.dto import AIRequestDTO
 from protos.user_service.client import UserServiceClient
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
 
@@ -20,10 +23,12 @@ from modules.documents import (
     DocumentStructureDTO,
     ImprovedTextResponseDTO,
     GenerateDocumentDTO,
+    GenerateDocumentBatchDTO,
 )
 from modules.documents.dto import ImproveTextWithUserIDDTO
 from modules.documents.enum import (
     DocumentUpdateEnum,
+    GetDocumentsEnum,
     ImproveTextEnum,
     GenerateDocumentEnum,
 )
@@ -31,8 +36,15 @@ from repositories.document_creation_repository import DocumentCreationRepository
 from repositories.document_repository import DocumentRepository
 from repositories.s3_repository import S3Object
 from repositories.template_repository import TemplateRepository
+from services.template_source import get_template_object
+from utils.cursor import InvalidCursorError
+from utils.placeholder_index import placeholder_index_cache
+from utils.render_scheduler import RenderRejectedError
 from utils.word_template_processor import WordTemplateProcessor
 
+# Заголовок ответа со списком полей запроса, которых нет в шаблоне
+IGNORED_FIELDS_HEADER = "X-Ignored-Fields"
+
 
 class DocumentService:
     def __init__(self, session: AsyncSession = Depends(get_session)):
@@ -82,17 +94,50 @@ class DocumentService:
             document, from_attributes=True
         )
 
-    async def get_all_documents_service(self) -> list[DocumentDto]:
+    async def get_all_documents_service(
+        self, limit: int | None = None, offset: int = 0, after: str | None = None
+    ) -> tuple[list[DocumentDto], str | None] | GetDocumentsEnum:
+        """
+        Получает документы: все или страницу
+        :param limit: размер страницы (None - все документы)
+        :param offset: смещение
+        :param after: курсор предыдущей страницы
+        :return: список документов и курсор следующей страницы
+        """
+        try:
+            documents, next_cursor = await self.document_repo.get_all_documents(
+                limit=limit, offset=offset, after=after
+            )
+        except InvalidCursorError:
+            return GetDocumentsEnum.INVALID_CURSOR
+        return [self._document_dto(row) for row in documents], next_cursor
+
+    @staticmethod
+    def _document_dto(row: Row) -> DocumentDto:
+        # Значения взяты прямо из колонок таблицы и уже нужных типов, поэтому
+        # DTO собирается из строки без повторной валидации
+        return DocumentDto.model_construct(**row._mapping)
+
+    def export_documents_service(self) -> StreamingResponse:
         """
-        Получает все документы пользователя
-        :param user_id: ID пользователя
-        :return: список документов
+        Выгрузка всех документов в формате JSON Lines: по документу на строку.
+        Ответ отдаётся по мере чтения из базы
+        :return: потоковый ответ
         """
-        documents = await self.document_repo.get_all_documents()
-        return [
-            DocumentDto.model_validate(document, from_attributes=True)
-            for document in documents
-        ]
+        return StreamingResponse(
+            self._export_lines(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="documents.jsonl"'},
+        )
+
+    async def _export_lines(self) -> AsyncIterator[str]:
+        # Сессия запроса закрывается до отправки тела ответа, поэтому выгрузка
+        # читает через свою сессию на том же движке
+        async with AsyncSession(self.session.bind) as session:
+            async for rows in DocumentRepository(session).stream_documents():
+                yield "".join(
+                    self._document_dto(row).model_dump_json() + "\n" for row in rows
+                )
 
     async def get_document_structure_service(
         self, document_id: int
@@ -135,6 +180,35 @@ class DocumentService:
             return ImproveTextEnum.ERROR
         return ImprovedTextResponseDTO(improved_text=improved_text.assistant_reply)
 
+    @staticmethod
+    async def _unknown_fields(
+        template_key: str, document_s3_obj: S3Object, field_names: Iterable[str]
+    ) -> list[str]:
+        """
+        Поля запроса, которых нет в шаблоне. Клиенты заполняют запрос полями
+        всех связанных документов, поэтому такие поля не ошибка: они
+        игнорируются и перечисляются в заголовке ответа
+        :param template_key: хэш содержимого шаблона
+        :param document_s3_obj: шаблон
+        :param field_names: имена полей запроса
+        :return: имена полей, которых нет в шаблоне
+        """
+        loop = asyncio.get_event_loop()
+        index = await loop.run_in_executor(
+            None,
+            placeholder_index_cache.get_by_key,
+            template_key,
+            lambda: document_s3_obj.body,
+        )
+        return index.unknown(field_names)
+
+    @staticmethod
+    def _report_ignored_fields(response: StreamingResponse, names: list[str]) -> None:
+        if names:
+            response.headers[IGNORED_FIELDS_HEADER] = ",".join(
+                quote(name) for name in names
+            )
+
     async def generate_document_service(
         self, generate_document_dto: GenerateDocumentDTO
     ) -> StreamingResponse | GenerateDocumentEnum:
@@ -144,19 +218,61 @@ class DocumentService:
         :return:
         """
         try:
-            template = await self.template_repo.get_template_by_id(
-                template_id=generate_document_dto.template_id
+            template = await get_template_object(
+                self.template_repo, template_id=generate_document_dto.template_id
+            )
+            if not template:
+                return GenerateDocumentEnum.NOT_FOUND
+            template_key, document_s3_obj = template
+            unknown = await self._unknown_fields(
+                template_key,
+                document_s3_obj,
+                (field.name for field in generate_document_dto.fields),
+            )
+            response = await WordTemplateProcessor.fill_template(
+                s3_object=document_s3_obj,
+                fields=generate_document_dto.fields,
+                template_key=template_key,
+            )
+            self._report_ignored_fields(response, unknown)
+            return response
+        except RenderRejectedError:
+            raise
+        except Exception:
+            return GenerateDocumentEnum.ERROR
+
+    async def generate_document_batch_service(
+        self, generate_document_batch_dto: GenerateDocumentBatchDTO
+    ) -> StreamingResponse | GenerateDocumentEnum:
+        """
+        Генерирует пакет документов по одному шаблону
+        :param generate_document_batch_dto: DTO для пакетной генерации документов
+        :return: ZIP-архив с документами
+        """
+        try:
+            template = await get_template_object(
+                self.template_repo, template_id=generate_document_batch_dto.template_id
             )
             if not template:
                 return GenerateDocumentEnum.NOT_FOUND
-            async with ClientSession() as session:
-                async with session.get(template.download_url) as resp:
-                    document_s3_obj = await resp.read()
-            document_s3_obj = S3Object(
-                body=document_s3_obj, content_type="application/octet-stream"
+            template_key, document_s3_obj = template
+            unknown = await self._unknown_fields(
+                template_key,
+                document_s3_obj,
+                (
+                    field.name
+                    for document in generate_document_batch_dto.documents
+                    for field in document.fields
+                ),
             )
-            return await WordTemplateProcessor.fill_template(
-                s3_object=document_s3_obj, fields=generate_document_dto.fields
+            response = await WordTemplateProcessor.fill_template_batch(
+                s3_object=document_s3_obj,
+                documents=generate_document_batch_dto.documents,
+                template_key=template_key,
             )
+            self._report_ignored_fields(response, unknown)
+            return response
+        except RenderRejectedError:
+            raise
         except Exception:
             return GenerateDocumentEnum.ERROR
@@ -0,0 +1,52 @@
+from modules.metrics import (
+    HttpClientMetricsDTO,
+    MemoryBudgetMetricsDTO,
+    MetricsDTO,
+    RenderPoolMetricsDTO,
+    RenderedCacheMetricsDTO,
+    RenderSchedulerMetricsDTO,
+    TemplatePrewarmMetricsDTO,
+    TemplateStoreMetricsDTO,
+)
+from utils.http_client import http_client
+from utils.memory_budget import memory_budget
+from utils.render_pool import render_pool
+from utils.render_scheduler import render_scheduler
+from utils.rendered_cache import rendered_document_cache
+from utils.template_prewarm import template_prewarmer
+from utils.template_store import template_blob_store
+
+
+class MetricsService:
+    def get_metrics_service(self) -> MetricsDTO:
+        """
+        Собирает метрики компонентов сервиса
+        :return: метрики
+        """
+        return MetricsDTO(
+            render_pool=(
+                RenderPoolMetricsDTO.model_validate(
+                    render_pool.metrics(), from_attributes=True
+                )
+                if render_pool.running
+                else None
+            ),
+            render_scheduler=RenderSchedulerMetricsDTO.model_validate(
+                render_scheduler.metrics(), from_attributes=True
+            ),
+            memory_budget=MemoryBudgetMetricsDTO.model_validate(
+                memory_budget.metrics(), from_attributes=True
+            ),
+            rendered_cache=RenderedCacheMetricsDTO.model_validate(
+                rendered_document_cache.metrics(), from_attributes=True
+            ),
+            http_client=HttpClientMetricsDTO.model_validate(
+                http_client.metrics(), from_attributes=True
+            ),
+            template_store=TemplateStoreMetricsDTO.model_validate(
+                template_blob_store.metrics(), from_attributes=True
+            ),
+            template_prewarm=TemplatePrewarmMetricsDTO.model_validate(
+                template_prewarmer.metrics(), from_attributes=True
+            ),
+        )
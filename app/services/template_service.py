@@ -1,11 +1,12 @@
-from aiohttp import ClientSession
+import asyncio
+
 from fastapi import Depends
 from lawly_db.db_models.db_session import get_session
 from protos.ai_service.client import AIAssistantClient
 from protos.ai_service.dto import AIRequestDTO
 from protos.user_service.client import UserServiceClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import StreamingResponse
+from starlette.responses import Response, StreamingResponse
 
 from config import settings
 from modules.documents.dto import GenerateDocumentFieldDTO
@@ -18,11 +19,25 @@ from modules.templates import (
     FieldDTO,
     CreateTemplateDTO,
 )
-from modules.templates.dto import TemplateDownloadDTO, DownloadEmptyTemplateDTO
-from modules.templates.enum import CreateCustomTemplateEnum, DownloadEmptyTemplateEnum
-from repositories.s3_repository import S3Object
+from modules.templates.dto import (
+    TemplateDownloadDTO,
+    DownloadEmptyTemplateDTO,
+    PlaceholderDTO,
+    TemplatePlaceholdersDTO,
+)
+from modules.templates.enum import (
+    CreateCustomTemplateEnum,
+    DownloadEmptyTemplateEnum,
+    GetTemplatesEnum,
+    TemplatePlaceholdersEnum,
+)
 from repositories.template_repository import TemplateRepository
+from services.template_source import get_template_object
 from shared.templates import LOCAL_TEMPLATE_OBJ
+from utils.blank_templates import blank_template_store
+from utils.cursor import InvalidCursorError
+from utils.placeholder_index import placeholder_index_cache
+from utils.render_scheduler import RenderRejectedError
 from utils.word_template_processor import WordTemplateProcessor
 
 
@@ -33,20 +48,29 @@ class TemplateService:
 
     async def get_templates_service(
         self, template_dto: GetTemplateDTO
-    ) -> GetTemplatesResponseDTO:
+    ) -> GetTemplatesResponseDTO | GetTemplatesEnum:
         """
         Получение списка шаблонов документов
         :param template_dto: DTO для получения шаблонов
         :return: Список шаблонов
         """
-        templates = await self.template_repo.get_templates(
-            query=template_dto.query,
-            limit=template_dto.limit,
-            offset=template_dto.offset,
-        )
-        total = await self.template_repo.get_total_documents(query=template_dto.query)
+        try:
+            (
+                templates,
+                total,
+                next_cursor,
+            ) = await self.template_repo.get_templates_with_total(
+                query=template_dto.query,
+                limit=template_dto.limit,
+                offset=template_dto.offset,
+                mode=template_dto.mode,
+                after=template_dto.after,
+            )
+        except InvalidCursorError:
+            return GetTemplatesEnum.INVALID_CURSOR
         return GetTemplatesResponseDTO(
             total=total,
+            next_cursor=next_cursor,
             templates=[
                 TemplateDTO.model_validate(template, from_attributes=True)
                 for template in templates
@@ -61,27 +85,26 @@ class TemplateService:
         :param template_id: ID шаблона
         :return: Информация о шаблоне
         """
-        template = await self.template_repo.get_template_by_id(template_id)
+        template = await self.template_repo.get_template_info_by_id(template_id)
         if not template:
             return None
         documents = {}
         custom_fields = []
-        template_fields = template.fields
 
-        for field in template_fields:
+        for field in template.fields:
             if field.document:
-                await self.session.refresh(field.document, attribute_names=["fields"])
-                doc_dto = DocumentDto.model_validate(
-                    field.document, from_attributes=True
-                )
-                documents[doc_dto.id] = doc_dto
+                # Один документ может быть связан с несколькими полями
+                documents.setdefault(field.document.id, field.document)
             else:
                 custom_fields.append(
                     FieldDTO.model_validate(field, from_attributes=True)
                 )
 
         return TemplateInfoDto(
-            required_documents=list(documents.values()),
+            required_documents=[
+                DocumentDto.model_validate(document, from_attributes=True)
+                for document in documents.values()
+            ],
             custom_fields=custom_fields,
             id=template.id,
             name=template.name,
@@ -104,6 +127,36 @@ class TemplateService:
             return None
         return TemplateDownloadDTO(download_url=template.download_url)
 
+    async def get_template_placeholders_service(
+        self, template_id: int
+    ) -> TemplatePlaceholdersDTO | TemplatePlaceholdersEnum:
+        """
+        Получение плейсхолдеров шаблона
+        :param template_id: ID шаблона
+        :return: Плейсхолдеры шаблона
+        """
+        try:
+            template = await get_template_object(self.template_repo, template_id)
+            if template is None:
+                return TemplatePlaceholdersEnum.NOT_FOUND
+            template_key, template_s3_obj = template
+            loop = asyncio.get_event_loop()
+            index = await loop.run_in_executor(
+                None,
+                placeholder_index_cache.get_by_key,
+                template_key,
+                lambda: template_s3_obj.body,
+            )
+        except Exception:
+            return TemplatePlaceholdersEnum.ERROR
+        return TemplatePlaceholdersDTO(
+            template_id=template_id,
+            placeholders=[
+                PlaceholderDTO.model_validate(usage, from_attributes=True)
+                for usage in index.placeholders
+            ],
+        )
+
     async def create_custom_template_service(
         self, create_template_dto: CreateTemplateDTO
     ) -> StreamingResponse | CreateCustomTemplateEnum:
@@ -142,12 +195,15 @@ class TemplateService:
         )
 
     async def download_empty_template(
-        self, download_empty_template_dto: DownloadEmptyTemplateDTO
-    ) -> StreamingResponse | DownloadEmptyTemplateEnum:
+        self,
+        download_empty_template_dto: DownloadEmptyTemplateDTO,
+        if_none_match: str | None = None,
+    ) -> Response | DownloadEmptyTemplateEnum:
         """
         Скачивание пустого шаблона
         :param download_empty_template_dto: DTO для скачивания пустого шаблона
-        :return:
+        :param if_none_match: заголовок If-None-Match клиента
+        :return: файл или 304, если у клиента актуальная версия
         """
         try:
             template = await self.template_repo.get_template_by_id(
@@ -155,14 +211,12 @@ class TemplateService:
             )
             if not template:
                 return DownloadEmptyTemplateEnum.NOT_FOUND
-            async with ClientSession() as session:
-                async with session.get(template.download_url) as resp:
-                    document_s3_obj = await resp.read()
-            document_s3_obj = S3Object(
-                body=document_s3_obj, content_type="application/octet-stream"
-            )
-            return await WordTemplateProcessor.replace_placeholders_with_underscores(
-                s3_object=document_s3_obj, filename=template.name_ru
+            return await blank_template_store.response(
+                url=template.download_url,
+                filename=template.name_ru,
+                if_none_match=if_none_match,
             )
+        except RenderRejectedError:
+            raise
         except Exception:
             return DownloadEmptyTemplateEnum.ERROR
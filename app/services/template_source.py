@@ -0,0 +1,21 @@
+from repositories.s3_repository import S3Object
+from repositories.template_repository import TemplateRepository
+from utils.template_store import template_blob_store
+
+
+async def get_template_object(
+    template_repo: TemplateRepository, template_id: int
+) -> tuple[str, S3Object] | None:
+    """
+    Скачивает содержимое шаблона в локальное хранилище
+    :param template_repo: репозиторий шаблонов
+    :param template_id: ID шаблона
+    :return: хэш содержимого и шаблон, тело которого - отображение файла в
+    память, или None, если шаблон не найден
+    """
+    template = await template_repo.get_template_by_id(template_id=template_id)
+    if not template:
+        return None
+    # Хэш уже посчитан при скачивании: дальше кэши ищут шаблон по нему, не
+    # хэшируя тело заново
+    return await template_blob_store.fetch(template.download_url)
@@ -1,4 +1,7 @@
 from pathlib import Path
+
+import docx
+
 from repositories.s3_repository import S3Object
 
 
@@ -11,3 +14,9 @@ LOCAL_TEMPLATE_OBJ = S3Object(
     body=LOCAL_TEMPLATE_BYTES,
     content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
 )
+
+# Пустой документ python-docx, основа для документов из произвольного текста
+EMPTY_DOCUMENT_PATH = Path(docx.__file__).parent / "templates" / "default.docx"
+
+with open(EMPTY_DOCUMENT_PATH, "rb") as f:
+    EMPTY_DOCUMENT_BYTES = f.read()
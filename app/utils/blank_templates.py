@@ -0,0 +1,268 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Literal
+from urllib.parse import quote
+
+from fastapi import Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from config import settings
+from repositories.s3_repository import S3Object, S3ObjectStream, s3_client
+from utils.rendered_cache import RENDER_VERSION
+from utils.single_flight import SingleFlight
+from utils.template_store import TemplateBlobStore, template_blob_store
+from utils.word_template_processor import WordTemplateProcessor
+
+DOCX_MEDIA_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+# Размер куска при загрузке варианта в бакет
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class BlankTemplate:
+    """
+    Незаполненный вариант шаблона
+    :param key: версия рендеринга и хэш содержимого исходного шаблона
+    :param path: файл на диске (хранилище disk)
+    :param stream: содержимое, читаемое из бакета (хранилище s3)
+    """
+
+    key: str
+    path: Path | None = None
+    stream: S3ObjectStream | None = None
+
+    @property
+    def etag(self) -> str:
+        return f'"blank-{self.key}"'
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """
+        Совпадает ли версия с заголовком If-None-Match клиента
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+    def response(self, filename: str) -> Response:
+        headers = {
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            "ETag": self.etag,
+            # Клиент может хранить файл, но обязан проверить версию
+            "Cache-Control": "private, no-cache",
+        }
+        if self.path is not None:
+            return FileResponse(self.path, media_type=DOCX_MEDIA_TYPE, headers=headers)
+        headers["Content-Length"] = str(self.stream.content_length)
+        return StreamingResponse(
+            self.stream.chunks, media_type=DOCX_MEDIA_TYPE, headers=headers
+        )
+
+    def not_modified(self) -> Response:
+        return Response(
+            status_code=304,
+            headers={"ETag": self.etag, "Cache-Control": "private, no-cache"},
+        )
+
+
+class BlankTemplateStore:
+    """
+    Заранее подготовленные незаполненные варианты шаблонов.
+
+    Незаполненный вариант одинаков для всех пользователей, пока не изменился
+    сам шаблон, поэтому он рендерится один раз на версию шаблона и дальше
+    отдаётся из хранилища. Исходный шаблон берётся из локального хранилища
+    шаблонов, которое сверяет версию с источником условным запросом, так что
+    неизменившийся шаблон заново не скачивается. В имя варианта и ETag входит
+    версия рендеринга, поэтому после её смены варианты рендерятся заново, а
+    клиенты не получают 304 на устаревший файл. Каталог хранилища disk
+    ограничен по суммарному размеру и вытесняет давно не запрошенные варианты.
+
+    :param storage: disk - локальный каталог, s3 - бакет S3
+    :param directory: каталог для хранилища disk
+    :param bucket: бакет для хранилища s3
+    :param prefix: префикс ключей в бакете
+    :param max_size: лимит каталога хранилища disk, байт
+    :param templates: хранилище исходных шаблонов
+    :param version: версия рендеринга
+    """
+
+    def __init__(
+        self,
+        storage: Literal["disk", "s3"],
+        directory: Path,
+        bucket: str,
+        prefix: str,
+        max_size: int,
+        templates: TemplateBlobStore = template_blob_store,
+        version: str = f"{RENDER_VERSION}",
+    ):
+        self._version = version
+        self._storage = storage
+        self._templates = templates
+        self._renders: SingleFlight[None] = SingleFlight()
+        self._directory = directory
+        self._bucket = bucket
+        self._prefix = prefix
+        self._max_size = max_size
+
+        self._lock = threading.Lock()
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+
+    def _blank_key(self, key: str) -> str:
+        return f"{self._version}-{key}"
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.docx"
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        # Каталог переживает перезапуск, поэтому при первом обращении
+        # восстанавливаем индекс, начиная с самых старых файлов
+        if self._disk is None:
+            self._disk = OrderedDict()
+            self._directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(
+                (path.stat().st_mtime, path.stem, path.stat().st_size)
+                for path in self._directory.glob("*.docx")
+            )
+            for _, key, size in files:
+                self._disk[key] = size
+                self._disk_bytes += size
+        return self._disk
+
+    def _touch(self, key: str) -> bool:
+        """
+        Есть ли вариант на диске; найденный становится последним к вытеснению
+        """
+        with self._lock:
+            disk = self._disk_index()
+            if key not in disk:
+                return False
+            if not self._path(key).exists():
+                # Файл удалили снаружи, забываем о нём
+                self._disk_bytes -= disk.pop(key)
+                return False
+            disk.move_to_end(key)
+            return True
+
+    async def _load(self, key: str) -> BlankTemplate | None:
+        if self._storage == "disk":
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self._touch, key):
+                return None
+            return BlankTemplate(key=key, path=self._path(key))
+
+        # Файл не читается в память целиком, а отдаётся клиенту по кускам
+        stream = await s3_client.stream(self._bucket, f"{self._prefix}{key}.docx")
+        if stream is None:
+            return None
+        return BlankTemplate(key=key, stream=stream)
+
+    async def _save(self, key: str, output: BinaryIO) -> None:
+        if self._storage == "disk":
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_file, key, output)
+            return
+
+        await s3_client.put_stream(
+            bucket=self._bucket,
+            key=f"{self._prefix}{key}.docx",
+            chunks=self._read_chunks(output),
+            content_type=DOCX_MEDIA_TYPE,
+        )
+
+    def _write_file(self, key: str, output: BinaryIO) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы не отдать половину
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            shutil.copyfileobj(output, tmp_file)
+            size = tmp_file.tell()
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            disk = self._disk_index()
+            self._disk_bytes += size - disk.pop(key, 0)
+            disk[key] = size
+            # Только что записанный вариант не вытесняется, даже если он один
+            # больше лимита: его сейчас отдадут клиенту
+            while self._disk_bytes > self._max_size and len(disk) > 1:
+                evicted, evicted_size = disk.popitem(last=False)
+                self._disk_bytes -= evicted_size
+                self._path(evicted).unlink(missing_ok=True)
+
+    @staticmethod
+    async def _read_chunks(output: BinaryIO) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        while chunk := await loop.run_in_executor(None, output.read, READ_CHUNK_SIZE):
+            yield chunk
+
+    async def response(
+        self, url: str, filename: str, if_none_match: str | None = None
+    ) -> Response:
+        """
+        Ответ с незаполненным вариантом шаблона. Вариант рендерится только при
+        промахе или после изменения шаблона.
+        :param url: ссылка на исходный шаблон
+        :param filename: имя файла для скачивания
+        :param if_none_match: заголовок If-None-Match клиента
+        :return: файл или 304, если у клиента актуальная версия
+        """
+        key, template = await self._templates.fetch(url)
+        blank_key = self._blank_key(key)
+        if BlankTemplate(key=blank_key).matches(if_none_match):
+            return BlankTemplate(key=blank_key).not_modified()
+
+        blank = await self._load(blank_key)
+        if blank is None:
+            await self._render_once(key, template)
+            blank = await self._load(blank_key)
+
+        return blank.response(filename)
+
+    async def prepare(self, key: str, template: S3Object) -> None:
+        """
+        Готовит незаполненный вариант заранее, например при прогреве
+        :param key: хэш содержимого шаблона
+        :param template: исходный шаблон
+        """
+        if not await self._exists(self._blank_key(key)):
+            await self._render_once(key, template)
+
+    async def _exists(self, key: str) -> bool:
+        if self._storage == "disk":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._touch, key)
+        head = await s3_client.head(self._bucket, f"{self._prefix}{key}.docx")
+        return head is not None
+
+    async def _render_once(self, key: str, template: S3Object) -> None:
+        # Новую версию, запрошенную многими сразу, рендерим один раз
+        await self._renders.do(key, lambda: self._render(key, template))
+
+    async def _render(self, key: str, template: S3Object) -> None:
+        output = await WordTemplateProcessor.render_empty_template(template, key)
+        with output:
+            await self._save(self._blank_key(key), output)
+
+
+blank_template_store = BlankTemplateStore(
+    storage=settings.render_settings.blank_storage,
+    directory=Path(settings.render_settings.blank_dir or tempfile.gettempdir())
+    / "lawly-blank",
+    bucket=settings.s3_settings.bucket_name,
+    prefix=settings.render_settings.blank_prefix,
+    max_size=settings.render_settings.blank_dir_size,
+    # Движки собирают разные по байтам документы
+    version=f"{RENDER_VERSION}-{settings.render_settings.engine}",
+)
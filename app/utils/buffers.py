@@ -0,0 +1,64 @@
+import io
+import mmap
+import os
+from pathlib import Path
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Файловый интерфейс только для чтения поверх bytes, memoryview или mmap.
+
+    В отличие от BytesIO(memoryview) не копирует буфер целиком: данные
+    копируются только теми кусками, которые читает zipfile.
+    """
+
+    def __init__(self, buffer: bytes | memoryview):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._position : self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def open_buffer(body: bytes | memoryview) -> io.RawIOBase | io.BytesIO:
+    """
+    Файловый объект над содержимым шаблона без копирования
+    """
+    # BytesIO над bytes и так не копирует, пока в него не пишут
+    if isinstance(body, bytes):
+        return io.BytesIO(body)
+    return BufferReader(body)
+
+
+def map_file(path: str | Path) -> memoryview:
+    """
+    Отображает файл в память только для чтения
+    :param path: путь к файлу
+    :return: memoryview над mmap; отображение живёт, пока на него есть ссылки
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
@@ -0,0 +1,322 @@
+import hashlib
+import posixpath
+import threading
+import zipfile
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Literal
+
+from docx import Document
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+
+from config import settings
+from utils.buffers import open_buffer
+from utils.memory_budget import memory_budget
+from utils.placeholder_substitution import PLACEHOLDER_PATTERN, PlaceholderSubstitution
+
+# Вид части пакета с плейсхолдерами: основной документ или колонтитулы
+RenderedPartKind = Literal["document", "header", "footer"]
+# Типы содержимого частей с плейсхолдерами
+RENDERED_CONTENT_TYPES: dict[str, RenderedPartKind] = {
+    CT.WML_DOCUMENT_MAIN: "document",
+    CT.WML_HEADER: "header",
+    CT.WML_FOOTER: "footer",
+}
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+
+def rendered_entries(archive: zipfile.ZipFile) -> dict[str, RenderedPartKind]:
+    """
+    Записи архива DOCX с плейсхолдерами по типам содержимого из
+    [Content_Types].xml, а не по именам файлов: основная часть может
+    называться, например, word/document2.xml
+    :param archive: открытый архив шаблона
+    :return: имя записи и вид части
+    """
+    types = parse_xml(archive.read("[Content_Types].xml"))
+    defaults = {
+        element.get("Extension").lower(): element.get("ContentType")
+        for element in types.iter(f"{{{CONTENT_TYPES_NS}}}Default")
+    }
+    overrides = {
+        element.get("PartName").lstrip("/").lower(): element.get("ContentType")
+        for element in types.iter(f"{{{CONTENT_TYPES_NS}}}Override")
+    }
+
+    entries = {}
+    for filename in archive.namelist():
+        extension = posixpath.splitext(filename)[1].lstrip(".").lower()
+        content_type = overrides.get(filename.lower(), defaults.get(extension))
+        if content_type in RENDERED_CONTENT_TYPES:
+            entries[filename] = RENDERED_CONTENT_TYPES[content_type]
+    return entries
+
+
+@dataclass(frozen=True)
+class PlaceholderSpan:
+    """
+    Положение одного плейсхолдера внутри параграфа.
+
+    Смещения считаются по тексту run'ов (с учётом того, как python-docx
+    переводит <w:tab/> и <w:br/> в символы), конец - не включительно.
+    """
+
+    placeholder: str
+    start_run: int
+    start_offset: int
+    end_run: int
+    end_offset: int
+
+
+@dataclass(frozen=True)
+class CompiledParagraph:
+    """
+    Параграф шаблона, содержащий плейсхолдеры.
+
+    :param index: порядковый номер <w:p> в документе
+    :param spans: плейсхолдеры параграфа в порядке следования
+    """
+
+    index: int
+    spans: tuple[PlaceholderSpan, ...]
+
+
+def _paragraph_runs(paragraph) -> list:
+    # Те же run'ы, из которых python-docx собирает Paragraph.text
+    return paragraph.xpath("w:r | w:hyperlink/w:r")
+
+
+def _compile_paragraph(index: int, paragraph) -> CompiledParagraph | None:
+    runs = _paragraph_runs(paragraph)
+    texts = [run.text for run in runs]
+    text = "".join(texts)
+    if "<" not in text:
+        return None
+
+    # Начало каждого run'а в тексте параграфа
+    starts = []
+    position = 0
+    for run_text in texts:
+        starts.append(position)
+        position += len(run_text)
+
+    def locate(offset: int) -> tuple[int, int]:
+        for run_index in range(len(texts) - 1, -1, -1):
+            if starts[run_index] <= offset and texts[run_index]:
+                return run_index, offset - starts[run_index]
+        return 0, offset
+
+    spans = []
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        start_run, start_offset = locate(match.start())
+        end_run, end_offset = locate(match.end() - 1)
+        spans.append(
+            PlaceholderSpan(
+                placeholder=match.group(0),
+                start_run=start_run,
+                start_offset=start_offset,
+                end_run=end_run,
+                end_offset=end_offset + 1,
+            )
+        )
+
+    if not spans:
+        return None
+    return CompiledParagraph(index=index, spans=tuple(spans))
+
+
+def _fill_paragraph(
+    paragraph, compiled: CompiledParagraph, substitution: PlaceholderSubstitution
+) -> None:
+    runs = _paragraph_runs(paragraph)
+    texts = {}
+
+    def text_of(run_index: int) -> str:
+        if run_index not in texts:
+            texts[run_index] = runs[run_index].text
+        return texts[run_index]
+
+    # Идём с конца, чтобы смещения предыдущих плейсхолдеров оставались верными
+    for span in reversed(compiled.spans):
+        value = substitution.resolve(span.placeholder)
+
+        start_text = text_of(span.start_run)
+        if span.start_run == span.end_run:
+            texts[span.start_run] = (
+                start_text[: span.start_offset] + value + start_text[span.end_offset :]
+            )
+            continue
+
+        end_text = text_of(span.end_run)
+        texts[span.start_run] = start_text[: span.start_offset] + value
+        for run_index in range(span.start_run + 1, span.end_run):
+            if text_of(run_index):
+                texts[run_index] = ""
+        texts[span.end_run] = end_text[span.end_offset :]
+
+    for run_index, text in texts.items():
+        if runs[run_index].text != text:
+            runs[run_index].text = text
+
+
+def compile_paragraphs(root) -> tuple[CompiledParagraph, ...]:
+    """
+    Находит все параграфы части документа, содержащие плейсхолдеры
+    :param root: корневой элемент XML-части (CT_Document, CT_Hdr, CT_Ftr)
+    :return: скомпилированные параграфы
+    """
+    return tuple(
+        compiled
+        for index, paragraph in enumerate(root.iter(qn("w:p")))
+        if (compiled := _compile_paragraph(index, paragraph)) is not None
+    )
+
+
+def fill_paragraphs(
+    root,
+    paragraphs: tuple[CompiledParagraph, ...],
+    substitution: PlaceholderSubstitution,
+) -> None:
+    """
+    Подставляет значения в записанные места части документа (на месте)
+    :param root: копия корневого элемента, по которой компилировались параграфы
+    :param paragraphs: скомпилированные параграфы
+    :param substitution: значения плейсхолдеров
+    """
+    elements = list(root.iter(qn("w:p")))
+    for compiled in paragraphs:
+        _fill_paragraph(elements[compiled.index], compiled, substitution)
+
+
+class CompiledTemplate:
+    """
+    Шаблон DOCX, разобранный один раз.
+
+    Хранит исходные деревья документа и колонтитулов и положения всех плейсхолдеров,
+    поэтому заполнение затрагивает только параграфы с плейсхолдерами, а
+    форматирование run'ов сохраняется.
+    """
+
+    def __init__(self, body: bytes | memoryview):
+        self._document = Document(open_buffer(body))
+        self._lock = threading.Lock()
+
+        # (часть пакета, исходное дерево, параграфы с плейсхолдерами)
+        self._parts = []
+        for part in self._rendered_parts():
+            paragraphs = compile_paragraphs(part.element)
+            if paragraphs:
+                self._parts.append((part, part.element, paragraphs))
+
+    def _rendered_parts(self) -> list:
+        """
+        Части, в которых ищутся плейсхолдеры: основной документ и колонтитулы,
+        найденные по связям пакета, а не по именам файлов
+        """
+        document_part = self._document.part
+        parts = {document_part.partname: document_part}
+        for rel in document_part.rels.values():
+            if rel.reltype in (RT.HEADER, RT.FOOTER) and not rel.is_external:
+                parts.setdefault(rel.target_part.partname, rel.target_part)
+        return list(parts.values())
+
+    @property
+    def placeholders(self) -> set[str]:
+        """
+        Все плейсхолдеры шаблона вида <...>
+        """
+        return {
+            span.placeholder
+            for _, _, paragraphs in self._parts
+            for paragraph in paragraphs
+            for span in paragraph.spans
+        }
+
+    def render(self, substitution: PlaceholderSubstitution) -> BinaryIO:
+        """
+        Заполняет шаблон: известные плейсхолдеры заменяются значениями,
+        остальные - подчёркиваниями той же длины.
+
+        :param substitution: значения плейсхолдеров
+        :return: готовый DOCX
+        """
+        filled = []
+        for part, pristine, paragraphs in self._parts:
+            working = deepcopy(pristine)
+            fill_paragraphs(working, paragraphs, substitution)
+            filled.append((part, working))
+
+        output_stream = memory_budget.output()
+        # Пакет python-docx общий, подменяем в нём только деревья изменённых частей
+        with self._lock:
+            for part, working in filled:
+                part._element = working
+            try:
+                self._document.save(output_stream)
+            finally:
+                for part, pristine, _ in self._parts:
+                    part._element = pristine
+
+        return memory_budget.finish(output_stream)
+
+
+class CompiledTemplateCache:
+    """
+    Ограниченный LRU-кэш скомпилированных шаблонов по хэшу содержимого.
+
+    :param maxsize: максимальное количество шаблонов в кэше
+    :param factory: класс скомпилированного шаблона, принимающий содержимое DOCX
+    """
+
+    def __init__(self, maxsize: int, factory=CompiledTemplate):
+        self.maxsize = maxsize
+        self.factory = factory
+        self._items: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, body: bytes):
+        """
+        Возвращает скомпилированный шаблон, компилируя его при промахе
+        :param body: содержимое DOCX
+        :return: скомпилированный шаблон
+        """
+        return self.get_by_key(self.key(body), lambda: body)
+
+    def get_by_key(self, key: str, load: Callable[[], bytes]):
+        """
+        Возвращает скомпилированный шаблон по уже посчитанному хэшу
+        :param key: хэш содержимого шаблона
+        :param load: загружает содержимое DOCX при промахе
+        :return: скомпилированный шаблон
+        """
+        with self._lock:
+            compiled = self._items.get(key)
+            if compiled is not None:
+                self._items.move_to_end(key)
+                return compiled
+
+        # Компилируем без блокировки, чтобы не задерживать другие шаблоны
+        compiled = self.factory(load())
+
+        with self._lock:
+            self._items[key] = compiled
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+compiled_template_cache = CompiledTemplateCache(
+    maxsize=settings.render_settings.template_cache_size
+)
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from typing import Any, Sequence
+
+from sqlalchemy import ColumnElement, and_, or_
+
+# Ключ сортировки: выражение и направление (True - по убыванию). Последним
+# всегда идёт уникальный id, чтобы порядок был однозначным
+SortKey = tuple[ColumnElement, bool]
+
+
+class InvalidCursorError(ValueError):
+    """
+    Курсор повреждён или выдан для другой сортировки
+    """
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """
+    Непрозрачный курсор страницы: значения ключа сортировки последней строки
+    :param sort: название сортировки, для которой выдан курсор
+    :param values: значения ключа сортировки
+    :return: курсор
+    """
+    data = json.dumps({"s": sort, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list[Any]:
+    """
+    Значения ключа сортировки из курсора
+    :param cursor: курсор
+    :param sort: ожидаемое название сортировки
+    :param size: ожидаемое количество значений ключа
+    :return: значения ключа сортировки
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["k"]
+        valid = data["s"] == sort and isinstance(values, list) and len(values) == size
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise InvalidCursorError("Некорректный курсор")
+    return values
+
+
+def keyset_order(keys: Sequence[SortKey]) -> list[ColumnElement]:
+    return [
+        expression.desc() if desc else expression.asc() for expression, desc in keys
+    ]
+
+
+def keyset_after(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    """
+    Условие «строка идёт после курсора» в порядке keyset_order. В отличие от
+    смещения, условие выполняется по индексу, не зависит от глубины страницы
+    и не сдвигается при вставке строк
+    :param keys: ключ сортировки
+    :param values: значения ключа из курсора
+    :return: условие выборки
+    """
+    condition = None
+    for (expression, desc), value in reversed(list(zip(keys, values))):
+        after = expression < value if desc else expression > value
+        if condition is not None:
+            after = or_(after, and_(expression == value, condition))
+        condition = after
+    return condition
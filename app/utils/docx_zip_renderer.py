@@ -0,0 +1,160 @@
+import asyncio
+import zipfile
+from copy import copy, deepcopy
+from typing import AsyncIterator, BinaryIO, Callable
+
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.parser import parse_xml
+
+from config import settings
+from utils.buffers import open_buffer
+from utils.compiled_template import (
+    CompiledParagraph,
+    CompiledTemplateCache,
+    compile_paragraphs,
+    fill_paragraphs,
+    rendered_entries,
+)
+from utils.memory_budget import memory_budget
+from utils.placeholder_substitution import PlaceholderSubstitution
+from utils.zip_writer import ZipWriter, compress_entry, read_raw_entry
+
+
+class ZipTemplate:
+    """
+    Шаблон DOCX, заполняемый напрямую на уровне ZIP и XML, без объектной модели
+    python-docx.
+
+    Перезаписываются только части с плейсхолдерами (документ, колонтитулы),
+    остальные записи архива (стили, шрифты, медиа) копируются байт в байт без
+    повторного сжатия.
+    """
+
+    def __init__(self, body: bytes | memoryview):
+        self._body = body
+        self._entries: list[
+            tuple[zipfile.ZipInfo, object, tuple[CompiledParagraph, ...]]
+        ] = []
+
+        with zipfile.ZipFile(open_buffer(body)) as archive:
+            rendered = rendered_entries(archive)
+            for info in archive.infolist():
+                # Проверяем, что запись можно скопировать как есть
+                read_raw_entry(body, info)
+
+                pristine, paragraphs = None, ()
+                if info.filename in rendered:
+                    xml = archive.read(info)
+                    # Плейсхолдер в тексте XML всегда экранирован как &lt;
+                    if b"&lt;" in xml:
+                        pristine = parse_xml(xml)
+                        paragraphs = compile_paragraphs(pristine)
+                if not paragraphs:
+                    pristine = None
+                self._entries.append((info, pristine, paragraphs))
+
+    @property
+    def placeholders(self) -> set[str]:
+        """
+        Все плейсхолдеры шаблона вида <...>
+        """
+        return {
+            span.placeholder
+            for _, _, paragraphs in self._entries
+            for paragraph in paragraphs
+            for span in paragraph.spans
+        }
+
+    @staticmethod
+    def _render_part(
+        info: zipfile.ZipInfo,
+        pristine,
+        paragraphs: tuple[CompiledParagraph, ...],
+        substitution: PlaceholderSubstitution,
+    ) -> tuple[zipfile.ZipInfo, bytes]:
+        working = deepcopy(pristine)
+        fill_paragraphs(working, paragraphs, substitution)
+
+        info = copy(info)
+        return info, compress_entry(info, serialize_part_xml(working))
+
+    def render(self, substitution: PlaceholderSubstitution) -> BinaryIO:
+        """
+        Заполняет шаблон: известные плейсхолдеры заменяются значениями,
+        остальные - подчёркиваниями той же длины.
+
+        :param substitution: значения плейсхолдеров
+        :return: готовый DOCX
+        """
+        output_stream = memory_budget.output()
+        writer = ZipWriter(output_stream.write)
+
+        for info, pristine, paragraphs in self._entries:
+            if paragraphs:
+                writer.write_raw(
+                    *self._render_part(info, pristine, paragraphs, substitution)
+                )
+            else:
+                writer.write_raw(info, read_raw_entry(self._body, info))
+
+        writer.close()
+
+        return memory_budget.finish(output_stream)
+
+    def stream(
+        self,
+        substitution: PlaceholderSubstitution,
+        on_rendered: Callable[[], None] | None = None,
+    ) -> AsyncIterator[bytes | memoryview]:
+        """
+        Отдаёт заполненный DOCX по частям, не собирая его в памяти.
+
+        Части с плейсхолдерами начинают рендериться в пуле потоков сразу, пока
+        неизменные записи архива уже отдаются клиенту.
+
+        :param substitution: значения плейсхолдеров
+        :param on_rendered: вызывается, когда все части отрендерены или
+            рендеринг отменён; дальше остаётся только копирование
+        :return: асинхронный итератор кусков архива
+        """
+        loop = asyncio.get_running_loop()
+        rendered = {
+            index: loop.run_in_executor(
+                None, self._render_part, info, pristine, paragraphs, substitution
+            )
+            for index, (info, pristine, paragraphs) in enumerate(self._entries)
+            if paragraphs
+        }
+        if on_rendered is not None:
+            # Срабатывает, даже если ответ так и не начали читать
+            asyncio.gather(
+                *rendered.values(), return_exceptions=True
+            ).add_done_callback(lambda _: on_rendered())
+        return self._stream_entries(rendered)
+
+    async def _stream_entries(
+        self, rendered: dict[int, asyncio.Future]
+    ) -> AsyncIterator[bytes | memoryview]:
+        chunks: list[bytes | memoryview] = []
+        writer = ZipWriter(chunks.append)
+        try:
+            for index, (info, _, paragraphs) in enumerate(self._entries):
+                if paragraphs:
+                    writer.write_raw(*await rendered[index])
+                else:
+                    writer.write_raw(info, read_raw_entry(self._body, info))
+                for chunk in chunks:
+                    yield chunk
+                chunks.clear()
+
+            writer.close()
+            for chunk in chunks:
+                yield chunk
+        finally:
+            for future in rendered.values():
+                future.cancel()
+
+
+zip_template_cache = CompiledTemplateCache(
+    maxsize=settings.render_settings.template_cache_size, factory=ZipTemplate
+)
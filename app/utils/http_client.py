@@ -0,0 +1,175 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from aiohttp import (
+    ClientConnectionError,
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    TraceConfig,
+)
+
+from config import settings
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {502, 503, 504}
+
+
+@dataclass
+class HttpClientMetrics:
+    requests: int
+    retries: int
+    failures: int
+    connections_created: int
+    connections_reused: int
+    reuse_ratio: float
+
+
+class HttpClient:
+    """
+    Общий HTTP-клиент с пулом соединений.
+
+    Сессия создаётся один раз при старте приложения, поэтому соединения с
+    хранилищем шаблонов переиспользуются между запросами (keep-alive), а не
+    открываются заново с DNS и TLS на каждый запрос. Сессия привязана к циклу
+    событий, в котором создана, поэтому в другом цикле создаётся заново.
+    GET-запросы повторяются
+    с экспоненциальной задержкой при сетевых ошибках и ответах 502/503/504.
+
+    :param limit: всего соединений
+    :param limit_per_host: соединений с одним хостом
+    :param keepalive_timeout: сколько держать простаивающее соединение, с
+    :param connect_timeout: таймаут соединения, с
+    :param total_timeout: таймаут запроса целиком, с
+    :param retries: количество повторов
+    :param backoff: задержка перед первым повтором, с (дальше удваивается)
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        limit_per_host: int,
+        keepalive_timeout: float,
+        connect_timeout: float,
+        total_timeout: float,
+        retries: int,
+        backoff: float,
+    ):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self._retries = retries
+        self._backoff = backoff
+        self._session: ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self._requests = 0
+        self._retried = 0
+        self._failures = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+
+        self._session = ClientSession(
+            connector=TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+            ),
+            timeout=self._timeout,
+            trace_configs=[trace_config],
+        )
+
+    async def close(self) -> None:
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        await session.close()
+
+    async def _running_session(self) -> ClientSession:
+        if self._session is not None and self._loop is not asyncio.get_running_loop():
+            # Соединения прежнего цикла в этом цикле не работают
+            await self.close()
+        if self._session is None:
+            await self.start()
+        return self._session
+
+    async def _on_connection_created(self, *_) -> None:
+        self._connections_created += 1
+
+    async def _on_connection_reused(self, *_) -> None:
+        self._connections_reused += 1
+
+    @asynccontextmanager
+    async def get(
+        self, url: str, headers: dict[str, str] | None = None
+    ) -> AsyncIterator[ClientResponse]:
+        """
+        GET-запрос с повторами. Повторяется только получение ответа: после
+        того как ответ отдан вызывающему, его тело читается без повторов.
+        :param url: адрес
+        :param headers: заголовки запроса
+        :return: ответ (статус не проверяется)
+        """
+        session = await self._running_session()
+
+        self._requests += 1
+        attempt = 0
+        while True:
+            try:
+                response = await session.get(url, headers=headers)
+            except (ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self._retries:
+                    self._failures += 1
+                    raise
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= self._retries:
+                    break
+                response.release()
+
+            # Экспоненциальная задержка со случайной добавкой, чтобы повторы
+            # разных запросов не совпадали
+            await asyncio.sleep(self._backoff * 2**attempt * (1 + random.random()))
+            attempt += 1
+            self._retried += 1
+
+        try:
+            yield response
+        finally:
+            response.release()
+
+    def metrics(self) -> HttpClientMetrics:
+        connections = self._connections_created + self._connections_reused
+        return HttpClientMetrics(
+            requests=self._requests,
+            retries=self._retried,
+            failures=self._failures,
+            connections_created=self._connections_created,
+            connections_reused=self._connections_reused,
+            reuse_ratio=self._connections_reused / connections if connections else 0.0,
+        )
+
+
+http_client = HttpClient(
+    limit=settings.http_settings.limit,
+    limit_per_host=settings.http_settings.limit_per_host,
+    keepalive_timeout=settings.http_settings.keepalive_timeout,
+    connect_timeout=settings.http_settings.connect_timeout,
+    total_timeout=settings.http_settings.total_timeout,
+    retries=settings.http_settings.retries,
+    backoff=settings.http_settings.backoff,
+)
@@ -0,0 +1,165 @@
+import asyncio
+import resource
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+
+from config import settings
+
+
+@dataclass
+class MemoryBudgetMetrics:
+    limit_bytes: int
+    in_use_bytes: int
+    peak_in_use_bytes: int
+    waiting: int
+    waited: int
+    average_wait_seconds: float
+    outputs: int
+    spilled_outputs: int
+    peak_output_bytes: int
+    process_peak_rss_bytes: int
+
+
+class MemoryBudget:
+    """
+    Общий на процесс бюджет памяти для рендеринга.
+
+    Перед рендерингом запрос резервирует оценку нужной памяти и ждёт, пока
+    она не освободится, вместо того чтобы вместе с остальными вывести процесс
+    за лимит контейнера. Запрос больше всего бюджета допускается, только когда
+    кроме него никто не рендерит.
+
+    Готовые документы пишутся в SpooledTemporaryFile: до spool_threshold байт
+    они остаются в памяти, дальше уходят во временный файл.
+
+    :param limit: бюджет, байт
+    :param spool_threshold: размер документа, после которого он уходит на диск
+    """
+
+    def __init__(self, limit: int, spool_threshold: int):
+        self.limit = limit
+        self.spool_threshold = spool_threshold
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+        self._outputs = 0
+        self._spilled_outputs = 0
+        self._peak_output = 0
+
+    async def acquire(self, size: int) -> int:
+        """
+        Резервирует память. Запросы обслуживаются по очереди, чтобы крупный
+        шаблон не ждал бесконечно за потоком мелких.
+        :param size: оценка, байт
+        :return: фактически зарезервированный размер (для release)
+        """
+        size = min(size, self.limit)
+        if not self._waiters and self._in_use + size <= self.limit:
+            self._take(size)
+            return size
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (size, waiter)
+        self._waiters.append(entry)
+        started_at = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Память успели выделить, но ждать её уже некому
+                self.release(size)
+            else:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self._wake()
+            raise
+
+        self._waited += 1
+        self._wait_seconds += time.monotonic() - started_at
+        return size
+
+    def _take(self, size: int) -> None:
+        self._in_use += size
+        self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_use + self._waiters[0][0] <= self.limit:
+            size, waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._take(size)
+            waiter.set_result(None)
+
+    def release(self, size: int) -> None:
+        self._in_use -= size
+        self._wake()
+
+    def output(self) -> BinaryIO:
+        """
+        Буфер для готового документа
+        """
+        return SpooledTemporaryFile(max_size=self.spool_threshold, mode="w+b")
+
+    def finish(self, output: BinaryIO) -> BinaryIO:
+        """
+        Учитывает готовый документ и перематывает буфер в начало
+        :param output: буфер из output()
+        :return: тот же буфер
+        """
+        size = output.tell()
+        output.seek(0)
+        with self._lock:
+            self._outputs += 1
+            if size > self.spool_threshold:
+                self._spilled_outputs += 1
+            self._peak_output = max(self._peak_output, size)
+        return output
+
+    def metrics(self) -> MemoryBudgetMetrics:
+        return MemoryBudgetMetrics(
+            limit_bytes=self.limit,
+            in_use_bytes=self._in_use,
+            peak_in_use_bytes=self._peak_in_use,
+            waiting=len(self._waiters),
+            waited=self._waited,
+            average_wait_seconds=(
+                self._wait_seconds / self._waited if self._waited else 0.0
+            ),
+            outputs=self._outputs,
+            spilled_outputs=self._spilled_outputs,
+            peak_output_bytes=self._peak_output,
+            # В Linux ru_maxrss в килобайтах
+            process_peak_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            * 1024,
+        )
+
+
+def read_output(output: BinaryIO) -> bytes:
+    """
+    Всё содержимое буфера документа, позиция остаётся в начале
+    """
+    output.seek(0)
+    data = output.read()
+    output.seek(0)
+    return data
+
+
+def output_size(output: BinaryIO) -> int:
+    position = output.tell()
+    size = output.seek(0, 2)
+    output.seek(position)
+    return size
+
+
+memory_budget = MemoryBudget(
+    limit=settings.render_settings.memory_budget,
+    spool_threshold=settings.render_settings.spool_threshold,
+)
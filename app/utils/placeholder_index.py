@@ -0,0 +1,99 @@
+import zipfile
+from dataclasses import dataclass
+from typing import Iterable, Literal
+
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+
+from config import settings
+from utils.buffers import open_buffer
+from utils.compiled_template import (
+    CompiledTemplateCache,
+    compile_paragraphs,
+    rendered_entries,
+)
+
+PlaceholderLocation = Literal["body", "table", "header", "footer"]
+
+
+@dataclass(frozen=True)
+class PlaceholderUsage:
+    """
+    Сведения об одном плейсхолдере шаблона
+    :param name: имя без угловых скобок
+    :param count: количество вхождений
+    :param locations: где встречается: основной текст, таблица, колонтитулы
+    """
+
+    name: str
+    count: int
+    locations: tuple[PlaceholderLocation, ...]
+
+
+class PlaceholderIndex:
+    """
+    Перечень плейсхолдеров шаблона без рендеринга.
+
+    Плейсхолдеры ищутся так же, как при заполнении, поэтому перечень в
+    точности совпадает с тем, что будет заменено.
+
+    :param body: содержимое шаблона
+    """
+
+    def __init__(self, body: bytes | memoryview):
+        counts: dict[str, int] = {}
+        locations: dict[str, list[PlaceholderLocation]] = {}
+
+        with zipfile.ZipFile(open_buffer(body)) as archive:
+            # Те же части, что заполняет движок zip
+            rendered = rendered_entries(archive)
+            for info in archive.infolist():
+                if info.filename not in rendered:
+                    continue
+                xml = archive.read(info)
+                # Плейсхолдер в тексте XML всегда экранирован как &lt;
+                if b"&lt;" not in xml:
+                    continue
+
+                root = parse_xml(xml)
+                part_location: PlaceholderLocation = (
+                    "body"
+                    if rendered[info.filename] == "document"
+                    else rendered[info.filename]
+                )
+                paragraphs = list(root.iter(qn("w:p")))
+                for compiled in compile_paragraphs(root):
+                    location = part_location
+                    if location == "body" and paragraphs[compiled.index].xpath(
+                        "ancestor::w:tbl"
+                    ):
+                        location = "table"
+                    for span in compiled.spans:
+                        name = span.placeholder[1:-1]
+                        counts[name] = counts.get(name, 0) + 1
+                        if location not in locations.setdefault(name, []):
+                            locations[name].append(location)
+
+        self.placeholders = tuple(
+            PlaceholderUsage(name=name, count=count, locations=tuple(locations[name]))
+            for name, count in counts.items()
+        )
+
+    @property
+    def names(self) -> set[str]:
+        return {usage.name for usage in self.placeholders}
+
+    def unknown(self, names: Iterable[str]) -> list[str]:
+        """
+        Имена полей, которых нет в шаблоне
+        :param names: имена полей запроса
+        :return: неизвестные имена в порядке запроса
+        """
+        known = self.names
+        return [name for name in dict.fromkeys(names) if name not in known]
+
+
+# Перечень строится один раз на версию шаблона (ключ - хэш содержимого)
+placeholder_index_cache = CompiledTemplateCache(
+    maxsize=settings.render_settings.template_cache_size, factory=PlaceholderIndex
+)
@@ -0,0 +1,56 @@
+import re
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    # Модуль импортируется и в процессах рендеринга, где пакет modules не нужен
+    from modules.documents.dto import GenerateDocumentFieldDTO
+
+# Плейсхолдеры вида <...>
+PLACEHOLDER_PATTERN = re.compile(r"<[^<>]+>")
+
+
+class PlaceholderSubstitution:
+    """
+    Однопроходная подстановка значений в плейсхолдеры.
+
+    Все плейсхолдеры находятся одним регулярным выражением, а значение для
+    каждого найденного берётся из словаря, поэтому стоимость не зависит от
+    количества полей. Неизвестные плейсхолдеры заменяются подчёркиваниями
+    той же длины.
+
+    :param replacements: словарь {"<name>": value}
+    """
+
+    def __init__(self, replacements: dict[str, str] | None = None):
+        self._replacements = replacements or {}
+
+    @classmethod
+    def from_fields(
+        cls, fields: Iterable["GenerateDocumentFieldDTO"]
+    ) -> "PlaceholderSubstitution":
+        return cls({f"<{field.name}>": field.value for field in fields})
+
+    def normalized(self) -> tuple[tuple[str, str], ...]:
+        """
+        Значения в каноническом виде: порядок и повторы полей не важны
+        """
+        return tuple(sorted(self._replacements.items()))
+
+    def resolve(self, placeholder: str) -> str:
+        """
+        Значение для одного плейсхолдера
+        :param placeholder: плейсхолдер вместе с угловыми скобками
+        :return: значение поля или подчёркивания
+        """
+        value = self._replacements.get(placeholder)
+        if value is None:
+            return "_" * len(placeholder)
+        return value
+
+    def sub(self, text: str) -> str:
+        """
+        Заменяет все плейсхолдеры в тексте за один проход
+        :param text: исходный текст
+        :return: текст с подставленными значениями
+        """
+        return PLACEHOLDER_PATTERN.sub(lambda match: self.resolve(match.group(0)), text)
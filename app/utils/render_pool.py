@@ -0,0 +1,225 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import BinaryIO
+
+from config import settings
+from utils.buffers import map_file
+from utils.compiled_template import CompiledTemplateCache
+from utils.memory_budget import memory_budget, read_output
+from utils.placeholder_substitution import PlaceholderSubstitution
+from utils.template_renderer import render_template
+
+
+def _warm_worker() -> None:
+    """
+    Инициализация процесса: компилирует встроенный шаблон, чтобы первый
+    запрос не платил за импорт python-docx и lxml
+    """
+    from shared.templates import LOCAL_TEMPLATE_BYTES
+
+    render_template(
+        key=CompiledTemplateCache.key(LOCAL_TEMPLATE_BYTES),
+        load=lambda: LOCAL_TEMPLATE_BYTES,
+        substitution=PlaceholderSubstitution(),
+    )
+
+
+def _render_in_worker(
+    key: str, path: str, substitution: PlaceholderSubstitution
+) -> tuple[bytes, float, float]:
+    """
+    Рендеринг в процессе пула. Шаблон отображается с диска в память только при
+    промахе собственного кэша процесса.
+    :return: готовый DOCX, время начала и окончания работы
+    """
+    started_at = time.time()
+    output = render_template(
+        key=key, load=lambda: map_file(path), substitution=substitution
+    )
+    return read_output(output), started_at, time.time()
+
+
+@dataclass
+class RenderPoolMetrics:
+    workers: int
+    in_flight: int
+    queue_depth: int
+    submitted: int
+    completed: int
+    failed: int
+    utilization: float
+    average_wait_seconds: float
+    average_render_seconds: float
+
+
+class RenderPool:
+    """
+    Пул процессов для рендеринга DOCX.
+
+    Каждый процесс держит собственный кэш скомпилированных шаблонов. Содержимое
+    шаблона не передаётся через pipe: пул один раз кладёт его в каталог на диске
+    под именем хэша, а процессу передаётся только хэш и путь.
+
+    :param workers: количество процессов
+    :param spool_dir: каталог для содержимого шаблонов
+    :param spool_size: сколько шаблонов держать в каталоге
+    """
+
+    def __init__(self, workers: int, spool_dir: Path, spool_size: int):
+        self.workers = workers
+        self._spool_dir = spool_dir
+        self._spool_size = spool_size
+        self._spooled: OrderedDict[str, Path] = OrderedDict()
+        self._executor: ProcessPoolExecutor | None = None
+
+        self._started_at = 0.0
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_seconds = 0.0
+        self._render_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    async def start(self) -> None:
+        """
+        Запускает процессы и дожидается их прогрева
+        """
+        self._spool_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        self._started_at = time.monotonic()
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, time.sleep, 0)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, lambda: executor.shutdown(wait=True, cancel_futures=True)
+        )
+        shutil.rmtree(self._spool_dir, ignore_errors=True)
+        self._spooled.clear()
+
+    @staticmethod
+    def _write_spool(path: Path, body: bytes) -> None:
+        # Пишем во временный файл и переименовываем, чтобы процесс не прочитал половину
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(body)
+        os.replace(tmp_path, path)
+
+    async def _spool(self, key: str, body: bytes, force: bool = False) -> Path:
+        path = self._spooled.get(key)
+        if path is not None and not force:
+            self._spooled.move_to_end(key)
+            return path
+
+        path = self._spool_dir / f"{key}.docx"
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_spool, path, body)
+
+        self._spooled[key] = path
+        while len(self._spooled) > self._spool_size:
+            _, evicted = self._spooled.popitem(last=False)
+            evicted.unlink(missing_ok=True)
+        return path
+
+    async def render(
+        self,
+        body: bytes,
+        substitution: PlaceholderSubstitution,
+        key: str | None = None,
+    ) -> BinaryIO:
+        """
+        Заполняет шаблон в одном из процессов пула
+        :param body: содержимое шаблона
+        :param substitution: значения плейсхолдеров
+        :param key: хэш содержимого шаблона, если уже известен
+        :return: готовый DOCX
+        """
+        loop = asyncio.get_running_loop()
+        if key is None:
+            key = await loop.run_in_executor(None, CompiledTemplateCache.key, body)
+        path = await self._spool(key, body)
+
+        submitted_at = time.time()
+        self._submitted += 1
+        self._in_flight += 1
+        try:
+            try:
+                output, started_at, finished_at = await loop.run_in_executor(
+                    self._executor, _render_in_worker, key, str(path), substitution
+                )
+            except FileNotFoundError:
+                # Файл успели вытеснить до того, как процесс его прочитал
+                path = await self._spool(key, body, force=True)
+                output, started_at, finished_at = await loop.run_in_executor(
+                    self._executor, _render_in_worker, key, str(path), substitution
+                )
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        self._completed += 1
+        self._wait_seconds += max(started_at - submitted_at, 0.0)
+        self._render_seconds += finished_at - started_at
+        result = memory_budget.output()
+        result.write(output)
+        return memory_budget.finish(result)
+
+    def metrics(self) -> RenderPoolMetrics:
+        uptime = time.monotonic() - self._started_at if self.running else 0.0
+        return RenderPoolMetrics(
+            workers=self.workers,
+            in_flight=self._in_flight,
+            queue_depth=max(self._in_flight - self.workers, 0),
+            submitted=self._submitted,
+            completed=self._completed,
+            failed=self._failed,
+            utilization=(
+                min(self._render_seconds / (uptime * self.workers), 1.0)
+                if uptime
+                else 0.0
+            ),
+            average_wait_seconds=(
+                self._wait_seconds / self._completed if self._completed else 0.0
+            ),
+            average_render_seconds=(
+                self._render_seconds / self._completed if self._completed else 0.0
+            ),
+        )
+
+
+render_pool = RenderPool(
+    workers=settings.render_settings.process_workers or os.cpu_count() or 1,
+    # У каждого процесса приложения свой каталог, он удаляется при остановке пула
+    spool_dir=Path(settings.render_settings.spool_dir or tempfile.gettempdir())
+    / f"lawly-render-{os.getpid()}",
+    spool_size=settings.render_settings.template_cache_size,
+)
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+
+from config import settings
+
+
+class RenderRejectedError(Exception):
+    """
+    Рендеринг не принят: очередь заполнена или ожидание слишком долгое
+    :param retry_after: через сколько секунд имеет смысл повторить запрос
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+@dataclass
+class RenderSchedulerMetrics:
+    concurrency: int
+    running: int
+    queued: int
+    admitted: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    average_wait_seconds: float
+    max_wait_seconds: float
+
+
+class RenderScheduler:
+    """
+    Допуск рендеринга: не больше concurrency одновременно, не больше
+    queue_size в ожидании. Когда очередь заполнена, запрос сразу отклоняется,
+    а не копится в пуле потоков вместе с содержимым шаблона.
+
+    :param concurrency: одновременных рендеров
+    :param queue_size: ожидающих рендеров
+    :param queue_timeout: максимальное ожидание в очереди, с
+    :param retry_after: значение Retry-After для отклонённых запросов, с
+    """
+
+    def __init__(
+        self, concurrency: int, queue_size: int, queue_timeout: float, retry_after: int
+    ):
+        self.concurrency = concurrency
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._semaphore: asyncio.Semaphore | None = None
+
+        self._running = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Создаётся лениво, внутри работающего цикла событий
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def check(self) -> None:
+        """
+        Отклоняет запрос сразу, если очередь заполнена
+        """
+        if self._running >= self.concurrency and self._queued >= self._queue_size:
+            self._rejected_queue_full += 1
+            raise RenderRejectedError(
+                "Очередь рендеринга заполнена", retry_after=self._retry_after
+            )
+
+    async def acquire(self, bounded: bool = True) -> None:
+        """
+        Ждёт свободный слот рендеринга
+        :param bounded: учитывать лимит очереди и время ожидания. Без него
+            ждут только документы пакета, уже принятого через check()
+        """
+        if bounded:
+            self.check()
+
+        semaphore = self._get_semaphore()
+        started_at = time.monotonic()
+        self._queued += 1
+        try:
+            if bounded:
+                await asyncio.wait_for(semaphore.acquire(), self._queue_timeout)
+            else:
+                await semaphore.acquire()
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            raise RenderRejectedError(
+                "Превышено время ожидания рендеринга", retry_after=self._retry_after
+            )
+        finally:
+            self._queued -= 1
+
+        waited = time.monotonic() - started_at
+        self._running += 1
+        self._admitted += 1
+        self._wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+    def release(self) -> None:
+        self._running -= 1
+        self._get_semaphore().release()
+
+    def metrics(self) -> RenderSchedulerMetrics:
+        return RenderSchedulerMetrics(
+            concurrency=self.concurrency,
+            running=self._running,
+            queued=self._queued,
+            admitted=self._admitted,
+            rejected_queue_full=self._rejected_queue_full,
+            rejected_timeout=self._rejected_timeout,
+            average_wait_seconds=(
+                self._wait_seconds / self._admitted if self._admitted else 0.0
+            ),
+            max_wait_seconds=self._max_wait_seconds,
+        )
+
+
+render_scheduler = RenderScheduler(
+    # 0 - по количеству процессов пула или CPU
+    concurrency=settings.render_settings.concurrency
+    or settings.render_settings.process_workers
+    or os.cpu_count()
+    or 1,
+    queue_size=settings.render_settings.queue_size,
+    queue_timeout=settings.render_settings.queue_timeout,
+    retry_after=settings.render_settings.retry_after,
+)
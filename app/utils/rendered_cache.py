@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import settings
+from utils.placeholder_substitution import PlaceholderSubstitution
+
+# Версия рендеринга в ключе документа. Увеличивается при любом изменении
+# результата рендеринга, чтобы после выкладки не отдавать документы,
+# собранные прежним кодом
+RENDER_VERSION = 1
+
+
+@dataclass
+class RenderedCacheMetrics:
+    memory_entries: int
+    memory_bytes: int
+    disk_entries: int
+    disk_bytes: int
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    hit_ratio: float
+
+
+class RenderedDocumentCache:
+    """
+    Кэш готовых документов, адресуемый по содержимому.
+
+    Ключ - хэш содержимого шаблона и нормализованных значений полей, поэтому
+    повторная генерация того же документа (повтор запроса, повторное
+    скачивание) не рендерит его заново. В ключ входит и версия рендеринга, так
+    что документы прежней версии после выкладки не находятся. Два уровня:
+    память и локальный диск, оба ограничены по суммарному размеру и вытесняют
+    давно не использованное.
+
+    :param memory_size: лимит уровня в памяти, байт (0 - отключён)
+    :param disk_dir: каталог дискового уровня
+    :param disk_size: лимит дискового уровня, байт (0 - отключён)
+    :param version: версия рендеринга
+    """
+
+    def __init__(
+        self,
+        memory_size: int,
+        disk_dir: Path,
+        disk_size: int,
+        version: str = f"{RENDER_VERSION}",
+    ):
+        self._version = version
+        self._memory_size = memory_size
+        self._disk_dir = disk_dir
+        self._disk_size = disk_size
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def key(self, template_key: str, substitution: PlaceholderSubstitution) -> str:
+        """
+        Ключ документа
+        :param template_key: хэш содержимого шаблона
+        :param substitution: значения плейсхолдеров
+        """
+        fields = json.dumps(substitution.normalized(), ensure_ascii=False)
+        return hashlib.sha256(
+            f"{self._version}:{template_key}:{fields}".encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._disk_dir / f"{key}.docx"
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        # Каталог переживает перезапуск, поэтому при первом обращении
+        # восстанавливаем индекс, начиная с самых старых файлов
+        if self._disk is None:
+            self._disk = OrderedDict()
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            files = sorted(
+                (path.stat().st_mtime, path.stem, path.stat().st_size)
+                for path in self._disk_dir.glob("*.docx")
+            )
+            for _, key, size in files:
+                self._disk[key] = size
+                self._disk_bytes += size
+        return self._disk
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self._memory_size:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self._memory_size:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Готовый документ из кэша
+        :param key: ключ документа
+        :return: содержимое или None при промахе
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return data
+
+            if self._disk_size and key in self._disk_index():
+                try:
+                    data = self._path(key).read_bytes()
+                except FileNotFoundError:
+                    # Файл удалили снаружи, забываем о нём
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._disk_hits += 1
+                    self._remember(key, data)
+                    return data
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Сохраняет готовый документ
+        :param key: ключ документа
+        :param data: содержимое
+        """
+        with self._lock:
+            self._remember(key, data)
+
+            if not self._disk_size or len(data) > self._disk_size:
+                return
+            disk = self._disk_index()
+            if key in disk:
+                disk.move_to_end(key)
+                return
+
+            # Пишем во временный файл и переименовываем, чтобы не прочитать половину
+            fd, tmp_path = tempfile.mkstemp(dir=self._disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, self._path(key))
+
+            disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self._disk_size:
+                evicted, size = disk.popitem(last=False)
+                self._disk_bytes -= size
+                self._path(evicted).unlink(missing_ok=True)
+
+    async def get_async(self, key: str) -> bytes | None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get, key)
+
+    async def put_async(self, key: str, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put, key, data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in self._disk or ():
+                self._path(key).unlink(missing_ok=True)
+            self._disk = None
+            self._disk_bytes = 0
+
+    def metrics(self) -> RenderedCacheMetrics:
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return RenderedCacheMetrics(
+                memory_entries=len(self._memory),
+                memory_bytes=self._memory_bytes,
+                disk_entries=len(self._disk or ()),
+                disk_bytes=self._disk_bytes,
+                memory_hits=self._memory_hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                hit_ratio=(
+                    (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0
+                ),
+            )
+
+
+rendered_document_cache = RenderedDocumentCache(
+    memory_size=settings.render_settings.output_cache_memory_size,
+    disk_dir=Path(settings.render_settings.output_cache_dir or tempfile.gettempdir())
+    / "lawly-rendered",
+    disk_size=settings.render_settings.output_cache_disk_size,
+    # Движки собирают разные по байтам документы
+    version=f"{RENDER_VERSION}-{settings.render_settings.engine}",
+)
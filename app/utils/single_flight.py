@@ -0,0 +1,66 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Объединение одинаковых одновременных операций.
+
+    Пока операция по ключу выполняется, новые вызовы с тем же ключом не
+    запускают её заново, а ждут тот же результат. Операция идёт в отдельной
+    задаче, поэтому отмена одного ожидающего не отменяет её для остальных;
+    задача отменяется, только когда ждать её больше некому. Ошибку получают
+    все ожидающие этого запуска, но она не запоминается: следующий вызов
+    после завершения запускает операцию заново.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, operation: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет операцию или присоединяется к уже выполняющейся
+        :param key: ключ операции
+        :param operation: фабрика корутины операции
+        :return: результат операции
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(operation()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Ждать больше некому. Новые вызовы не должны присоединиться
+                # к отменяемой задаче, поэтому сразу забываем её
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Ошибку уже получили ожидающие, иначе asyncio сообщит о ней в лог
+        if flight.task.done() and not flight.task.cancelled():
+            flight.task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
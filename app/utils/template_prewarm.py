@@ -0,0 +1,153 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from lawly_db.db_models.db_session import get_session
+
+from config import settings
+from repositories.document_creation_repository import DocumentCreationRepository
+from repositories.template_repository import TemplateRepository
+from utils.blank_templates import blank_template_store
+from utils.template_store import template_blob_store
+from utils.word_template_processor import WordTemplateProcessor
+
+
+@dataclass
+class TemplatePrewarmMetrics:
+    requested: int
+    warmed: int
+    failed: int
+    timed_out: int
+    seconds: float
+
+
+async def warm_template(url: str) -> None:
+    """
+    Прогревает один шаблон: скачивает в локальное хранилище, компилирует в
+    кэши рендеринга и готовит незаполненный вариант
+    :param url: ссылка на шаблон
+    """
+    key, template = await template_blob_store.fetch(url)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        None, WordTemplateProcessor.compile_template, template, key
+    )
+    await blank_template_store.prepare(key, template)
+
+
+class TemplatePrewarmer:
+    """
+    Прогрев популярных шаблонов при старте приложения.
+
+    Выполняется в lifespan до того, как приложение начнёт принимать запросы,
+    поэтому первые запросы после выкладки не платят за скачивание и разбор
+    шаблона. Одновременно греется не больше concurrency шаблонов, а весь
+    прогрев ограничен timeout: не успевшие шаблоны отменяются, ошибки
+    отдельных шаблонов не мешают старту.
+
+    :param concurrency: сколько шаблонов греется одновременно
+    :param timeout: лимит времени на весь прогрев, с
+    :param warm: прогрев одного шаблона по ссылке
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        timeout: float,
+        warm: Callable[[str], Awaitable[None]] = warm_template,
+    ):
+        self._concurrency = max(concurrency, 1)
+        self._timeout = timeout
+        self._warm = warm
+        self._metrics = TemplatePrewarmMetrics(
+            requested=0, warmed=0, failed=0, timed_out=0, seconds=0.0
+        )
+
+    async def run(
+        self, urls: list[str], started_at: float | None = None
+    ) -> TemplatePrewarmMetrics:
+        """
+        Прогревает шаблоны
+        :param urls: ссылки на шаблоны в порядке важности
+        :param started_at: начало прогрева (time.monotonic), от которого
+        отсчитывается лимит времени
+        :return: итоги прогрева
+        """
+        if started_at is None:
+            started_at = time.monotonic()
+        timeout = max(self._timeout - (time.monotonic() - started_at), 0)
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def warm(url: str) -> None:
+            async with semaphore:
+                await self._warm(url)
+
+        tasks = [asyncio.create_task(warm(url)) for url in dict.fromkeys(urls)]
+        done, pending = set(), set()
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        failed = sum(1 for task in done if task.exception() is not None)
+        self._metrics = TemplatePrewarmMetrics(
+            requested=len(tasks),
+            warmed=len(done) - failed,
+            failed=failed,
+            timed_out=len(pending),
+            seconds=time.monotonic() - started_at,
+        )
+        return self._metrics
+
+    async def run_popular(self) -> TemplatePrewarmMetrics:
+        """
+        Прогревает шаблоны из настроек или самые популярные по созданным
+        документам. Ошибка при выборе шаблонов не прерывает старт.
+        """
+        started_at = time.monotonic()
+        try:
+            urls = await asyncio.wait_for(popular_template_urls(), self._timeout)
+        except Exception:
+            urls = []
+        return await self.run(urls, started_at=started_at)
+
+    def metrics(self) -> TemplatePrewarmMetrics:
+        return self._metrics
+
+
+async def popular_template_urls() -> list[str]:
+    """
+    Ссылки на шаблоны для прогрева: ID из настроек или самые популярные
+    за последние prewarm_days дней
+    """
+    render_settings = settings.render_settings
+    template_ids = [
+        int(template_id)
+        for template_id in render_settings.prewarm_templates.split(",")
+        if template_id.strip()
+    ]
+    if not template_ids and render_settings.prewarm_top <= 0:
+        return []
+
+    async with asynccontextmanager(get_session)() as session:
+        if not template_ids:
+            template_ids = await DocumentCreationRepository(
+                session
+            ).get_popular_template_ids(
+                since=datetime.now() - timedelta(days=render_settings.prewarm_days),
+                limit=render_settings.prewarm_top,
+            )
+        templates = await TemplateRepository(session).get_templates_by_ids(template_ids)
+
+    urls = {template.id: template.download_url for template in templates}
+    return [urls[template_id] for template_id in template_ids if template_id in urls]
+
+
+template_prewarmer = TemplatePrewarmer(
+    concurrency=settings.render_settings.prewarm_concurrency,
+    timeout=settings.render_settings.prewarm_timeout,
+)
@@ -0,0 +1,27 @@
+from typing import BinaryIO, Callable
+from zipfile import LargeZipFile
+
+from config import settings
+from utils.compiled_template import compiled_template_cache
+from utils.docx_zip_renderer import zip_template_cache
+from utils.placeholder_substitution import PlaceholderSubstitution
+
+
+def render_template(
+    key: str, load: Callable[[], bytes], substitution: PlaceholderSubstitution
+) -> BinaryIO:
+    """
+    Заполняет шаблон движком из настроек. Архивы, которые не удаётся
+    обработать на уровне ZIP, заполняются через python-docx.
+
+    :param key: хэш содержимого шаблона
+    :param load: загружает содержимое шаблона, если его нет в кэше
+    :param substitution: значения плейсхолдеров
+    :return: готовый DOCX
+    """
+    if settings.render_settings.engine == "zip":
+        try:
+            return zip_template_cache.get_by_key(key, load).render(substitution)
+        except (LargeZipFile, NotImplementedError):
+            pass
+    return compiled_template_cache.get_by_key(key, load).render(substitution)
@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+from urllib.parse import urlparse
+
+from config import settings
+from repositories.s3_repository import S3Client, S3Object, S3ObjectLocation, s3_client
+from utils.buffers import map_file
+from utils.http_client import HttpClient, http_client
+from utils.single_flight import SingleFlight
+
+# Размер куска при скачивании шаблона
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass(frozen=True)
+class TemplateVersion:
+    """
+    Версия шаблона по ссылке
+    :param key: хэш содержимого шаблона
+    :param content_type: тип содержимого
+    :param etag: ETag ответа источника
+    :param last_modified: Last-Modified ответа источника
+    :param checked_at: когда версия последний раз сверялась с источником
+    """
+
+    key: str
+    content_type: str
+    etag: str | None
+    last_modified: str | None
+    checked_at: float
+
+
+@dataclass
+class TemplateStoreMetrics:
+    files: int
+    size_bytes: int
+    mapped: int
+    fresh_hits: int
+    revalidated: int
+    downloads: int
+    downloaded_bytes: int
+    coalesced: int
+
+
+class TemplateBlobStore:
+    """
+    Локальное хранилище содержимого шаблонов, адресуемое по хэшу.
+
+    Шаблон скачивается по кускам прямо в файл, хэш считается на лету, а
+    рендереру отдаётся отображение файла в память (mmap) только для чтения.
+    Так многомегабайтный шаблон не собирается в памяти процесса целиком и не
+    копируется между скачиванием, кэшем и рендерингом: страницы файла общие
+    для всех запросов и процессов пула.
+
+    Уровней два: открытые отображения последних шаблонов в памяти и файлы в
+    каталоге, который переживает перезапуск. Для каждой ссылки запоминается
+    версия шаблона. Пока не истёк ttl, шаблон отдаётся без обращения к
+    источнику, после - сверяется условным запросом (If-None-Match /
+    If-Modified-Since), и при ответе 304 тело заново не скачивается.
+    Одновременные запросы одной ссылки объединяются в одно обращение к
+    источнику. Ссылки на наше хранилище S3 читаются напрямую через общий
+    клиент S3 (изменение проверяется HEAD-запросом по ETag), остальные -
+    по HTTP.
+
+    :param directory: каталог для файлов шаблонов
+    :param max_size: лимит каталога, байт
+    :param mapped_size: сколько отображений держать открытыми
+    :param ttl: сколько секунд версия считается актуальной без проверки
+    (0 - проверять при каждом запросе)
+    :param http: HTTP-клиент для скачивания
+    :param s3: клиент S3 для ссылок на хранилище
+    :param s3_hosts: адреса (host:port), ссылки на которые ведут в S3
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_size: int,
+        mapped_size: int,
+        ttl: float = 0,
+        http: HttpClient = http_client,
+        s3: S3Client = s3_client,
+        s3_hosts: Iterable[str] = (),
+    ):
+        self._directory = directory
+        self._max_size = max_size
+        self._mapped_size = mapped_size
+        self._ttl = ttl
+        self._http = http
+        self._s3 = s3
+        self._s3_hosts = set(s3_hosts)
+        self._lock = threading.Lock()
+        # Файлы каталога в порядке использования и их размеры
+        self._files: OrderedDict[str, int] | None = None
+        self._size = 0
+        self._mapped: OrderedDict[str, memoryview] = OrderedDict()
+        self._versions: dict[str, TemplateVersion] = {}
+        self._flights: SingleFlight[tuple[str, S3Object]] = SingleFlight()
+
+        self._fresh_hits = 0
+        self._revalidated = 0
+        self._downloads = 0
+        self._downloaded_bytes = 0
+
+    def path(self, key: str) -> Path:
+        return self._directory / f"{key}.docx"
+
+    def _version_path(self, url: str) -> Path:
+        return self._directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _index(self) -> OrderedDict[str, int]:
+        # Каталог переживает перезапуск, поэтому при первом обращении
+        # восстанавливаем индекс, начиная с самых старых файлов
+        if self._files is None:
+            self._files = OrderedDict()
+            self._directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(
+                (path.stat().st_mtime, path.stem, path.stat().st_size)
+                for path in self._directory.glob("*.docx")
+            )
+            for _, key, size in files:
+                self._files[key] = size
+                self._size += size
+        return self._files
+
+    def _map(self, key: str) -> memoryview:
+        # Вызывается под блокировкой
+        view = self._mapped.get(key)
+        if view is None:
+            view = map_file(self.path(key))
+            self._mapped[key] = view
+            while len(self._mapped) > self._mapped_size:
+                self._mapped.popitem(last=False)
+        self._mapped.move_to_end(key)
+        if key in self._index():
+            self._files.move_to_end(key)
+        return view
+
+    def _cached(self, key: str) -> memoryview | None:
+        """
+        Отображение шаблона, если он есть в хранилище
+        """
+        with self._lock:
+            if key not in self._mapped and key not in self._index():
+                return None
+            try:
+                return self._map(key)
+            except FileNotFoundError:
+                # Файл удалили снаружи, забываем о нём
+                self._size -= self._files.pop(key, 0)
+                return None
+
+    def _store(self, key: str, tmp_path: str, size: int) -> memoryview:
+        with self._lock:
+            files = self._index()
+            if key in self._mapped:
+                os.unlink(tmp_path)
+                return self._map(key)
+
+            os.replace(tmp_path, self.path(key))
+            if key not in files:
+                files[key] = size
+                self._size += size
+            files.move_to_end(key)
+            while self._size > self._max_size and len(files) > 1:
+                evicted, evicted_size = files.popitem(last=False)
+                self._size -= evicted_size
+                # Открытые отображения остаются рабочими и после удаления файла
+                self.path(evicted).unlink(missing_ok=True)
+                self._mapped.pop(evicted, None)
+            return self._map(key)
+
+    def _load_version(self, url: str) -> TemplateVersion | None:
+        with self._lock:
+            self._index()
+        try:
+            data = json.loads(self._version_path(url).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        return TemplateVersion(**data)
+
+    def _save_version(self, url: str, version: TemplateVersion) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(asdict(version), tmp_file)
+        os.replace(tmp_path, self._version_path(url))
+
+    async def fetch(self, url: str) -> tuple[str, S3Object]:
+        """
+        Шаблон по ссылке: из хранилища, если он не изменился, иначе скачивается
+        :param url: ссылка на шаблон
+        :return: хэш содержимого и шаблон, тело которого - отображение файла
+        """
+        return await self._flights.do(url, lambda: self._fetch(url))
+
+    async def _fetch(self, url: str) -> tuple[str, S3Object]:
+        loop = asyncio.get_running_loop()
+        version = self._versions.get(url)
+        if version is None:
+            # Версии сохраняются рядом с файлами и переживают перезапуск
+            version = await loop.run_in_executor(None, self._load_version, url)
+
+        view = None
+        if version is not None:
+            view = await loop.run_in_executor(None, self._cached, version.key)
+        if view is not None and time.time() - version.checked_at < self._ttl:
+            self._fresh_hits += 1
+            return version.key, S3Object(body=view, content_type=version.content_type)
+
+        known = version if view is not None else None
+        location = self._s3_location(url)
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+
+                def write(chunk: bytes) -> None:
+                    nonlocal size
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+                if location is not None:
+                    downloaded = await self._download_s3(location, known, write)
+                else:
+                    downloaded = await self._download_http(url, known, write)
+
+            if downloaded is None:
+                Path(tmp_path).unlink()
+                self._revalidated += 1
+                key = version.key
+                content_type = version.content_type
+                etag, last_modified = version.etag, version.last_modified
+            else:
+                content_type, etag, last_modified = downloaded
+                key = digest.hexdigest()
+                view = await loop.run_in_executor(
+                    None, self._store, key, tmp_path, size
+                )
+                self._downloads += 1
+                self._downloaded_bytes += size
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        version = TemplateVersion(
+            key=key,
+            content_type=content_type,
+            etag=etag,
+            last_modified=last_modified,
+            checked_at=time.time(),
+        )
+        self._versions[url] = version
+        await loop.run_in_executor(None, self._save_version, url, version)
+        return key, S3Object(body=view, content_type=content_type)
+
+    def _s3_location(self, url: str) -> S3ObjectLocation | None:
+        """
+        Бакет и ключ, если ссылка ведёт в наше хранилище S3
+        """
+        if urlparse(url).netloc not in self._s3_hosts:
+            return None
+        try:
+            return S3Client.from_url(url)
+        except ValueError:
+            return None
+
+    async def _download_http(
+        self,
+        url: str,
+        known: TemplateVersion | None,
+        write: Callable[[bytes], None],
+    ) -> tuple[str, str | None, str | None] | None:
+        """
+        Скачивает шаблон по HTTP условным запросом
+        :param known: сохранённая версия, если файл шаблона есть локально
+        :param write: приёмник содержимого
+        :return: тип содержимого, ETag и Last-Modified или None, если не изменился
+        """
+        headers = {}
+        if known is not None:
+            if known.etag:
+                headers["If-None-Match"] = known.etag
+            if known.last_modified:
+                headers["If-Modified-Since"] = known.last_modified
+
+        async with self._http.get(url, headers=headers) as resp:
+            if resp.status == 304 and known is not None:
+                return None
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                write(chunk)
+            return (
+                resp.content_type,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+            )
+
+    async def _download_s3(
+        self,
+        location: S3ObjectLocation,
+        known: TemplateVersion | None,
+        write: Callable[[bytes], None],
+    ) -> tuple[str, str | None, str | None] | None:
+        """
+        Скачивает шаблон напрямую из S3, минуя публичный адрес. Изменение
+        проверяется HEAD-запросом по ETag
+        :param known: сохранённая версия, если файл шаблона есть локально
+        :param write: приёмник содержимого
+        :return: тип содержимого, ETag и Last-Modified или None, если не изменился
+        """
+        head = await self._s3.head(location.bucket, location.key)
+        if head is None:
+            raise FileNotFoundError(f"{location.bucket}/{location.key}")
+        if known is not None and known.etag and known.etag == head.etag:
+            return None
+
+        stream = await self._s3.stream(location.bucket, location.key)
+        if stream is None:
+            raise FileNotFoundError(f"{location.bucket}/{location.key}")
+        async for chunk in stream.chunks:
+            write(chunk)
+        return (
+            stream.content_type or "application/octet-stream",
+            stream.etag,
+            head.last_modified,
+        )
+
+    def metrics(self) -> TemplateStoreMetrics:
+        with self._lock:
+            return TemplateStoreMetrics(
+                files=len(self._index()),
+                size_bytes=self._size,
+                mapped=len(self._mapped),
+                fresh_hits=self._fresh_hits,
+                revalidated=self._revalidated,
+                downloads=self._downloads,
+                downloaded_bytes=self._downloaded_bytes,
+                coalesced=self._flights.coalesced,
+            )
+
+
+template_blob_store = TemplateBlobStore(
+    directory=Path(settings.render_settings.template_dir or tempfile.gettempdir())
+    / "lawly-templates",
+    max_size=settings.render_settings.template_store_size,
+    mapped_size=settings.render_settings.template_cache_size,
+    ttl=settings.render_settings.template_ttl,
+    s3_hosts=[
+        urlparse(settings.s3_settings.endpoint_url).netloc,
+        *filter(None, settings.render_settings.template_s3_hosts.split(",")),
+    ],
+)
@@ -0,0 +1,94 @@
+import re
+import zipfile
+from copy import copy
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from shared.templates import EMPTY_DOCUMENT_BYTES
+from utils.zip_writer import ZipWriter, read_raw_entry
+
+DOCUMENT_PART = "word/document.xml"
+
+# Символы, недопустимые в XML 1.0
+INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+NEWLINES = re.compile(r"\r\n?")
+
+
+def _run_xml(line: str) -> str:
+    # Табуляция в Word - отдельный элемент, а не символ текста
+    parts = []
+    for index, chunk in enumerate(line.split("\t")):
+        if index:
+            parts.append("<w:tab/>")
+        if chunk:
+            parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return f"<w:r>{''.join(parts)}</w:r>"
+
+
+def paragraphs_xml(text: str) -> bytes:
+    """
+    XML абзацев для текста: каждая строка становится отдельным абзацем
+    :param text: произвольный текст
+    :return: последовательность элементов w:p
+    """
+    text = INVALID_XML_CHARS.sub("", NEWLINES.sub("\n", text))
+    return "".join(
+        f"<w:p>{_run_xml(line)}</w:p>" if line else "<w:p/>"
+        for line in text.split("\n")
+    ).encode("utf-8")
+
+
+class TextDocumentSkeleton:
+    """
+    Заготовка DOCX для документов из произвольного текста.
+
+    Архив разбирается один раз: все записи, кроме основного документа,
+    копируются как есть, а в основной документ перед свойствами раздела
+    вставляется XML абзацев.
+
+    :param body: пустой DOCX
+    """
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self._entries: list[zipfile.ZipInfo] = []
+
+        with zipfile.ZipFile(BytesIO(body)) as archive:
+            for info in archive.infolist():
+                # Проверяем, что запись можно скопировать как есть
+                read_raw_entry(body, info)
+                self._entries.append(info)
+            xml = archive.read(DOCUMENT_PART)
+
+        # Абзацы идут перед свойствами раздела в конце w:body
+        position = xml.rfind(b"<w:sectPr")
+        if position == -1:
+            position = xml.rfind(b"</w:body>")
+        if position == -1:
+            raise ValueError(f"В {DOCUMENT_PART} нет w:body")
+        self._head, self._tail = xml[:position], xml[position:]
+
+    def render(self, text: str) -> BytesIO:
+        """
+        Документ с текстом
+        :param text: произвольный текст
+        :return: готовый DOCX
+        """
+        output_stream = BytesIO()
+        writer = ZipWriter(output_stream.write)
+
+        for info in self._entries:
+            if info.filename == DOCUMENT_PART:
+                writer.write_entry(
+                    copy(info), self._head + paragraphs_xml(text) + self._tail
+                )
+            else:
+                writer.write_raw(info, read_raw_entry(self._body, info))
+
+        writer.close()
+        output_stream.seek(0)
+
+        return output_stream
+
+
+text_document_skeleton = TextDocumentSkeleton(EMPTY_DOCUMENT_BYTES)
@@ -2,19 +2,49 @@ from urllib.parse import quote
 
 from fastapi.responses import StreamingResponse
 from io import BytesIO
-from docx import Document
-from typing import List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Callable, List
+from zipfile import LargeZipFile, ZipInfo
 import asyncio
-import re
+import time
 
-from modules.documents.dto import GenerateDocumentFieldDTO
+from config import settings
+from modules.documents.dto import (
+    GenerateDocumentBatchItemDTO,
+    GenerateDocumentFieldDTO,
+)
 from repositories.s3_repository import S3Object
+from utils.compiled_template import compiled_template_cache
+from utils.docx_zip_renderer import zip_template_cache
+from utils.memory_budget import memory_budget, output_size, read_output
+from utils.placeholder_index import placeholder_index_cache
+from utils.placeholder_substitution import PlaceholderSubstitution
+from utils.render_pool import render_pool
+from utils.render_scheduler import render_scheduler
+from utils.rendered_cache import rendered_document_cache
+from utils.template_renderer import render_template
+from utils.text_document import text_document_skeleton
+from utils.zip_writer import ZipWriter
+
+
+def _batch_filename(index: int, filename: str | None) -> str:
+    name = (filename or "document").replace("/", "_").replace("\\", "_")
+    return f"{index:04d}_{name}.docx"
+
+
+def _batch_zip_info(filename: str) -> ZipInfo:
+    # Документы DOCX уже сжаты, поэтому кладём их в архив без сжатия
+    info = ZipInfo(filename, date_time=time.localtime()[:6])
+    info.external_attr = 0o644 << 16
+    return info
 
 
 class WordTemplateProcessor:
     @staticmethod
     async def fill_template(
-        s3_object: S3Object, fields: List[GenerateDocumentFieldDTO]
+        s3_object: S3Object,
+        fields: List[GenerateDocumentFieldDTO],
+        template_key: str | None = None,
     ) -> StreamingResponse:
         """
         Fill the DOCX template with provided fields and return as StreamingResponse.
@@ -22,112 +52,306 @@ class WordTemplateProcessor:
         Args:
             s3_object (S3Object): The original DOCX template as S3Object.
             fields (List[GenerateDocumentFieldDTO]): List of field mappings {name: ..., value: ...}
+            template_key (str | None): Content hash of the template, if already known.
 
         Returns:
             StreamingResponse: Filled DOCX ready to download
         """
 
-        loop = asyncio.get_event_loop()
-        output_stream = await loop.run_in_executor(
-            None, WordTemplateProcessor._process_docx, s3_object, fields
+        template_key = await WordTemplateProcessor._template_key(
+            s3_object, template_key
+        )
+        content = await WordTemplateProcessor._render_content(
+            s3_object, fields, template_key
         )
 
         return StreamingResponse(
-            output_stream,
+            content,
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={"Content-Disposition": "attachment; filename=template.docx"},
         )
 
     @staticmethod
-    def _process_docx(
-        s3_object: S3Object, fields: List[GenerateDocumentFieldDTO]
-    ) -> BytesIO:
-        template_stream = BytesIO(s3_object.body)
-        doc = Document(template_stream)
-
-        # Сначала заменим известные поля
-        replacements = {f"<{field.name}>": field.value for field in fields}
-
-        def replace_known_and_unknown(text: str) -> str:
-            # Подставляем известные
-            for search_text, replace_text in replacements.items():
-                text = text.replace(search_text, replace_text)
-
-            # Оставшиеся плейсхолдеры типа <...> заменим на подчёркивания
-            pattern = re.compile(r"<[^<>]+>")
-            return pattern.sub(lambda m: "_" * len(m.group(0)), text)
-
-        # Заменяем в параграфах
-        for paragraph in doc.paragraphs:
-            paragraph.text = replace_known_and_unknown(paragraph.text)
-
-        # Заменяем в таблицах
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    cell.text = replace_known_and_unknown(cell.text)
-
-        output_stream = BytesIO()
-        doc.save(output_stream)
-        output_stream.seek(0)
+    async def fill_template_batch(
+        s3_object: S3Object,
+        documents: List[GenerateDocumentBatchItemDTO],
+        template_key: str | None = None,
+    ) -> StreamingResponse:
+        """
+        Заполняет один шаблон несколькими наборами полей и отдаёт ZIP-архив.
 
-        return output_stream
+        Документы рендерятся параллельно и попадают в архив по мере готовности,
+        поэтому архив целиком в памяти не собирается.
+
+        :param s3_object: Исходный DOCX шаблон
+        :param documents: Наборы полей, по одному на документ
+        :param template_key: хэш содержимого шаблона, если уже известен
+        :return: StreamingResponse с ZIP-архивом
+        """
+        render_scheduler.check()
+        template_key = await WordTemplateProcessor._template_key(
+            s3_object, template_key
+        )
+
+        return StreamingResponse(
+            WordTemplateProcessor._stream_batch(s3_object, documents, template_key),
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=documents.zip"},
+        )
 
     @staticmethod
-    async def generate_docx_response(text: str, filename: str) -> StreamingResponse:
+    async def _stream_batch(
+        s3_object: S3Object,
+        documents: List[GenerateDocumentBatchItemDTO],
+        template_key: str,
+    ) -> AsyncIterator[bytes]:
+        # Слот занят, пока документ не записан в архив и не отдан клиенту,
+        # поэтому отрендеренных документов в памяти не больше concurrency,
+        # даже если клиент читает медленно или перестал читать
+        semaphore = asyncio.Semaphore(settings.render_settings.batch_concurrency)
+        ready: asyncio.Queue[tuple[str, bytes | None]] = asyncio.Queue()
+        tasks: list[asyncio.Task] = []
+
+        async def render_one(filename: str, fields: List[GenerateDocumentFieldDTO]):
+            data = None
+            try:
+                # Пакет уже принят, поэтому документы ждут слот без таймаута
+                async with WordTemplateProcessor._admission(s3_object, bounded=False):
+                    output = await WordTemplateProcessor._render_async(
+                        s3_object, fields, template_key
+                    )
+                    data = read_output(output)
+            except Exception:
+                pass
+            ready.put_nowait((filename, data))
+
+        async def schedule() -> None:
+            for index, document in enumerate(documents, start=1):
+                await semaphore.acquire()
+                tasks.append(
+                    asyncio.create_task(
+                        render_one(
+                            _batch_filename(index, document.filename), document.fields
+                        )
+                    )
+                )
+
+        scheduler = asyncio.create_task(schedule())
+        chunks: list[bytes] = []
+        writer = ZipWriter(chunks.append)
+        failed = []
+        try:
+            for _ in range(len(documents)):
+                filename, data = await ready.get()
+                if data is None:
+                    failed.append(filename)
+                else:
+                    writer.write_entry(_batch_zip_info(filename), data)
+                    del data
+                    yield b"".join(chunks)
+                    chunks.clear()
+                semaphore.release()
+
+            # Ответ уже отдаётся, поэтому ошибки перечисляются в самом архиве
+            if failed:
+                writer.write_entry(
+                    _batch_zip_info("errors.txt"), "\n".join(failed).encode()
+                )
+            writer.close()
+            yield b"".join(chunks)
+        finally:
+            scheduler.cancel()
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _template_key(s3_object: S3Object, template_key: str | None) -> str:
         """
-        Асинхронная генерация ответа FastAPI для скачивания docx-файла из текста.
+        Хэш содержимого шаблона. Шаблоны из хранилища приходят с уже
+        посчитанным хэшем, и многомегабайтное тело заново не хэшируется
+        """
+        if template_key is not None:
+            return template_key
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, compiled_template_cache.key, s3_object.body
+        )
 
-        :param text: Текст, который будет записан в Word-документ.
-        :param filename: Название файла для скачивания (с расширением .docx).
-        :return: StreamingResponse для FastAPI.
+    @staticmethod
+    async def _render_content(
+        s3_object: S3Object, fields: List[GenerateDocumentFieldDTO], template_key: str
+    ) -> BinaryIO | AsyncIterator[bytes | memoryview]:
         """
+        Содержимое для StreamingResponse. Уже готовые документы отдаются из кэша,
+        движок zip в пуле потоков отдаёт архив по мере сборки, остальные
+        варианты - готовым буфером.
+        """
+        substitution = PlaceholderSubstitution.from_fields(fields)
+        loop = asyncio.get_event_loop()
+        cache_key = rendered_document_cache.key(template_key, substitution)
+
+        cached = await rendered_document_cache.get_async(cache_key)
+        if cached is not None:
+            return BytesIO(cached)
+
+        release = await WordTemplateProcessor._admit(s3_object)
+        try:
+            if settings.render_settings.engine == "zip" and not render_pool.running:
+                try:
+                    compiled = await loop.run_in_executor(
+                        None,
+                        zip_template_cache.get_by_key,
+                        template_key,
+                        lambda: s3_object.body,
+                    )
+                except (LargeZipFile, NotImplementedError):
+                    pass
+                else:
+                    # Слот и память освобождаются, когда отрендерены все части,
+                    # не дожидаясь, пока клиент дочитает ответ
+                    return WordTemplateProcessor._cache_stream(
+                        cache_key, compiled.stream(substitution, on_rendered=release)
+                    )
+
+            output_stream = await WordTemplateProcessor._render_async(
+                s3_object, fields, template_key
+            )
+        except BaseException:
+            release()
+            raise
+        release()
+
+        # Документы, ушедшие на диск, не читаем обратно в память ради кэша
+        if output_size(output_stream) <= memory_budget.spool_threshold:
+            await rendered_document_cache.put_async(
+                cache_key, read_output(output_stream)
+            )
+        return output_stream
 
-        # Создаем новый документ
-        doc = Document()
-        doc.add_paragraph(text)
+    @staticmethod
+    async def _cache_stream(
+        cache_key: str, chunks: AsyncIterator[bytes | memoryview]
+    ) -> AsyncIterator[bytes | memoryview]:
+        # Документ попадает в кэш, только если был отдан целиком и не слишком велик
+        rendered: list[bytes | memoryview] | None = []
+        size = 0
+        async for chunk in chunks:
+            if rendered is not None:
+                size += len(chunk)
+                if size > memory_budget.spool_threshold:
+                    rendered = None
+                else:
+                    rendered.append(chunk)
+            yield chunk
+        if rendered is not None:
+            await rendered_document_cache.put_async(cache_key, b"".join(rendered))
 
-        # Сохраняем документ в оперативную память
-        docx_io = BytesIO()
-        doc.save(docx_io)
-        docx_io.seek(0)
+    @staticmethod
+    async def _admit(s3_object: S3Object, bounded: bool = True) -> Callable[[], None]:
+        """
+        Допуск рендеринга: слот планировщика и резерв памяти под шаблон
+        :param s3_object: шаблон
+        :param bounded: учитывать лимит очереди и время ожидания
+        :return: освобождает слот и память, повторный вызов ничего не делает
+        """
+        await render_scheduler.acquire(bounded=bounded)
+        try:
+            reserved = await memory_budget.acquire(
+                len(s3_object.body) * settings.render_settings.memory_factor
+            )
+        except BaseException:
+            render_scheduler.release()
+            raise
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                memory_budget.release(reserved)
+                render_scheduler.release()
+
+        return release
 
-        # Кодируем имя файла для корректного отображения
-        quoted_filename = quote(filename)
+    @staticmethod
+    @asynccontextmanager
+    async def _admission(
+        s3_object: S3Object, bounded: bool = True
+    ) -> AsyncIterator[None]:
+        release = await WordTemplateProcessor._admit(s3_object, bounded=bounded)
+        try:
+            yield
+        finally:
+            release()
 
-        # Возвращаем StreamingResponse
-        return StreamingResponse(
-            docx_io,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={
-                "Content-Disposition": f"attachment; filename*=utf-8''{quoted_filename}"
-            },
+    @staticmethod
+    async def _render_async(
+        s3_object: S3Object, fields: List[GenerateDocumentFieldDTO], template_key: str
+    ) -> BinaryIO:
+        if render_pool.running:
+            return await render_pool.render(
+                s3_object.body,
+                PlaceholderSubstitution.from_fields(fields),
+                key=template_key,
+            )
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, WordTemplateProcessor._render, s3_object, fields, template_key
         )
 
     @staticmethod
-    async def replace_placeholders_with_underscores(
-        s3_object: S3Object, filename: str = "updated_template.docx"
-    ) -> StreamingResponse:
+    def _render(
+        s3_object: S3Object, fields: List[GenerateDocumentFieldDTO], template_key: str
+    ) -> BinaryIO:
+        return render_template(
+            key=template_key,
+            load=lambda: s3_object.body,
+            substitution=PlaceholderSubstitution.from_fields(fields),
+        )
+
+    @staticmethod
+    def compile_template(s3_object: S3Object, template_key: str | None = None) -> None:
         """
-        Заменяет все плейсхолдеры вида <...> в Word-документе на подчёркивания той же длины и возвращает StreamingResponse.
+        Заранее компилирует шаблон в кэши, не рендеря документ: перечень
+        плейсхолдеров для проверки полей и шаблон для выбранного движка
+        :param s3_object: шаблон
+        :param template_key: хэш содержимого шаблона, если уже известен
+        """
+        key = template_key or compiled_template_cache.key(s3_object.body)
+        placeholder_index_cache.get_by_key(key, lambda: s3_object.body)
+        if render_pool.running:
+            # Процессы пула компилируют шаблоны в своих кэшах
+            return
+        if settings.render_settings.engine == "zip":
+            try:
+                zip_template_cache.get_by_key(key, lambda: s3_object.body)
+                return
+            except (LargeZipFile, NotImplementedError):
+                pass
+        compiled_template_cache.get_by_key(key, lambda: s3_object.body)
 
-        Args:
-            s3_object (S3Object): Исходный DOCX файл в виде S3Object.
-            filename (str): Имя итогового файла для скачивания.
+    @staticmethod
+    async def generate_docx_response(text: str, filename: str) -> StreamingResponse:
+        """
+        Асинхронная генерация ответа FastAPI для скачивания docx-файла из текста.
 
-        Returns:
-            StreamingResponse: DOCX файл с заменой.
+        :param text: Текст, который будет записан в Word-документ.
+        :param filename: Название файла для скачивания (с расширением .docx).
+        :return: StreamingResponse для FastAPI.
         """
 
+        # Документ собирается из заготовки в пуле потоков, не блокируя цикл событий
         loop = asyncio.get_event_loop()
-        output_stream = await loop.run_in_executor(
-            None, WordTemplateProcessor._replace_all_placeholders, s3_object
-        )
+        docx_io = await loop.run_in_executor(None, text_document_skeleton.render, text)
 
+        # Кодируем имя файла для корректного отображения
         quoted_filename = quote(filename)
 
+        # Возвращаем StreamingResponse
         return StreamingResponse(
-            output_stream,
+            docx_io,
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={
                 "Content-Disposition": f"attachment; filename*=utf-8''{quoted_filename}"
@@ -135,28 +359,19 @@ class WordTemplateProcessor:
         )
 
     @staticmethod
-    def _replace_all_placeholders(s3_object: S3Object) -> BytesIO:
-        template_stream = BytesIO(s3_object.body)
-        doc = Document(template_stream)
-
-        # Регулярка для поиска <...>
-        pattern = re.compile(r"<[^<>]+>")
-
-        def replace_in_text(text: str) -> str:
-            return pattern.sub(lambda m: "_" * len(m.group(0)), text)
-
-        # Заменяем в параграфах
-        for paragraph in doc.paragraphs:
-            paragraph.text = replace_in_text(paragraph.text)
-
-        # Заменяем в таблицах
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    cell.text = replace_in_text(cell.text)
-
-        output_stream = BytesIO()
-        doc.save(output_stream)
-        output_stream.seek(0)
-
-        return output_stream
+    async def render_empty_template(
+        s3_object: S3Object, template_key: str | None = None
+    ) -> BinaryIO:
+        """
+        Незаполненный вариант шаблона: все плейсхолдеры заменены подчёркиваниями
+        :param s3_object: исходный DOCX
+        :param template_key: хэш содержимого шаблона, если уже известен
+        :return: готовый DOCX
+        """
+        template_key = await WordTemplateProcessor._template_key(
+            s3_object, template_key
+        )
+        async with WordTemplateProcessor._admission(s3_object):
+            return await WordTemplateProcessor._render_async(
+                s3_object, [], template_key
+            )
@@ -0,0 +1,193 @@
+import struct
+import zlib
+from typing import Callable
+from zipfile import ZIP_DEFLATED, ZIP_STORED, LargeZipFile, ZipInfo
+
+LOCAL_HEADER_SIGNATURE = 0x04034B50
+CENTRAL_DIRECTORY_SIGNATURE = 0x02014B50
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = 0x06054B50
+
+LOCAL_HEADER_STRUCT = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_DIRECTORY_STRUCT = struct.Struct("<IBBHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY_STRUCT = struct.Struct("<IHHHHIIH")
+
+# Флаги: 0x1 - шифрование, 0x8 - размеры в дескрипторе после данных, 0x800 - имя в UTF-8
+FLAG_ENCRYPTED = 0x1
+FLAG_DATA_DESCRIPTOR = 0x8
+FLAG_UTF8 = 0x800
+
+ZIP32_LIMIT = 0xFFFFFFFF
+
+
+def _dos_datetime(info: ZipInfo) -> tuple[int, int]:
+    year, month, day, hour, minute, second = info.date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | second // 2
+    return dos_time, dos_date
+
+
+def _encode_filename(info: ZipInfo) -> tuple[bytes, int]:
+    flags = info.flag_bits & ~(FLAG_DATA_DESCRIPTOR | FLAG_UTF8)
+    try:
+        return info.filename.encode("ascii"), flags
+    except UnicodeEncodeError:
+        return info.filename.encode("utf-8"), flags | FLAG_UTF8
+
+
+def read_raw_entry(archive: bytes | memoryview, info: ZipInfo) -> memoryview:
+    """
+    Возвращает сжатые данные записи архива без распаковки
+    :param archive: содержимое ZIP-архива
+    :param info: запись из центрального каталога этого архива
+    :return: срез сжатых данных
+    """
+    if info.flag_bits & FLAG_ENCRYPTED:
+        raise NotImplementedError("Зашифрованные записи ZIP не поддерживаются")
+
+    view = memoryview(archive)
+    header = LOCAL_HEADER_STRUCT.unpack_from(view, info.header_offset)
+    if header[0] != LOCAL_HEADER_SIGNATURE:
+        raise ValueError(f"Повреждён локальный заголовок записи {info.filename}")
+
+    name_length, extra_length = header[9], header[10]
+    start = info.header_offset + LOCAL_HEADER_STRUCT.size + name_length + extra_length
+    return view[start : start + info.compress_size]
+
+
+def compress_entry(info: ZipInfo, data: bytes) -> bytes:
+    """
+    Сжимает данные записи методом из info и заполняет в info CRC и размеры
+    :param info: описание записи
+    :param data: несжатые данные
+    :return: сжатые данные для write_raw
+    """
+    if info.compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+    elif info.compress_type == ZIP_STORED:
+        compressed = data
+    else:
+        raise NotImplementedError(
+            f"Метод сжатия {info.compress_type} не поддерживается"
+        )
+
+    info.CRC = zlib.crc32(data)
+    info.file_size = len(data)
+    info.compress_size = len(compressed)
+    return compressed
+
+
+class ZipWriter:
+    """
+    Минимальный писатель ZIP-архива.
+
+    В отличие от zipfile умеет копировать уже сжатые записи другого архива
+    байт в байт, без распаковки и повторного сжатия. ZIP64 не поддерживается.
+
+    :param write: функция, получающая очередной кусок архива
+    """
+
+    def __init__(self, write: Callable[[bytes], object]):
+        self._write = write
+        self._offset = 0
+        self._central_directory: list[bytes] = []
+
+    def _emit(self, chunk: bytes | memoryview) -> None:
+        self._write(chunk)
+        self._offset += len(chunk)
+
+    def write_raw(self, info: ZipInfo, data: bytes | memoryview) -> None:
+        """
+        Записывает уже сжатые данные. CRC, метод сжатия и размеры берутся из info
+        :param info: описание записи
+        :param data: сжатые данные
+        """
+        if (
+            info.file_size > ZIP32_LIMIT
+            or info.compress_size > ZIP32_LIMIT
+            or self._offset > ZIP32_LIMIT
+        ):
+            raise LargeZipFile("ZIP64 не поддерживается")
+
+        filename, flags = _encode_filename(info)
+        dos_time, dos_date = _dos_datetime(info)
+        header_offset = self._offset
+
+        self._emit(
+            LOCAL_HEADER_STRUCT.pack(
+                LOCAL_HEADER_SIGNATURE,
+                info.extract_version,
+                flags,
+                info.compress_type,
+                dos_time,
+                dos_date,
+                info.CRC,
+                info.compress_size,
+                info.file_size,
+                len(filename),
+                0,
+            )
+            + filename
+        )
+        self._emit(data)
+
+        self._central_directory.append(
+            CENTRAL_DIRECTORY_STRUCT.pack(
+                CENTRAL_DIRECTORY_SIGNATURE,
+                info.create_version,
+                info.create_system,
+                info.extract_version,
+                flags,
+                info.compress_type,
+                dos_time,
+                dos_date,
+                info.CRC,
+                info.compress_size,
+                info.file_size,
+                len(filename),
+                0,
+                0,
+                0,
+                info.internal_attr,
+                info.external_attr,
+                header_offset,
+            )
+            + filename
+        )
+
+    def write_entry(self, info: ZipInfo, data: bytes) -> None:
+        """
+        Сжимает и записывает данные методом из info
+        :param info: описание записи (CRC и размеры будут пересчитаны)
+        :param data: несжатые данные
+        """
+        self.write_raw(info, compress_entry(info, data))
+
+    def close(self) -> None:
+        """
+        Записывает центральный каталог и завершающую запись архива
+        """
+        central_directory_offset = self._offset
+        central_directory = b"".join(self._central_directory)
+        # Последняя запись может начаться до 4 ГиБ и закончиться после них:
+        # смещение каталога тогда не помещается в завершающую запись
+        if (
+            len(self._central_directory) > 0xFFFF
+            or central_directory_offset > ZIP32_LIMIT
+            or len(central_directory) > ZIP32_LIMIT
+        ):
+            raise LargeZipFile("ZIP64 не поддерживается")
+
+        self._emit(central_directory)
+        self._emit(
+            END_OF_CENTRAL_DIRECTORY_STRUCT.pack(
+                END_OF_CENTRAL_DIRECTORY_SIGNATURE,
+                0,
+                0,
+                len(self._central_directory),
+                len(self._central_directory),
+                len(central_directory),
+                central_directory_offset,
+                0,
+            )
+        )
@@ -0,0 +1,108 @@
+"""
+Накладные расходы одного обращения к S3: новая сессия aioboto3 на каждый
+вызов (как было) против общего клиента с пулом соединений.
+
+Запуск из корня репозитория с переменными окружения приложения
+(нужен moto[server]):
+
+    PYTHONPATH=app python tests/benchmark_s3_client.py [вызовов]
+
+Вместо moto можно указать MinIO через переменные S3_ENDPOINT_URL,
+S3_ACCESS_KEY и S3_SECRET_KEY.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import aioboto3
+import boto3
+
+BUCKET = "benchmark"
+KEY = "template.docx"
+BODY = os.urandom(64 * 1024)
+
+
+def start_endpoint() -> tuple[str, object | None]:
+    if os.environ.get("S3_ENDPOINT_URL"):
+        return os.environ["S3_ENDPOINT_URL"], None
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+async def per_call_session(endpoint: str, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        session = aioboto3.Session()
+        async with session.resource(
+            's3',
+            endpoint_url=endpoint,
+            config=boto3.session.Config(signature_version='s3v4'),
+            aws_access_key_id=os.environ["S3_ACCESS_KEY"],
+            aws_secret_access_key=os.environ["S3_SECRET_KEY"],
+            verify=False,
+        ) as s3:
+            obj = await (await s3.Bucket(BUCKET)).Object(KEY)
+            content = await obj.get()
+            await content["Body"].read()
+    return (time.perf_counter() - started) / calls
+
+
+async def pooled_client(endpoint: str, calls: int) -> float:
+    from repositories.s3_repository import S3Client
+
+    client = S3Client(
+        endpoint_url=endpoint,
+        access_key=os.environ["S3_ACCESS_KEY"],
+        secret_key=os.environ["S3_SECRET_KEY"],
+        max_pool_connections=10,
+        connect_timeout=5,
+        read_timeout=60,
+        max_attempts=3,
+    )
+    await client.start()
+    started = time.perf_counter()
+    for _ in range(calls):
+        await client.get(BUCKET, KEY)
+    elapsed = (time.perf_counter() - started) / calls
+    await client.close()
+    return elapsed
+
+
+async def main(calls: int) -> None:
+    endpoint, server = start_endpoint()
+    os.environ.setdefault("S3_ACCESS_KEY", "testing")
+    os.environ.setdefault("S3_SECRET_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("S3_ENDPOINT_URL", endpoint)
+    os.environ.setdefault("S3_BUCKET_NAME", BUCKET)
+    try:
+        s3 = boto3.client(
+            "s3",
+            endpoint_url=endpoint,
+            aws_access_key_id=os.environ["S3_ACCESS_KEY"],
+            aws_secret_access_key=os.environ["S3_SECRET_KEY"],
+        )
+        if BUCKET not in {b["Name"] for b in s3.list_buckets()["Buckets"]}:
+            s3.create_bucket(Bucket=BUCKET)
+        s3.put_object(Bucket=BUCKET, Key=KEY, Body=BODY)
+
+        before = await per_call_session(endpoint, calls)
+        after = await pooled_client(endpoint, calls)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{calls} вызовов get_object, {len(BODY) // 1024} КБ")
+    print(f"новая сессия на вызов: {before * 1000:.1f} мс/вызов")
+    print(f"общий клиент:          {after * 1000:.1f} мс/вызов")
+    print(f"ускорение:             {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
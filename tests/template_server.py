@@ -0,0 +1,54 @@
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import AsyncIterator
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from docx import Document
+from lawly_db.db_models import Template
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def make_template_bytes() -> bytes:
+    doc = Document()
+    doc.add_paragraph("Договор с <client_name>")
+    doc.add_paragraph("Город: <city>")
+    body = BytesIO()
+    doc.save(body)
+    return body.getvalue()
+
+
+def document_text(body: bytes) -> str:
+    return "\n".join(p.text for p in Document(BytesIO(body)).paragraphs)
+
+
+@asynccontextmanager
+async def serve_template(session: AsyncSession) -> AsyncIterator[Template]:
+    """
+    Шаблон в базе, который скачивается с локального тестового сервера
+    """
+
+    # Содержимое одно на сервер: в DOCX записывается время сохранения, и
+    # шаблон, собранный заново, считался бы новой версией
+    body = make_template_bytes()
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    async with TestServer(app) as server:
+        template = Template(
+            name="generate_template",
+            name_ru="шаблон для генерации",
+            description="тестовое описание",
+            image_url="https://image_url",
+            download_url=str(server.make_url("/template.docx")),
+        )
+        session.add(template)
+        await session.commit()
+        try:
+            yield template
+        finally:
+            await session.delete(template)
+            await session.commit()
@@ -0,0 +1,111 @@
+from io import BytesIO
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from docx import Document
+
+from utils.blank_templates import BlankTemplateStore
+from utils.http_client import HttpClient
+from utils.template_store import TemplateBlobStore
+
+
+def make_template(text: str) -> bytes:
+    doc = Document()
+    doc.add_paragraph(text)
+    body = BytesIO()
+    doc.save(body)
+    return body.getvalue()
+
+
+async def test_blank_template_rendered_once_per_version(tmp_path, monkeypatch):
+    template = {"body": make_template("Город: <city>"), "etag": '"v1"'}
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == template["etag"]:
+            return web.Response(status=304)
+        return web.Response(body=template["body"], headers={"ETag": template["etag"]})
+
+    rendered = []
+
+    async def render_empty_template(s3_object, template_key=None):
+        rendered.append(s3_object.body)
+        return BytesIO(b"blank")
+
+    monkeypatch.setattr(
+        "utils.blank_templates.WordTemplateProcessor.render_empty_template",
+        render_empty_template,
+    )
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    http = HttpClient(
+        limit=10,
+        limit_per_host=2,
+        keepalive_timeout=30,
+        connect_timeout=5,
+        total_timeout=10,
+        retries=0,
+        backoff=0,
+    )
+    templates = TemplateBlobStore(
+        directory=tmp_path / "templates", max_size=10**9, mapped_size=2, http=http
+    )
+    store = BlankTemplateStore(
+        storage="disk",
+        directory=tmp_path / "blank",
+        bucket="",
+        prefix="",
+        max_size=10**9,
+        templates=templates,
+        version="1-zip",
+    )
+    # Тот же каталог после выкладки новой версии рендеринга
+    upgraded = BlankTemplateStore(
+        storage="disk",
+        directory=tmp_path / "blank",
+        bucket="",
+        prefix="",
+        max_size=10**9,
+        templates=templates,
+        version="2-zip",
+    )
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/template.docx"))
+
+        first = await store.response(url, "шаблон.docx")
+        second = await store.response(url, "шаблон.docx")
+        not_modified = await store.response(
+            url, "шаблон.docx", if_none_match=first.headers["ETag"]
+        )
+        after_upgrade = await upgraded.response(
+            url, "шаблон.docx", if_none_match=first.headers["ETag"]
+        )
+
+        template.update(body=make_template("Дата: <date>"), etag='"v2"')
+        changed = await store.response(url, "шаблон.docx")
+    await http.close()
+
+    assert requests == [None, '"v1"', '"v1"', '"v1"', '"v1"']
+    assert len(rendered) == 3
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert not_modified.status_code == 304
+    # Вариант прежней версии рендеринга не считается актуальным
+    assert after_upgrade.status_code == 200
+    assert after_upgrade.headers["ETag"] != first.headers["ETag"]
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert len(list((tmp_path / "blank").glob("*.docx"))) == 3
+
+
+def test_blank_template_store_evicts_by_size(tmp_path):
+    store = BlankTemplateStore(
+        storage="disk", directory=tmp_path, bucket="", prefix="", max_size=10
+    )
+    store._write_file("a", BytesIO(b"123456"))
+    store._write_file("b", BytesIO(b"123456"))
+
+    assert not store._touch("a")
+    assert store._touch("b")
+    assert [path.name for path in tmp_path.iterdir()] == ["b.docx"]
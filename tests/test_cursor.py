@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+
+from utils.cursor import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    keyset_after,
+)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("name_ru", ["договор", 42])
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "name_ru", 2) == ["договор", 42]
+
+
+@pytest.mark.parametrize(
+    "cursor, sort, size",
+    [
+        ("broken!", "id", 1),
+        (encode_cursor("id", [1]), "name_ru", 1),
+        (encode_cursor("id", [1]), "id", 2),
+    ],
+)
+def test_cursor_rejects_foreign_or_broken(cursor, sort, size):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, sort, size)
+
+
+def test_keyset_after_respects_directions():
+    condition = keyset_after([(column("rank"), True), (column("id"), False)], [0.5, 7])
+
+    sql = str(
+        condition.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert sql == "rank < 0.5 OR rank = 0.5 AND id > 7"
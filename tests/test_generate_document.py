@@ -0,0 +1,135 @@
+import zipfile
+from io import BytesIO
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.auth.auth_handler import sign_jwt
+from dto import RegisterDTO
+from template_server import document_text, serve_template
+
+
+async def test_generate_document_batch(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    async with serve_template(session) as template:
+        resp = await ac.post(
+            "/api/v1/documents/generate/batch",
+            headers={
+                "Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"
+            },
+            json={
+                "template_id": template.id,
+                "documents": [
+                    {
+                        "filename": f"договор {city}",
+                        "fields": [
+                            {"name": "client_name", "value": "Иванов"},
+                            {"name": "city", "value": city},
+                        ],
+                    }
+                    for city in ["Москва", "Казань", "Омск"]
+                ],
+            },
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(BytesIO(resp.content)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == [
+            "0001_договор Москва.docx",
+            "0002_договор Казань.docx",
+            "0003_договор Омск.docx",
+        ]
+        document = archive.read("0002_договор Казань.docx")
+    assert "Город: Казань" in document_text(document)
+
+
+async def test_generate_document_batch_not_found(
+    ac: AsyncClient, register_dto: RegisterDTO
+):
+    resp = await ac.post(
+        "/api/v1/documents/generate/batch",
+        headers={"Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"},
+        json={"template_id": 10**9, "documents": [{"fields": []}]},
+    )
+
+    assert resp.status_code == 404
+
+
+async def test_generate_document_batch_not_authorized(ac: AsyncClient):
+    resp = await ac.post(
+        "/api/v1/documents/generate/batch",
+        json={"template_id": 1, "documents": [{"fields": []}]},
+    )
+
+    assert resp.status_code == 401
+
+
+async def test_generate_document_ignores_unknown_fields(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    async with serve_template(session) as template:
+        resp = await ac.post(
+            "/api/v1/documents/generate",
+            headers={
+                "Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"
+            },
+            json={
+                "template_id": template.id,
+                "fields": [
+                    {"name": "city", "value": "Казань"},
+                    # Поля связанных документов, которых нет в шаблоне
+                    {"name": "issued_by", "value": "ОВД"},
+                    {"name": "issued_date", "value": "01.01.2020"},
+                ],
+            },
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["X-Ignored-Fields"] == "issued_by,issued_date"
+    assert "Город: Казань" in document_text(resp.content)
+
+
+async def test_generate_document_batch_reports_unknown_fields(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    async with serve_template(session) as template:
+        resp = await ac.post(
+            "/api/v1/documents/generate/batch",
+            headers={
+                "Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"
+            },
+            json={
+                "template_id": template.id,
+                "documents": [
+                    {"fields": [{"name": "city", "value": "Омск"}]},
+                    {"fields": [{"name": "issued_by", "value": "ОВД"}]},
+                ],
+            },
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["X-Ignored-Fields"] == "issued_by"
+    with zipfile.ZipFile(BytesIO(resp.content)) as archive:
+        assert len(archive.namelist()) == 2
+
+
+async def test_generate_document_without_unknown_fields_has_no_header(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    async with serve_template(session) as template:
+        resp = await ac.post(
+            "/api/v1/documents/generate",
+            headers={
+                "Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"
+            },
+            json={
+                "template_id": template.id,
+                "fields": [{"name": "client_name", "value": "Иванов"}],
+            },
+        )
+
+    assert resp.status_code == 200
+    assert "X-Ignored-Fields" not in resp.headers
@@ -1,3 +1,4 @@
+import json
 import logging
 
 from httpx import AsyncClient
@@ -150,3 +151,103 @@ async def test_get_document_structure_by_id(
     assert data["name_ru"] == "тестовые документы"
     assert data["link"] == "https://test_link"
     assert data["description"] == "тестовое описание"
+
+
+async def test_get_documents_cursor_pages(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    documents = [
+        Document(
+            name="test_document",
+            name_ru=name_ru,
+            link="https://test_link",
+            description="тестовое описание",
+        )
+        for name_ru in ["в-документ", "а-документ", "б-документ", "а-документ"]
+    ]
+    session.add_all(documents)
+    await session.commit()
+    headers = {"Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"}
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        resp = await ac.get(
+            "/api/v1/documents/documents", params=params, headers=headers
+        )
+        assert resp.status_code == 200
+        assert len(resp.json()) <= 2
+        seen += [(doc["name_ru"], doc["id"]) for doc in resp.json()]
+        if len(seen) == 2:
+            # Вставка перед курсором не сдвигает следующие страницы
+            inserted = Document(
+                name="test_document",
+                name_ru="",
+                link="https://test_link",
+                description="тестовое описание",
+            )
+            session.add(inserted)
+            await session.commit()
+            documents.append(inserted)
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 2, "after": cursor}
+
+    bad = await ac.get(
+        "/api/v1/documents/documents", params={"after": "broken"}, headers=headers
+    )
+    # Без limit ответ прежний: все документы списком
+    full = await ac.get("/api/v1/documents/documents", headers=headers)
+
+    for document in documents:
+        await session.delete(document)
+    await session.commit()
+
+    ids = {document.id for document in documents}
+    assert len(seen) == len(set(seen))
+    # Порядок по названию, при равных названиях - по id
+    assert [item for item in seen if item[1] in ids] == sorted(
+        (document.name_ru, document.id) for document in documents[:4]
+    )
+    assert inserted.id not in [document_id for _, document_id in seen]
+    assert bad.status_code == 400
+    assert full.status_code == 200
+    assert "X-Next-Cursor" not in full.headers
+    assert len(full.json()) == len(seen) + 1
+
+
+async def test_export_documents_json_lines(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    document = Document(
+        name="test_document",
+        name_ru="выгружаемый документ",
+        link="https://test_link",
+        description="тестовое описание",
+    )
+    session.add(document)
+    await session.commit()
+
+    resp = await ac.get(
+        "/api/v1/documents/documents/export",
+        headers={"Authorization": f"Bearer {sign_jwt(user_id=register_dto.user.id)}"},
+    )
+    unauthorized = await ac.get("/api/v1/documents/documents/export")
+
+    await session.delete(document)
+    await session.commit()
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    exported = next(line for line in lines if line["id"] == document.id)
+    assert exported == {
+        "id": document.id,
+        "name": "test_document",
+        "name_ru": "выгружаемый документ",
+        "is_personal": document.is_personal,
+        "link": "https://test_link",
+        "description": "тестовое описание",
+    }
+    assert unauthorized.status_code == 401
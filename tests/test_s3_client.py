@@ -0,0 +1,140 @@
+import os
+from urllib.parse import urlparse
+
+import pytest
+
+from repositories.s3_repository import MIN_PART_SIZE, S3Client
+from utils.http_client import HttpClient
+from utils.template_store import TemplateBlobStore
+
+moto_server = pytest.importorskip("moto.server")
+
+
+@pytest.fixture
+def s3_endpoint(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    server = moto_server.ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+def make_s3_client(endpoint: str, **overrides) -> S3Client:
+    options = dict(
+        endpoint_url=endpoint,
+        access_key="testing",
+        secret_key="testing",
+        max_pool_connections=4,
+        connect_timeout=5,
+        read_timeout=10,
+        max_attempts=1,
+    )
+    options.update(overrides)
+    return S3Client(**options)
+
+
+def make_http_client() -> HttpClient:
+    return HttpClient(
+        limit=10,
+        limit_per_host=2,
+        keepalive_timeout=30,
+        connect_timeout=5,
+        total_timeout=10,
+        retries=0,
+        backoff=0,
+    )
+
+
+async def test_s3_client_reuses_one_client(s3_endpoint):
+    s3 = make_s3_client(s3_endpoint)
+    await s3.start()
+    client = await s3.client()
+    await client.create_bucket(Bucket="templates")
+
+    await s3.put("templates", "a.docx", b"content", "application/octet-stream")
+    s3_object = await s3.get("templates", "a.docx")
+    assert s3_object.body == b"content"
+    assert s3_object.content_type == "application/octet-stream"
+
+    assert await s3.get("templates", "missing.docx") is None
+    assert await s3.delete("templates", "a.docx")
+    assert await s3.get("templates", "a.docx") is None
+    # Все вызовы прошли через один клиент
+    assert await s3.client() is client
+
+    await s3.close()
+    assert not s3.running
+
+
+async def test_s3_client_streams_ranges_and_multipart_uploads(s3_endpoint):
+    s3 = make_s3_client(s3_endpoint, chunk_size=64 * 1024)
+    client = await s3.client()
+    await client.create_bucket(Bucket="documents")
+    data = os.urandom(MIN_PART_SIZE * 2 + 1024)
+
+    async def chunks():
+        for start in range(0, len(data), 1024 * 1024):
+            yield data[start : start + 1024 * 1024]
+
+    await s3.put_stream(
+        "documents",
+        "big.docx",
+        chunks(),
+        "application/octet-stream",
+        part_concurrency=2,
+    )
+
+    stream = await s3.stream("documents", "big.docx")
+    assert stream.content_length == len(data)
+    received = [chunk async for chunk in stream.chunks]
+    assert b"".join(received) == data
+    assert max(len(chunk) for chunk in received) <= 64 * 1024
+
+    ranged = await s3.stream("documents", "big.docx", start=10, end=19)
+    assert ranged.content_length == 10
+    assert b"".join([chunk async for chunk in ranged.chunks]) == data[10:20]
+    assert await s3.stream("documents", "missing.docx") is None
+
+    async def failing():
+        yield data[:MIN_PART_SIZE]
+        raise ConnectionError("поток оборвался")
+
+    with pytest.raises(ConnectionError):
+        await s3.put_stream("documents", "broken.docx", failing(), "text/plain")
+    # Незавершённая загрузка отменена
+    uploads = await client.list_multipart_uploads(Bucket="documents")
+    assert not uploads.get("Uploads")
+    await s3.close()
+
+
+async def test_template_blob_store_reads_s3_urls_through_s3_client(
+    s3_endpoint, tmp_path
+):
+    s3 = make_s3_client(s3_endpoint)
+    client = await s3.client()
+    await client.create_bucket(Bucket="templates")
+    await s3.put("templates", "lease.docx", b"v1", "application/octet-stream")
+    http = make_http_client()
+    store = TemplateBlobStore(
+        directory=tmp_path,
+        max_size=10**9,
+        mapped_size=2,
+        http=http,
+        s3=s3,
+        s3_hosts=[urlparse(s3_endpoint).netloc],
+    )
+    url = f"{s3_endpoint}/templates/lease.docx"
+
+    key, first = await store.fetch(url)
+    same_key, _ = await store.fetch(url)
+    await s3.put("templates", "lease.docx", b"v2", "application/octet-stream")
+    changed_key, changed = await store.fetch(url)
+    await s3.close()
+
+    assert first.body == b"v1" and same_key == key
+    assert changed_key != key and changed.body == b"v2"
+    metrics = store.metrics()
+    assert metrics.revalidated == 1 and metrics.downloads == 2
+    # HTTP-клиент не использовался
+    assert http.metrics().requests == 0
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_operation():
+    flights = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def operation():
+        calls.append(1)
+        await release.wait()
+        return "template"
+
+    waiters = [asyncio.create_task(flights.do("url", operation)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["template"] * 10
+    assert len(calls) == 1
+    assert flights.coalesced == 9
+    assert flights.in_flight == 0
+
+
+async def test_failure_is_shared_but_not_remembered():
+    flights = SingleFlight()
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        if len(attempts) == 1:
+            raise ConnectionError("источник недоступен")
+        return "template"
+
+    results = await asyncio.gather(
+        flights.do("url", operation),
+        flights.do("url", operation),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    assert await flights.do("url", operation) == "template"
+    assert len(attempts) == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_the_others():
+    flights = SingleFlight()
+    release = asyncio.Event()
+    cancelled = []
+
+    async def operation():
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "template"
+
+    first = asyncio.create_task(flights.do("url", operation))
+    second = asyncio.create_task(flights.do("url", operation))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "template"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert not cancelled
+
+
+async def test_operation_cancelled_when_nobody_waits():
+    flights = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def operation():
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flights.do("url", operation))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+    async def fresh():
+        return "template"
+
+    # Новый вызов не присоединяется к отменённой операции
+    assert await flights.do("url", fresh) == "template"
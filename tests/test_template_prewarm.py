@@ -0,0 +1,51 @@
+import asyncio
+
+from repositories.s3_repository import S3Object
+from shared.templates import LOCAL_TEMPLATE_BYTES
+from utils.compiled_template import compiled_template_cache
+from utils.docx_zip_renderer import zip_template_cache
+from utils.placeholder_index import placeholder_index_cache
+from utils.template_prewarm import TemplatePrewarmer
+from utils.word_template_processor import WordTemplateProcessor
+
+
+async def test_prewarm_is_bounded_and_survives_failures():
+    running = 0
+    peak = 0
+
+    async def warm(url: str) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            if url == "broken":
+                raise ConnectionError(url)
+            await asyncio.sleep(10 if url == "slow" else 0.01)
+        finally:
+            running -= 1
+
+    prewarmer = TemplatePrewarmer(concurrency=2, timeout=0.2, warm=warm)
+    urls = ["a", "b", "broken", "c", "slow", "a"]
+    metrics = await prewarmer.run(urls)
+
+    assert peak == 2
+    assert metrics.requested == 5
+    assert metrics.warmed == 3
+    assert metrics.failed == 1
+    assert metrics.timed_out == 1
+    assert metrics.seconds < 1
+    assert running == 0
+    assert prewarmer.metrics() is metrics
+
+
+def test_compile_template_fills_render_caches():
+    template = S3Object(body=LOCAL_TEMPLATE_BYTES, content_type="application/docx")
+    key = compiled_template_cache.key(LOCAL_TEMPLATE_BYTES)
+
+    WordTemplateProcessor.compile_template(template)
+
+    def fail():
+        raise AssertionError("шаблон должен быть уже скомпилирован")
+
+    assert placeholder_index_cache.get_by_key(key, fail).names
+    assert zip_template_cache.get_by_key(key, fail) is not None
@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientConnectionError, web
+from aiohttp.test_utils import TestServer
+from docx import Document
+
+from modules.documents.dto import GenerateDocumentFieldDTO
+from shared.templates import LOCAL_TEMPLATE_BYTES
+from utils.buffers import BufferReader
+from utils.docx_zip_renderer import ZipTemplate
+from utils.http_client import HttpClient
+from utils.placeholder_substitution import PlaceholderSubstitution
+from utils.template_store import TemplateBlobStore
+
+
+def make_http_client(**overrides) -> HttpClient:
+    options = dict(
+        limit=10,
+        limit_per_host=2,
+        keepalive_timeout=30,
+        connect_timeout=5,
+        total_timeout=10,
+        retries=2,
+        backoff=0.01,
+    )
+    options.update(overrides)
+    return HttpClient(**options)
+
+
+def test_buffer_reader_reads_without_copying_the_buffer():
+    reader = BufferReader(memoryview(b"0123456789"))
+
+    assert reader.read(3) == b"012"
+    reader.seek(-2, 2)
+    assert reader.read() == b"89"
+    assert reader.tell() == 10
+
+
+async def test_template_blob_store_maps_downloaded_template(tmp_path):
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(body=LOCAL_TEMPLATE_BYTES)
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    http = make_http_client()
+    store = TemplateBlobStore(
+        directory=tmp_path, max_size=10**9, mapped_size=2, http=http
+    )
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/template.docx"))
+        key, first = await store.fetch(url)
+        _, second = await store.fetch(url)
+    await http.close()
+
+    assert isinstance(first.body, memoryview) and first.body.readonly
+    # Повторное скачивание того же содержимого отдаёт то же отображение
+    assert second.body is first.body
+    assert first.body == LOCAL_TEMPLATE_BYTES
+    assert [path.name for path in tmp_path.glob("*.docx")] == [f"{key}.docx"]
+
+    output = ZipTemplate(first.body).render(
+        PlaceholderSubstitution.from_fields(
+            [GenerateDocumentFieldDTO(name="decription_text", value="Текст")]
+        )
+    )
+    assert "Текст" in "\n".join(p.text for p in Document(output).paragraphs)
+
+
+async def test_template_blob_store_revalidates_with_etag(tmp_path):
+    template = {"body": LOCAL_TEMPLATE_BYTES, "etag": '"v1"'}
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == template["etag"]:
+            return web.Response(status=304)
+        return web.Response(body=template["body"], headers={"ETag": template["etag"]})
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    http = make_http_client()
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/template.docx"))
+        store = TemplateBlobStore(
+            directory=tmp_path, max_size=10**9, mapped_size=2, http=http
+        )
+        key, _ = await store.fetch(url)
+        assert (await store.fetch(url))[0] == key
+
+        # После перезапуска версия и файл берутся из каталога
+        restarted = TemplateBlobStore(
+            directory=tmp_path, max_size=10**9, mapped_size=2, http=http
+        )
+        _, cached = await restarted.fetch(url)
+        assert cached.body == LOCAL_TEMPLATE_BYTES
+
+        template.update(body=b"changed", etag='"v2"')
+        changed_key, changed = await restarted.fetch(url)
+    await http.close()
+
+    assert requests == [None, '"v1"', '"v1"', '"v1"']
+    assert changed_key != key and changed.body == b"changed"
+    assert store.metrics().revalidated == 1
+    assert restarted.metrics().revalidated == 1
+    assert restarted.metrics().downloads == 1
+
+
+async def test_template_blob_store_skips_source_within_ttl(tmp_path):
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        return web.Response(body=LOCAL_TEMPLATE_BYTES)
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    http = make_http_client()
+    store = TemplateBlobStore(
+        directory=tmp_path, max_size=10**9, mapped_size=2, ttl=60, http=http
+    )
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/template.docx"))
+        for _ in range(3):
+            await store.fetch(url)
+    await http.close()
+
+    assert len(requests) == 1
+    assert store.metrics().fresh_hits == 2
+
+
+async def test_http_client_retries_and_reuses_connections():
+    statuses = [503, 200, 200]
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(status=statuses.pop(0), body=b"ok")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    http = make_http_client()
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/"))
+        async with http.get(url) as resp:
+            assert resp.status == 200
+            assert await resp.read() == b"ok"
+        async with http.get(url) as resp:
+            assert resp.status == 200
+    await http.close()
+
+    metrics = http.metrics()
+    assert metrics.requests == 2
+    assert metrics.retries == 1
+    assert metrics.failures == 0
+    # Все три ответа получены по одному соединению
+    assert metrics.connections_created == 1
+    assert metrics.connections_reused == 2
+
+
+async def test_http_client_gives_up_after_retries():
+    http = make_http_client(retries=1)
+
+    with pytest.raises(ClientConnectionError):
+        async with http.get("http://127.0.0.1:1/"):
+            pass
+    await http.close()
+
+    metrics = http.metrics()
+    assert metrics.retries == 1
+    assert metrics.failures == 1
+
+
+def test_http_client_recreates_session_in_another_loop():
+    http = make_http_client()
+
+    async def fetch() -> int:
+        app = web.Application()
+        app.router.add_get("/", lambda request: web.Response(text="ok"))
+        async with TestServer(app) as server:
+            async with http.get(str(server.make_url("/"))) as response:
+                return response.status
+
+    # Каждый asyncio.run - новый цикл событий, сессия прежнего в нём не работает
+    assert asyncio.run(fetch()) == 200
+    assert asyncio.run(fetch()) == 200
+    asyncio.run(http.close())
+
+
+async def test_template_blob_store_coalesces_concurrent_fetches(tmp_path):
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        await asyncio.sleep(0.05)
+        return web.Response(body=LOCAL_TEMPLATE_BYTES)
+
+    app = web.Application()
+    app.router.add_get("/template.docx", handler)
+    http = make_http_client()
+    store = TemplateBlobStore(
+        directory=tmp_path, max_size=10**9, mapped_size=2, http=http
+    )
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/template.docx"))
+        results = await asyncio.gather(*(store.fetch(url) for _ in range(5)))
+    await http.close()
+
+    assert len(requests) == 1
+    assert len({key for key, _ in results}) == 1
+    assert store.metrics().coalesced == 4
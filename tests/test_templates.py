@@ -1,6 +1,16 @@
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
-from lawly_db.db_models import Template
+from lawly_db.db_models import Document, Field, Template
+
+from conftest import engine_test
+from dto import RegisterDTO
+from repositories.template_repository import TemplateRepository
+from template_server import document_text, serve_template
+
+# Шаблон, поля, документы полей и их поля - по запросу на уровень
+TEMPLATE_INFO_QUERIES = 4
 
 
 async def test_get_templates(ac: AsyncClient, session: AsyncSession):
@@ -124,6 +134,153 @@ async def test_get_templates_with_empty_query(ac: AsyncClient, session: AsyncSes
     await session.commit()
 
 
+async def test_get_templates_single_query_excludes_custom(
+    ac: AsyncClient, session: AsyncSession, register_dto: RegisterDTO
+):
+    public = Template(
+        name="test_template",
+        name_ru="каталожный шаблон",
+        description="тестовое описание",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    custom = Template(
+        user_id=register_dto.user.id,
+        name="test_template",
+        name_ru="каталожный шаблон пользователя",
+        description="тестовое описание",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    session.add_all([public, custom])
+    await session.commit()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        resp = await ac.get(
+            "/api/v1/templates/templates", params={"query": "каталожный"}
+        )
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", count_statement)
+
+    assert resp.status_code == 200
+    data = resp.json()
+    # Количество считается по той же выборке, что и страница
+    assert data["total"] == 1
+    assert [template["id"] for template in data["templates"]] == [public.id]
+    assert len(statements) == 1
+
+    await session.delete(public)
+    await session.delete(custom)
+    await session.commit()
+
+
+async def test_get_templates_relevance_search(ac: AsyncClient, session: AsyncSession):
+    await TemplateRepository(session).detect_trigram()
+    lease = Template(
+        name="lease_agreement",
+        name_ru="договор аренды квартиры",
+        description="передача жилья во временное пользование",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    sale = Template(
+        name="sale_agreement",
+        name_ru="договор купли-продажи",
+        description="продажа квартиры или другого жилья",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    receipt = Template(
+        name="receipt",
+        name_ru="расписка",
+        description="получение денежных средств",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    session.add_all([lease, sale, receipt])
+    await session.commit()
+
+    # Словоформы и описание учитываются, совпадение в названии выше
+    resp = await ac.get(
+        "/api/v1/templates/templates",
+        params={"query": "квартира", "mode": "relevance"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert [template["id"] for template in data["templates"]] == [lease.id, sale.id]
+
+    # Без режима relevance поиск по-прежнему по подстроке названия
+    resp = await ac.get("/api/v1/templates/templates", params={"query": "квартира"})
+    assert resp.json()["total"] == 0
+
+    await session.delete(lease)
+    await session.delete(sale)
+    await session.delete(receipt)
+    await session.commit()
+
+
+def test_relevance_sort_key_independent_of_trigram(monkeypatch: pytest.MonkeyPatch):
+    repository = TemplateRepository(session=None)
+    shapes = []
+    for available in (False, True):
+        monkeypatch.setattr(TemplateRepository, "trigram_available", available)
+        sort, keys = repository._sort_keys("аренда", "relevance")
+        shapes.append((sort, len(keys)))
+
+    # Курсор воркера без pg_trgm принимается воркером с расширением и наоборот
+    assert shapes[0] == shapes[1]
+
+
+async def test_get_templates_cursor_pages(ac: AsyncClient, session: AsyncSession):
+    templates = [
+        Template(
+            name="test_template",
+            name_ru=f"курсорный шаблон {i}",
+            description="тестовое описание",
+            image_url="https://image_url",
+            download_url="https://test_download_url",
+        )
+        for i in range(5)
+    ]
+    session.add_all(templates)
+    await session.commit()
+
+    pages = []
+    params = {"query": "курсорный", "limit": 2}
+    while True:
+        resp = await ac.get("/api/v1/templates/templates", params=params)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total"] == 5
+        pages.append([template["id"] for template in data["templates"]])
+        if data["next_cursor"] is None:
+            break
+        params["after"] = data["next_cursor"]
+
+    # Смещение по-прежнему работает для старых клиентов
+    by_offset = await ac.get(
+        "/api/v1/templates/templates",
+        params={"query": "курсорный", "limit": 2, "offset": 2},
+    )
+    bad = await ac.get("/api/v1/templates/templates", params={"after": "broken"})
+
+    for template in templates:
+        await session.delete(template)
+    await session.commit()
+
+    ids = [template.id for template in templates]
+    assert pages == [ids[:2], ids[2:4], ids[4:]]
+    assert [t["id"] for t in by_offset.json()["templates"]] == ids[2:4]
+    assert bad.status_code == 400
+
+
 async def test_get_template_detail(ac: AsyncClient, session: AsyncSession):
     template = Template(
         name="test_template",
@@ -155,6 +312,73 @@ async def test_get_template_detail(ac: AsyncClient, session: AsyncSession):
     await session.commit()
 
 
+async def test_get_template_detail_query_count(ac: AsyncClient, session: AsyncSession):
+    template = Template(
+        name="test_template",
+        name_ru="тестовый шаблон",
+        description="тестовое описание",
+        image_url="https://image_url",
+        download_url="https://test_download_url",
+    )
+    documents = [
+        Document(
+            name=f"test_document_{index}",
+            name_ru="тестовый документ",
+            link="https://test_link",
+            description="тестовое описание",
+        )
+        for index in range(5)
+    ]
+    fields = [Field(name="city", name_ru="Город", template=template)]
+    for index, document in enumerate(documents):
+        # Два поля шаблона на документ и собственное поле документа
+        fields += [
+            Field(
+                name=f"series_{index}",
+                name_ru="Серия",
+                template=template,
+                document=document,
+            ),
+            Field(
+                name=f"number_{index}",
+                name_ru="Номер",
+                template=template,
+                document=document,
+            ),
+            Field(name=f"issued_{index}", name_ru="Выдан", document=document),
+        ]
+    session.add_all([template, *documents, *fields])
+    await session.commit()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        resp = await ac.get(f"/api/v1/templates/{template.id}")
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", count_statement)
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(statements) == TEMPLATE_INFO_QUERIES
+    # Документы не повторяются, хотя связаны с двумя полями каждый
+    assert sorted(document["id"] for document in data["required_documents"]) == sorted(
+        document.id for document in documents
+    )
+    assert all(len(document["fields"]) == 3 for document in data["required_documents"])
+    assert [field["name"] for field in data["custom_fields"]] == ["city"]
+
+    for field in fields:
+        await session.delete(field)
+    await session.commit()
+    for entity in [template, *documents]:
+        await session.delete(entity)
+    await session.commit()
+
+
 async def test_get_template_detail_not_found(ac: AsyncClient, session: AsyncSession):
     non_existent_id = 99999
 
@@ -193,3 +417,46 @@ async def test_download_template_not_found(ac: AsyncClient, session: AsyncSessio
     resp = await ac.get(f"/api/v1/templates/{non_existent_id}/download")
 
     assert resp.status_code == 404
+
+
+async def test_get_template_placeholders(ac: AsyncClient, session: AsyncSession):
+    async with serve_template(session) as template:
+        resp = await ac.get(f"/api/v1/templates/{template.id}/placeholders")
+
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "template_id": template.id,
+        "placeholders": [
+            {"name": "client_name", "count": 1, "locations": ["body"]},
+            {"name": "city", "count": 1, "locations": ["body"]},
+        ],
+    }
+
+
+async def test_get_template_placeholders_not_found(ac: AsyncClient):
+    resp = await ac.get("/api/v1/templates/999999999/placeholders")
+
+    assert resp.status_code == 404
+
+
+async def test_get_empty_template_not_modified(ac: AsyncClient, session: AsyncSession):
+    async with serve_template(session) as template:
+        url = f"/api/v1/templates/{template.id}/empty"
+        first = await ac.get(url)
+        cached = await ac.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        stale = await ac.get(url, headers={"If-None-Match": '"blank-outdated"'})
+        # POST не поддерживает условный запрос и всегда отдаёт файл
+        posted = await ac.post(
+            "/api/v1/templates/download-empty-template",
+            json={"template_id": template.id},
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+
+    assert first.status_code == 200
+    assert "Город: ____" in document_text(first.content)
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    assert cached.content == b""
+    assert stale.status_code == 200
+    assert posted.status_code == 200
+    assert posted.content == first.content
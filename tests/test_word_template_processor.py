@@ -0,0 +1,499 @@
+import asyncio
+import zipfile
+from io import BytesIO
+
+import pytest
+from docx import Document
+
+from modules.documents.dto import (
+    GenerateDocumentBatchItemDTO,
+    GenerateDocumentFieldDTO,
+)
+from repositories.s3_repository import S3Object
+from shared.templates import LOCAL_TEMPLATE_BYTES
+from utils.compiled_template import (
+    CompiledTemplate,
+    CompiledTemplateCache,
+    compiled_template_cache,
+)
+from utils.docx_zip_renderer import ZipTemplate
+from utils.memory_budget import MemoryBudget
+from utils.placeholder_index import PlaceholderIndex, PlaceholderUsage
+from utils.placeholder_substitution import PlaceholderSubstitution
+from utils.render_pool import RenderPool
+from utils.render_scheduler import (
+    RenderRejectedError,
+    RenderScheduler,
+    render_scheduler,
+)
+from utils.rendered_cache import RenderedDocumentCache
+from utils.word_template_processor import WordTemplateProcessor
+from utils.zip_writer import ZIP32_LIMIT, ZipWriter, read_raw_entry
+
+
+@pytest.fixture(autouse=True)
+def rendered_cache(tmp_path, monkeypatch) -> RenderedDocumentCache:
+    cache = RenderedDocumentCache(
+        memory_size=1024 * 1024, disk_dir=tmp_path / "rendered", disk_size=1024 * 1024
+    )
+    monkeypatch.setattr("utils.word_template_processor.rendered_document_cache", cache)
+    return cache
+
+
+def make_template() -> S3Object:
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    paragraph.add_run("Договор с ")
+    paragraph.add_run("<client").bold = True
+    paragraph.add_run("_name> от <date>")
+    doc.add_paragraph("Без плейсхолдеров")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Город: <city>"
+    table.cell(0, 1).text = "<unknown>"
+    doc.sections[0].header.paragraphs[0].text = "Колонтитул <city>"
+
+    body = BytesIO()
+    doc.save(body)
+    return S3Object(body=body.getvalue(), content_type="application/octet-stream")
+
+
+def rename_main_part(template: S3Object) -> S3Object:
+    """
+    Тот же шаблон, но основная часть называется word/document2.xml: имя части
+    задают связи пакета, а не соглашение
+    """
+    renames = {
+        "word/document.xml": "word/document2.xml",
+        "word/_rels/document.xml.rels": "word/_rels/document2.xml.rels",
+    }
+    output = BytesIO()
+    with zipfile.ZipFile(BytesIO(template.body)) as source, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_DEFLATED
+    ) as result:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename in ("[Content_Types].xml", "_rels/.rels"):
+                data = data.replace(b"/word/document.xml", b"/word/document2.xml")
+                data = data.replace(b'"word/document.xml"', b'"word/document2.xml"')
+            result.writestr(renames.get(info.filename, info.filename), data)
+    return S3Object(body=output.getvalue(), content_type=template.content_type)
+
+
+def render(
+    monkeypatch, template: S3Object, fields: list, engine: str = "docx"
+) -> BytesIO:
+    # Тот же путь, что и при генерации документа, с выбранным движком
+    monkeypatch.setattr(
+        "utils.template_renderer.settings.render_settings.engine", engine
+    )
+    return WordTemplateProcessor._render(
+        template, fields, compiled_template_cache.key(template.body)
+    )
+
+
+def test_render_fills_known_and_unknown_placeholders(monkeypatch):
+    template = make_template()
+
+    output = render(
+        monkeypatch,
+        template,
+        [
+            GenerateDocumentFieldDTO(name="client_name", value="ООО Ромашка"),
+            GenerateDocumentFieldDTO(name="city", value="Москва"),
+        ],
+    )
+    doc = Document(output)
+
+    assert doc.paragraphs[0].text == "Договор с ООО Ромашка от ______"
+    assert doc.paragraphs[1].text == "Без плейсхолдеров"
+    assert [cell.text for cell in doc.tables[0].rows[0].cells] == [
+        "Город: Москва",
+        "_________",
+    ]
+    # Форматирование run'а, в котором начинался плейсхолдер, сохраняется
+    assert doc.paragraphs[0].runs[1].bold
+
+
+def document_texts(output: BytesIO) -> list[str]:
+    doc = Document(output)
+    texts = [paragraph.text for paragraph in doc.paragraphs]
+    texts += [
+        cell.text for table in doc.tables for row in table.rows for cell in row.cells
+    ]
+    texts += [
+        paragraph.text
+        for section in doc.sections
+        for paragraph in section.header.paragraphs + section.footer.paragraphs
+    ]
+    return texts
+
+
+def test_render_fills_renamed_main_part(monkeypatch):
+    template = rename_main_part(make_template())
+    assert "word/document.xml" not in zipfile.ZipFile(BytesIO(template.body)).namelist()
+
+    output = render(
+        monkeypatch,
+        template,
+        [GenerateDocumentFieldDTO(name="client_name", value="ООО Ромашка")],
+    )
+
+    texts = document_texts(output)
+    assert "Договор с ООО Ромашка от ______" in texts
+    assert "Колонтитул ______" in texts
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        [],
+        [
+            GenerateDocumentFieldDTO(name="client_name", value="ООО Ромашка"),
+            GenerateDocumentFieldDTO(name="city", value="Москва\nЦентр"),
+            GenerateDocumentFieldDTO(name="date", value="<не плейсхолдер>"),
+        ],
+    ],
+)
+@pytest.mark.parametrize("renamed", [False, True])
+def test_zip_engine_matches_python_docx(monkeypatch, fields, renamed):
+    template = make_template()
+    if renamed:
+        template = rename_main_part(template)
+
+    expected = render(monkeypatch, template, fields, engine="docx")
+    actual = render(monkeypatch, template, fields, engine="zip")
+
+    assert document_texts(actual) == document_texts(expected)
+    assert not any("<client" in text for text in document_texts(actual))
+    assert "Колонтитул ______" in document_texts(
+        render(monkeypatch, template, [], engine="zip")
+    )
+
+
+def test_zip_engine_copies_untouched_entries_verbatim(monkeypatch):
+    template = S3Object(
+        body=LOCAL_TEMPLATE_BYTES, content_type="application/octet-stream"
+    )
+
+    output = render(
+        monkeypatch,
+        template,
+        [GenerateDocumentFieldDTO(name="decription_text", value="Текст")],
+        engine="zip",
+    ).read()
+
+    with zipfile.ZipFile(BytesIO(LOCAL_TEMPLATE_BYTES)) as source, zipfile.ZipFile(
+        BytesIO(output)
+    ) as result:
+        assert result.testzip() is None
+        assert result.namelist() == source.namelist()
+        for info in source.infolist():
+            if info.filename == "word/document.xml":
+                continue
+            assert read_raw_entry(output, result.getinfo(info.filename)) == (
+                read_raw_entry(LOCAL_TEMPLATE_BYTES, info)
+            )
+
+    assert "Текст" in document_texts(BytesIO(output))
+
+
+async def test_render_empty_template():
+    output = await WordTemplateProcessor.render_empty_template(make_template())
+    doc = Document(output)
+
+    assert doc.paragraphs[0].text == "Договор с _____________ от ______"
+    assert doc.tables[0].rows[0].cells[0].text == "Город: ______"
+
+
+def test_zip_writer_rejects_central_directory_beyond_zip32():
+    chunks = []
+    writer = ZipWriter(chunks.append)
+    writer.write_entry(zipfile.ZipInfo("a.txt"), b"a")
+    # Запись начата до предела ZIP32, а каталог оказался бы за ним
+    writer._offset = ZIP32_LIMIT + 1
+    written = len(chunks)
+
+    with pytest.raises(zipfile.LargeZipFile):
+        writer.close()
+    assert len(chunks) == written
+
+
+def test_placeholder_substitution_single_pass():
+    substitution = PlaceholderSubstitution.from_fields(
+        [
+            GenerateDocumentFieldDTO(name="a", value="<b>"),
+            GenerateDocumentFieldDTO(name="b", value="B"),
+        ]
+    )
+
+    # Подставленное значение повторно не сканируется
+    assert substitution.sub("<a> <b> <c>") == "<b> B ___"
+
+
+def test_compiled_template_is_reused():
+    template = make_template()
+
+    first = compiled_template_cache.get(template.body)
+    second = compiled_template_cache.get(template.body)
+
+    assert first is second
+    assert first.placeholders == {"<client_name>", "<date>", "<city>", "<unknown>"}
+
+
+def test_compiled_template_cache_evicts_least_recently_used():
+    cache = CompiledTemplateCache(maxsize=1)
+    first = make_template().body
+
+    cache.get(first)
+    cache.get(LOCAL_TEMPLATE_BYTES)
+
+    assert list(cache._items) == [cache.key(LOCAL_TEMPLATE_BYTES)]
+
+
+async def test_render_pool_renders_in_worker_process(tmp_path):
+    pool = RenderPool(workers=1, spool_dir=tmp_path / "spool", spool_size=1)
+    await pool.start()
+    try:
+        output = await pool.render(
+            make_template().body,
+            PlaceholderSubstitution.from_fields(
+                [GenerateDocumentFieldDTO(name="city", value="Москва")]
+            ),
+        )
+        metrics = pool.metrics()
+    finally:
+        await pool.shutdown()
+
+    assert "Город: Москва" in document_texts(output)
+    assert metrics.completed == 1
+    assert metrics.failed == 0
+    assert not (tmp_path / "spool").exists()
+
+
+async def test_fill_template_batch_streams_zip():
+    response = await WordTemplateProcessor.fill_template_batch(
+        make_template(),
+        [
+            GenerateDocumentBatchItemDTO(
+                filename=f"договор {city}",
+                fields=[GenerateDocumentFieldDTO(name="city", value=city)],
+            )
+            for city in ["Москва", "Казань", "Омск"]
+        ],
+    )
+
+    chunks = [chunk async for chunk in response.body_iterator]
+    assert len(chunks) == 4
+
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == [
+            "0001_договор Москва.docx",
+            "0002_договор Казань.docx",
+            "0003_договор Омск.docx",
+        ]
+        document = archive.read("0002_договор Казань.docx")
+
+    assert "Город: Казань" in document_texts(BytesIO(document))
+
+
+async def test_fill_template_batch_bounds_rendered_documents(monkeypatch):
+    rendered = []
+    render_async = WordTemplateProcessor._render_async
+
+    async def counting_render(s3_object, fields, template_key):
+        output = await render_async(s3_object, fields, template_key)
+        rendered.append(fields[0].value)
+        return output
+
+    monkeypatch.setattr(
+        "utils.word_template_processor.WordTemplateProcessor._render_async",
+        counting_render,
+    )
+    monkeypatch.setattr(
+        "utils.word_template_processor.settings.render_settings.batch_concurrency", 2
+    )
+    response = await WordTemplateProcessor.fill_template_batch(
+        make_template(),
+        [
+            GenerateDocumentBatchItemDTO(
+                fields=[GenerateDocumentFieldDTO(name="city", value=str(i))]
+            )
+            for i in range(60)
+        ],
+    )
+
+    # Клиент прочитал один кусок и перестал читать
+    body = response.body_iterator
+    await body.__anext__()
+    await asyncio.sleep(0.5)
+    await body.aclose()
+
+    assert len(rendered) <= 2
+
+
+async def test_fill_template_streams_entries():
+    template = make_template()
+
+    response = await WordTemplateProcessor.fill_template(
+        template, [GenerateDocumentFieldDTO(name="city", value="Москва")]
+    )
+    chunks = [bytes(chunk) async for chunk in response.body_iterator]
+    assert render_scheduler.metrics().running == 0
+
+    # Каждая запись архива отдаётся отдельно, а не одним куском
+    with zipfile.ZipFile(BytesIO(template.body)) as archive:
+        assert len(chunks) > len(archive.infolist())
+
+    output = BytesIO(b"".join(chunks))
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+    assert "Город: Москва" in document_texts(output)
+
+
+async def test_fill_template_serves_repeated_request_from_cache(rendered_cache):
+    template = make_template()
+
+    async def generate(fields):
+        response = await WordTemplateProcessor.fill_template(template, fields)
+        return b"".join([bytes(chunk) async for chunk in response.body_iterator])
+
+    first = await generate(
+        [
+            GenerateDocumentFieldDTO(name="city", value="Москва"),
+            GenerateDocumentFieldDTO(name="date", value="01.01.2025"),
+        ]
+    )
+    # Порядок полей не влияет на ключ
+    second = await generate(
+        [
+            GenerateDocumentFieldDTO(name="date", value="01.01.2025"),
+            GenerateDocumentFieldDTO(name="city", value="Москва"),
+        ]
+    )
+
+    assert second == first
+    metrics = rendered_cache.metrics()
+    assert (metrics.memory_hits, metrics.misses, metrics.disk_entries) == (1, 1, 1)
+
+
+def test_rendered_cache_evicts_by_size(tmp_path):
+    cache = RenderedDocumentCache(
+        memory_size=10, disk_dir=tmp_path / "rendered", disk_size=10
+    )
+    cache.put("a", b"123456")
+    cache.put("b", b"123456")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"123456"
+    assert [path.name for path in (tmp_path / "rendered").iterdir()] == ["b.docx"]
+
+    # Дисковый уровень переживает перезапуск
+    restarted = RenderedDocumentCache(
+        memory_size=10, disk_dir=tmp_path / "rendered", disk_size=10
+    )
+    assert restarted.get("b") == b"123456"
+    assert restarted.metrics().disk_hits == 1
+
+
+def test_rendered_cache_key_depends_on_render_version(tmp_path):
+    substitution = PlaceholderSubstitution.from_fields(
+        [GenerateDocumentFieldDTO(name="city", value="Москва")]
+    )
+    old, new = (
+        RenderedDocumentCache(
+            memory_size=10, disk_dir=tmp_path, disk_size=0, version=version
+        )
+        for version in ("1-zip", "2-zip")
+    )
+
+    assert old.key("template", substitution) != new.key("template", substitution)
+
+
+async def test_generate_docx_response_splits_paragraphs():
+    response = await WordTemplateProcessor.generate_docx_response(
+        "Первый абзац\r\nВторой\tс табуляцией <и> & символами\n\n\x07Третий",
+        "документ.docx",
+    )
+    output = BytesIO(b"".join([chunk async for chunk in response.body_iterator]))
+
+    assert [paragraph.text for paragraph in Document(output).paragraphs] == [
+        "Первый абзац",
+        "Второй\tс табуляцией <и> & символами",
+        "",
+        "Третий",
+    ]
+
+
+@pytest.mark.parametrize("renamed", [False, True])
+def test_placeholder_index_lists_names_counts_and_locations(renamed):
+    template = make_template()
+    if renamed:
+        template = rename_main_part(template)
+    index = PlaceholderIndex(template.body)
+
+    assert index.placeholders == (
+        PlaceholderUsage(name="client_name", count=1, locations=("body",)),
+        PlaceholderUsage(name="date", count=1, locations=("body",)),
+        PlaceholderUsage(name="city", count=2, locations=("table", "header")),
+        PlaceholderUsage(name="unknown", count=1, locations=("table",)),
+    )
+    assert index.unknown(["city", "missing", "date", "missing"]) == ["missing"]
+    # Перечень совпадает с тем, что заполняют движки
+    assert {f"<{name}>" for name in index.names} == (
+        ZipTemplate(template.body).placeholders
+    )
+    assert {f"<{name}>" for name in index.names} == (
+        CompiledTemplate(template.body).placeholders
+    )
+
+
+async def test_render_scheduler_sheds_load():
+    scheduler = RenderScheduler(
+        concurrency=1, queue_size=1, queue_timeout=0.05, retry_after=7
+    )
+    await scheduler.acquire()
+
+    # Очередь свободна, но слот так и не освободился
+    with pytest.raises(RenderRejectedError):
+        await scheduler.acquire()
+
+    waiting = asyncio.create_task(scheduler.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(RenderRejectedError) as rejected:
+        await scheduler.acquire()
+    assert rejected.value.retry_after == 7
+
+    scheduler.release()
+    await waiting
+    scheduler.release()
+
+    metrics = scheduler.metrics()
+    assert (metrics.admitted, metrics.rejected_timeout) == (2, 1)
+    assert (metrics.rejected_queue_full, metrics.running, metrics.queued) == (1, 0, 0)
+
+
+async def test_memory_budget_queues_renders_and_spills_large_outputs():
+    budget = MemoryBudget(limit=100, spool_threshold=10)
+    first = await budget.acquire(60)
+
+    waiting = asyncio.create_task(budget.acquire(60))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    budget.release(first)
+    second = await waiting
+    budget.release(second)
+    # Запрос больше бюджета допускается, когда память свободна
+    budget.release(await budget.acquire(1000))
+
+    for size in (5, 50):
+        output = budget.output()
+        output.write(b"x" * size)
+        budget.finish(output)
+
+    metrics = budget.metrics()
+    assert (metrics.in_use_bytes, metrics.peak_in_use_bytes) == (0, 100)
+    assert (metrics.waited, metrics.waiting) == (1, 0)
+    assert (metrics.outputs, metrics.spilled_outputs) == (2, 1)
+    assert metrics.peak_output_bytes == 50